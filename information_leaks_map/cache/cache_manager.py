@@ -1,24 +1,182 @@
+import heapq
+import itertools
+import logging
+import sys
+import threading
 import time
-from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .codecs import Codec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARDS = 16
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate in-memory size of a value in bytes, including nested containers.
+
+    :param value: Value to measure
+    :return: Size in bytes
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class _Totals:
+    """Entry and byte counts of the whole cache, shared by all shards."""
+    def __init__(self):
+        self.entries = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def add(self, entries: int, size: int) -> None:
+        with self.lock:
+            self.entries += entries
+            self.bytes += size
+
+
+class _Shard:
+    """
+    One lock-protected part of CacheManager with its own LRU order and expiry heap.
+
+    All methods except the constructor must be called with ``lock`` held.
+    The shard lock may be held while taking the totals lock, never the reverse.
+    """
+    def __init__(self, totals: _Totals):
+        # cache_key -> (encoded value, expiry_time, remove_time, size, last_used),
+        # in least to most recently used order. Between expiry_time and
+        # remove_time the entry is stale: only get_stale returns it
+        self.entries: "OrderedDict[Tuple, Tuple[Any, float, float, int, float]]"
+        self.entries = OrderedDict()
+        # (remove_time, seq, cache_key); entries overwritten or removed since
+        # are skipped lazily. seq breaks ties so cache keys are never compared
+        self.expiry_heap: List[Tuple[float, int, Tuple]] = []
+        self.seq = itertools.count()
+        self.totals = totals
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self.lock = threading.Lock()
+
+    def get(self, cache_key: Tuple, now: float, stale: bool = False) -> Optional[Any]:
+        entry = self.entries.get(cache_key)
+        if entry is not None:
+            value, expiry_time, remove_time, size, _ = entry
+            if now < expiry_time or (stale and now < remove_time):
+                self.entries[cache_key] = (value, expiry_time, remove_time, size, now)
+                self.entries.move_to_end(cache_key)
+                self.stats["hits"] += 1
+                return value
+            if now >= remove_time:
+                # Past the stale period too, remove from cache
+                self.remove(cache_key)
+                self.stats["expirations"] += 1
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, cache_key: Tuple, value: Any, expiry_time: float,
+            remove_time: float, size: int, now: float) -> None:
+        self.expire(now)
+        if cache_key in self.entries:
+            self.remove(cache_key)
+        self.entries[cache_key] = (value, expiry_time, remove_time, size, now)
+        self.totals.add(1, size)
+        heapq.heappush(self.expiry_heap, (remove_time, next(self.seq), cache_key))
+        self.compact_heap()
+
+    def remove(self, cache_key: Tuple) -> None:
+        size = self.entries.pop(cache_key)[3]
+        self.totals.add(-1, -size)
+
+    def oldest_use(self) -> Optional[float]:
+        """Last use time of the shard's least recently used entry."""
+        for entry in self.entries.values():
+            return entry[4]
+        return None
+
+    def evict_oldest(self) -> None:
+        self.remove(next(iter(self.entries)))
+        self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        self.totals.add(-len(self.entries),
+                        -sum(entry[3] for entry in self.entries.values()))
+        self.entries.clear()
+        self.expiry_heap.clear()
+
+    def expire(self, now: float) -> int:
+        """Pop heap items up to ``now`` and drop entries whose removal time matches."""
+        expired = 0
+        heap = self.expiry_heap
+        while heap and heap[0][0] <= now:
+            remove_time, _, cache_key = heapq.heappop(heap)
+            entry = self.entries.get(cache_key)
+            # The key may have been overwritten with a later expiry or removed already
+            if entry is not None and entry[2] == remove_time:
+                self.remove(cache_key)
+                expired += 1
+        self.stats["expirations"] += expired
+        return expired
+
+    def compact_heap(self) -> None:
+        """Rebuild the heap once items of overwritten or evicted keys dominate it."""
+        if len(self.expiry_heap) > 2 * len(self.entries) + 64:
+            self.expiry_heap = [
+                (entry[2], next(self.seq), cache_key)
+                for cache_key, entry in self.entries.items()
+            ]
+            heapq.heapify(self.expiry_heap)
 
 
 class CacheManager:
     """
-    Simple cache manager with TTL support.
+    Thread-safe cache manager with TTL support and a bounded size.
+
+    Keys are spread over ``shards`` independent shards by hash, each with its
+    own lock, so threads working on different keys rarely wait for each other.
+    Within a shard, expiry times are kept in a min-heap, so expired entries are
+    dropped in amortized O(log n) per entry on every write instead of a full
+    scan. ``max_entries`` and ``max_bytes`` apply to the whole cache: when a
+    write exceeds them, the least recently used entry across all shards is
+    evicted. Values pass through ``codec`` (see cache.codecs) on set and get,
+    outside the shard lock, so they can be kept compressed or in a compact form.
+
+    An expired entry stays available through ``get_stale`` for ``stale_ttl``
+    more seconds, as a fallback answer when the source of the data is down.
     """
-    def __init__(self, default_ttl: int = 3600):
+    def __init__(self, default_ttl: int = 3600, max_entries: Optional[int] = 10000,
+                 max_bytes: Optional[int] = None, codec: Optional[Codec] = None,
+                 shards: int = DEFAULT_SHARDS, stale_ttl: int = 0):
         """
         Initialize cache manager.
-        
+
         :param default_ttl: Default time-to-live in seconds (default: 1 hour)
+        :param max_entries: Maximum number of entries (None for no limit)
+        :param max_bytes: Maximum estimated size of cached values in bytes
+            (None for no limit)
+        :param codec: Value codec (stores values as is by default)
+        :param shards: Number of independently locked shards
+        :param stale_ttl: How long an expired entry is kept for get_stale, in seconds
         """
-        self.cache: Dict[Tuple, Tuple[Any, float]] = {}
+        if shards < 1:
+            raise ValueError("shards must be positive")
         self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.codec = codec or Codec()
+        self._totals = _Totals()
+        self._shards = [_Shard(self._totals) for _ in range(shards)]
 
     def _make_key(self, key: str, params: Dict) -> Tuple:
         """
         Create a cache key from URL and parameters.
-        
+
         :param key: Base URL or key
         :param params: Dictionary of parameters
         :return: Hashable tuple for use as cache key
@@ -31,47 +189,148 @@ class CacheManager:
             params_tuple = (str(params),)
         return (key, params_tuple)
 
+    def _shard(self, cache_key: Tuple) -> _Shard:
+        return self._shards[hash(cache_key) % len(self._shards)]
+
+    def _over_limit(self) -> bool:
+        totals = self._totals
+        return ((self.max_entries is not None and totals.entries > self.max_entries)
+                or (self.max_bytes is not None and totals.bytes > self.max_bytes))
+
+    def _evict(self) -> None:
+        """Evict least recently used entries across shards until both limits are met."""
+        while self._over_limit():
+            # Only one shard lock is held at a time: peek at every shard's
+            # oldest entry, then evict from the shard where it is the oldest
+            oldest_shard, oldest_use = None, None
+            for shard in self._shards:
+                with shard.lock:
+                    used = shard.oldest_use()
+                if used is not None and (oldest_use is None or used < oldest_use):
+                    oldest_shard, oldest_use = shard, used
+            if oldest_shard is None:
+                return
+            with oldest_shard.lock:
+                if oldest_shard.entries:
+                    oldest_shard.evict_oldest()
+
+    def _get(self, key: str, params: Dict, stale: bool) -> Optional[Any]:
+        cache_key = self._make_key(key, params)
+        shard = self._shard(cache_key)
+        with shard.lock:
+            value = shard.get(cache_key, time.monotonic(), stale)
+        return self.codec.decode(value) if value is not None else None
+
     def get(self, key: str, params: Dict) -> Optional[Any]:
         """
         Get value from cache if it exists and hasn't expired.
-        
+
         :param key: Cache key (usually URL)
         :param params: Parameters dictionary
         :return: Cached value or None if not found or expired
         """
-        cache_key = self._make_key(key, params)
-        if cache_key in self.cache:
-            value, expiry_time = self.cache[cache_key]
-            if time.time() < expiry_time:
-                return value
-            else:
-                # Expired, remove from cache
-                del self.cache[cache_key]
-        return None
+        return self._get(key, params, stale=False)
+
+    def get_stale(self, key: str, params: Dict) -> Optional[Any]:
+        """
+        Get value from cache even if it has expired, within stale_ttl.
+
+        :param key: Cache key (usually URL)
+        :param params: Parameters dictionary
+        :return: Cached value or None if not found or past the stale period
+        """
+        return self._get(key, params, stale=True)
 
-    def set(self, key: str, params: Dict, value: Any, ttl: Optional[int] = None) -> None:
+    def set(self, key: str, params: Dict, value: Any,
+            ttl: Optional[int] = None) -> None:
         """
         Store value in cache with TTL.
-        
+
         :param key: Cache key (usually URL)
         :param params: Parameters dictionary
         :param value: Value to cache
         :param ttl: Time-to-live in seconds (uses default if not provided)
         """
         cache_key = self._make_key(key, params)
-        expiry_time = time.time() + (ttl if ttl is not None else self.default_ttl)
-        self.cache[cache_key] = (value, expiry_time)
-        
+        shard = self._shard(cache_key)
+        value = self.codec.encode(value)
+        size = estimate_size(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Would evict everything else and still not fit
+            logger.warning(f"Cache value for {key} is too large ({size} bytes)")
+            return
+        now = time.monotonic()
+        expiry_time = now + (ttl if ttl is not None else self.default_ttl)
+        with shard.lock:
+            shard.set(cache_key, value, expiry_time, expiry_time + self.stale_ttl,
+                      size, now)
+        self._evict()
+
+    async def aget(self, key: str, params: Dict) -> Optional[Any]:
+        """
+        get for coroutines.
+
+        The shard lock is held only for a dict lookup, so the call runs inline
+        without a thread hop and never blocks the event loop for long.
+        """
+        return self.get(key, params)
+
+    async def aget_stale(self, key: str, params: Dict) -> Optional[Any]:
+        """get_stale for coroutines (see aget)."""
+        return self.get_stale(key, params)
+
+    async def aset(self, key: str, params: Dict, value: Any,
+                   ttl: Optional[int] = None) -> None:
+        """set for coroutines (see aget)."""
+        self.set(key, params, value, ttl)
+
+    def delete(self, key: str, params: Dict) -> None:
+        """
+        Remove a value from cache.
+
+        :param key: Cache key (usually URL)
+        :param params: Parameters dictionary
+        """
+        cache_key = self._make_key(key, params)
+        shard = self._shard(cache_key)
+        with shard.lock:
+            if cache_key in shard.entries:
+                shard.remove(cache_key)
+
     def clear(self) -> None:
         """Clear all cached values."""
-        self.cache.clear()
-    
-    def cleanup_expired(self) -> None:
-        """Remove all expired entries from cache."""
-        current_time = time.time()
-        expired_keys = [
-            key for key, (_, expiry_time) in self.cache.items()
-            if current_time >= expiry_time
-        ]
-        for key in expired_keys:
-            del self.cache[key]
\ No newline at end of file
+        for shard in self._shards:
+            with shard.lock:
+                shard.clear()
+
+    def cleanup_expired(self) -> int:
+        """
+        Remove all expired entries from cache.
+
+        :return: Number of removed entries
+        """
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                removed += shard.expire(time.monotonic())
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Cache statistics.
+
+        :return: Counters of hits, misses, evictions and expirations
+            plus current entries and bytes
+        """
+        totals = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        for shard in self._shards:
+            with shard.lock:
+                for name, count in shard.stats.items():
+                    totals[name] += count
+        with self._totals.lock:
+            totals["entries"] = self._totals.entries
+            totals["bytes"] = self._totals.bytes
+        return totals
+
+    def __len__(self) -> int:
+        return self._totals.entries
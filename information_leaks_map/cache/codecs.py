@@ -0,0 +1,150 @@
+import json
+import pickle
+import sys
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+class Codec:
+    """
+    Value codec used by CacheManager: ``encode`` on set, ``decode`` on get.
+
+    The base class stores values as is.
+    """
+    name = "identity"
+
+    def encode(self, value: Any) -> Any:
+        return value
+
+    def decode(self, data: Any) -> Any:
+        return data
+
+
+class PickleZlibCodec(Codec):
+    """Pickle the value and compress it with zlib."""
+    name = "pickle+zlib"
+
+    def __init__(self, level: int = 6):
+        """
+        :param level: zlib compression level (1-9)
+        """
+        self.level = level
+
+    def encode(self, value: Any) -> bytes:
+        return zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self.level)
+
+    def decode(self, data: bytes) -> Any:
+        return pickle.loads(zlib.decompress(data))
+
+
+class JsonZlibCodec(Codec):
+    """Compact JSON compressed with zlib; only for JSON-compatible values."""
+    name = "json+zlib"
+
+    def __init__(self, level: int = 6):
+        """
+        :param level: zlib compression level (1-9)
+        """
+        self.level = level
+
+    def encode(self, value: Any) -> bytes:
+        data = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+        return zlib.compress(data.encode(), self.level)
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(zlib.decompress(data))
+
+
+class MsgpackZlibCodec(Codec):
+    """msgpack compressed with zlib. Requires the optional ``msgpack`` package."""
+    name = "msgpack+zlib"
+
+    def __init__(self, level: int = 6):
+        """
+        :param level: zlib compression level (1-9)
+        """
+        if msgpack is None:
+            raise ImportError(
+                "MsgpackZlibCodec requires the msgpack package (pip install msgpack)"
+            )
+        self.level = level
+
+    def encode(self, value: Any) -> bytes:
+        return zlib.compress(msgpack.packb(value, use_bin_type=True), self.level)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(zlib.decompress(data), raw=False)
+
+
+class _Records(NamedTuple):
+    """Encoded form of RecordCodec, distinct from any value a caller could store."""
+    fields: Tuple[str, ...]
+    rows: List[Tuple]
+
+
+class RecordCodec(Codec):
+    """
+    Store lists of dicts with the same keys as tuples of values.
+
+    Field names are kept once per entry instead of once per record, and
+    short string values (service names, data types, dates) are interned,
+    so equal strings are shared between entries. Values of any other shape
+    are stored as is.
+    """
+    name = "records"
+
+    def __init__(self, intern_max_length: int = 64):
+        """
+        :param intern_max_length: Longest string value to intern
+        """
+        self.intern_max_length = intern_max_length
+
+    def _intern(self, value: Any) -> Any:
+        if isinstance(value, str) and len(value) <= self.intern_max_length:
+            return sys.intern(value)
+        return value
+
+    def encode(self, value: Any) -> Any:
+        if not value or not isinstance(value, list):
+            return value
+        if not all(isinstance(item, dict) for item in value):
+            return value
+        fields = tuple(value[0])
+        if any(tuple(item) != fields for item in value):
+            return value
+        fields = tuple(sys.intern(field) for field in fields)
+        rows = [tuple(self._intern(item[field]) for field in fields) for item in value]
+        return _Records(fields, rows)
+
+    def decode(self, data: Any) -> Any:
+        if isinstance(data, _Records):
+            return [dict(zip(data.fields, row)) for row in data.rows]
+        return data
+
+
+CODECS: Dict[str, type] = {
+    codec.name: codec
+    for codec in (Codec, PickleZlibCodec, JsonZlibCodec, MsgpackZlibCodec, RecordCodec)
+}
+
+
+def get_codec(name: Optional[str]) -> Codec:
+    """
+    Codec instance by name.
+
+    :param name: One of CODECS keys (None for identity)
+    :return: Codec instance
+    """
+    if name is None:
+        return Codec()
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown cache codec {name!r}, expected one of {sorted(CODECS)}"
+        )
@@ -121,6 +121,9 @@ DATABASES = {
     }
 }
 
+# request.user загружается из сессии вместе с профилем и сводкой утечек
+AUTHENTICATION_BACKENDS = ['leaksmap.backends.ProfileModelBackend']
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -174,6 +177,10 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@leaksmap.local')
 
 # Logging configuration
+# Каталог журналов не хранится в git (см. .gitignore) — создаем при запуске
+LOG_DIR = BASE_DIR / 'leaksmap' / 'logs'
+os.makedirs(LOG_DIR, exist_ok=True)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -191,14 +198,14 @@ LOGGING = {
         'file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'leaksmap' / 'logs' / 'debug.log',
+            'filename': LOG_DIR / 'debug.log',
             'encoding': 'utf-8',
             'formatter': 'verbose',
         },
         'security_file': {
             'level': 'WARNING',
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'leaksmap' / 'logs' / 'security.log',
+            'filename': LOG_DIR / 'security.log',
             'encoding': 'utf-8',
             'formatter': 'security',
         },
@@ -224,4 +231,105 @@ CACHES = {
         'LOCATION': 'redis://127.0.0.1:6379/1',
         'TIMEOUT': 300,  # 5 minutes default
     },
+    # Общий для всех воркеров кэш ответов провайдеров (L2, см. leaksmap.tiered_cache).
+    # Файл SQLite переживает перезапуск, так что воркеры стартуют с накопленным кэшем
+    'provider_responses': {
+        'BACKEND': 'leaksmap.sqlite_cache.SQLiteCache',
+        'LOCATION': os.getenv('LEAKSMAP_API_CACHE_PATH',
+                              str(BASE_DIR / 'var' / 'provider_cache.sqlite3')),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_SIZE_GB': float(os.getenv('LEAKSMAP_API_CACHE_MAX_SIZE_GB', '1')),
+            'MMAP_SIZE_MB': int(os.getenv('LEAKSMAP_API_CACHE_MMAP_SIZE_MB', '256')),
+        },
+    },
 }
+
+# HTTP-клиенты провайдеров утечек (общая keep-alive сессия aiohttp на клиента)
+LEAKSMAP_HTTP_LIMIT_PER_HOST = int(os.getenv('LEAKSMAP_HTTP_LIMIT_PER_HOST', '10'))
+LEAKSMAP_HTTP_DNS_CACHE_TTL = int(os.getenv('LEAKSMAP_HTTP_DNS_CACHE_TTL', '300'))
+LEAKSMAP_HTTP_KEEPALIVE_TIMEOUT = float(
+    os.getenv('LEAKSMAP_HTTP_KEEPALIVE_TIMEOUT', '30')
+)
+
+# Таймауты провайдеров (сек) при параллельном опросе в BreachAggregator
+LEAKSMAP_PROVIDER_TIMEOUTS = {
+    'LeakCheck': float(os.getenv('LEAKCHECK_TIMEOUT', '10')),
+    'HaveIBeenPwned': float(os.getenv('HIBP_TIMEOUT', '10')),
+}
+
+# Массовая проверка email
+LEAKSMAP_BULK_CONCURRENCY = int(os.getenv('LEAKSMAP_BULK_CONCURRENCY', '10'))
+LEAKSMAP_BULK_MAX_EMAILS = int(os.getenv('LEAKSMAP_BULK_MAX_EMAILS', '10000'))
+LEAKSMAP_INGEST_BATCH_SIZE = int(os.getenv('LEAKSMAP_INGEST_BATCH_SIZE', '500'))
+
+# Лимиты частоты запросов к провайдерам: (запросов в минуту, размер всплеска).
+# На 429 клиент ждет Retry-After и повторяет запрос до LEAKSMAP_RATE_LIMIT_RETRIES раз.
+LEAKSMAP_PROVIDER_RATE_LIMITS = {
+    'LeakCheck': (float(os.getenv('LEAKCHECK_RATE_PER_MINUTE', '60')), 3),
+    'HaveIBeenPwned': (float(os.getenv('HIBP_RATE_PER_MINUTE', '10')), 1),
+}
+LEAKSMAP_RATE_LIMIT_RETRIES = int(os.getenv('LEAKSMAP_RATE_LIMIT_RETRIES', '3'))
+
+# Кэш ответов провайдеров (LRU с TTL). С L2_CACHE — двухуровневый: L1 в памяти
+# процесса над общим кэшем из CACHES; пустое значение оставляет только L1
+LEAKSMAP_API_CACHE = {
+    'L2_CACHE': os.getenv('LEAKSMAP_API_CACHE_L2', 'provider_responses'),
+    'L1_MAX_ENTRIES': int(os.getenv('LEAKSMAP_API_CACHE_L1_MAX_ENTRIES', '1000')),
+    'L1_MAX_BYTES': int(
+        os.getenv('LEAKSMAP_API_CACHE_L1_MAX_BYTES', str(16 * 1024 * 1024))
+    ),
+    # Максимальное время жизни записи в L1: задержка, с которой видны
+    # записи других воркеров
+    'L1_TTL': int(os.getenv('LEAKSMAP_API_CACHE_L1_TTL', '60')),
+    # Как часто сверять метку инвалидаций (сек); 0 отключает рассылку delete/clear
+    'SYNC_INTERVAL': float(os.getenv('LEAKSMAP_API_CACHE_SYNC_INTERVAL', '5')),
+    'MAX_ENTRIES': int(os.getenv('LEAKSMAP_API_CACHE_MAX_ENTRIES', '10000')),
+    'MAX_BYTES': int(
+        os.getenv('LEAKSMAP_API_CACHE_MAX_BYTES', str(64 * 1024 * 1024))
+    ),
+    'TTL': int(os.getenv('LEAKSMAP_API_CACHE_TTL', '3600')),
+    # Кодек значений в памяти воркера (см. cache.codecs,
+    # сравнение — benchmark_cache_codecs)
+    'CODEC': os.getenv('LEAKSMAP_API_CACHE_CODEC', 'records'),
+    # Отдельный, более короткий TTL для ответов «утечек нет»
+    'NEGATIVE_TTL': int(os.getenv('LEAKSMAP_API_CACHE_NEGATIVE_TTL', '900')),
+    # Сколько устаревшая запись хранится как запасной ответ
+    # при недоступном провайдере
+    'STALE_TTL': int(
+        os.getenv('LEAKSMAP_API_CACHE_STALE_TTL', str(7 * 24 * 3600))
+    ),
+}
+
+# Сколько адресов с устаревшими данными обновляется фоном после каждого
+# успешного запроса: обновления тратят тот же лимит частоты, что и пользователи
+LEAKSMAP_STALE_REFRESH_BATCH = int(os.getenv('LEAKSMAP_STALE_REFRESH_BATCH', '3'))
+
+# Circuit breaker провайдеров: размыкается, если в последних WINDOW вызовах
+# доля ошибок и вызовов дольше SLOW_CALL_SECONDS не меньше FAILURE_RATE
+LEAKSMAP_CIRCUIT_BREAKER = {
+    'failure_rate': float(os.getenv('LEAKSMAP_BREAKER_FAILURE_RATE', '0.5')),
+    'slow_call_seconds': float(os.getenv('LEAKSMAP_BREAKER_SLOW_CALL_SECONDS', '5')),
+    'window': int(os.getenv('LEAKSMAP_BREAKER_WINDOW', '20')),
+    'min_calls': int(os.getenv('LEAKSMAP_BREAKER_MIN_CALLS', '5')),
+    'open_seconds': float(os.getenv('LEAKSMAP_BREAKER_OPEN_SECONDS', '30')),
+}
+
+# Локальный каталог утечек HIBP (обновляется командой sync_hibp_catalog);
+# клиент перечитывает его из базы не чаще раза в указанное число секунд
+LEAKSMAP_HIBP_CATALOG_RELOAD = int(os.getenv('LEAKSMAP_HIBP_CATALOG_RELOAD', '600'))
+
+# Кэш диапазонов Pwned Passwords (по префиксу SHA-1) в базе, секунды
+LEAKSMAP_PWNED_PASSWORDS_TTL = int(
+    os.getenv('LEAKSMAP_PWNED_PASSWORDS_TTL', str(7 * 24 * 3600))
+)
+
+# Очередь фоновых проверок (python manage.py run_breach_worker)
+LEAKSMAP_JOB_CONCURRENCY = int(os.getenv('LEAKSMAP_JOB_CONCURRENCY', '4'))
+LEAKSMAP_JOB_POLL_INTERVAL = float(os.getenv('LEAKSMAP_JOB_POLL_INTERVAL', '0.5'))
+# Задача в статусе running дольше этого времени возвращается в очередь
+# при старте воркера
+LEAKSMAP_JOB_STALE_TIMEOUT = int(os.getenv('LEAKSMAP_JOB_STALE_TIMEOUT', '300'))
+
+# Экспорт HTML-отчета: сколько утечек читается из базы и рендерится за раз
+LEAKSMAP_EXPORT_CHUNK_SIZE = int(os.getenv('LEAKSMAP_EXPORT_CHUNK_SIZE', '2000'))
@@ -0,0 +1,211 @@
+"""
+Параллельный опрос всех настроенных провайдеров утечек с объединением результатов.
+"""
+import asyncio
+import logging
+import os
+import re
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from .api_client import (
+    BaseBreachAPIClient,
+    get_hibp_client,
+    get_leakcheck_client,
+    get_setting,
+)
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = "Unknown"
+
+# Статусы, при которых провайдер действительно ответил (см. api_client.BreachLookup)
+ANSWERED_STATUSES = ("ok", "stale")
+
+
+def normalize_service_name(name: Optional[str]) -> str:
+    """Ключ дедупликации: имя сервиса без регистра, пробелов и пунктуации."""
+    return re.sub(r"[^a-z0-9]", "", (name or "").lower())
+
+
+def providers_answered(providers: Dict[str, str]) -> bool:
+    """
+    Ответил ли хотя бы один провайдер.
+
+    Если все вернули error, timeout, throttled или unavailable, пустой список
+    утечек означает «неизвестно», а не «утечек нет».
+    """
+    return any(status in ANSWERED_STATUSES for status in providers.values())
+
+
+def _merge_values(first: Optional[str], second: Optional[str]) -> Optional[str]:
+    """Первое известное значение (Unknown/пустое считается неизвестным)."""
+    if first and first != UNKNOWN:
+        return first
+    return second if second else first
+
+
+def _merge_list_field(first: Optional[str], second: Optional[str]) -> str:
+    """Объединение полей-перечислений через запятую без повторов."""
+    items: List[str] = []
+    for value in (first, second):
+        for item in (value or "").split(","):
+            item = item.strip()
+            if item and item != UNKNOWN and item not in items:
+                items.append(item)
+    return ", ".join(items) or UNKNOWN
+
+
+def merge_breaches(results: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    """
+    Объединить стандартизированные списки утечек разных провайдеров.
+
+    Записи с одинаковым нормализованным именем сервиса сливаются в одну:
+    известные поля дополняют неизвестные, типы данных и источники объединяются.
+
+    :param results: Списки утечек в формате _standardize_*_data
+    :return: Дедуплицированный список в том же формате
+    """
+    merged: Dict[str, Dict[str, str]] = {}
+    for breaches in results:
+        for breach in breaches:
+            key = normalize_service_name(breach.get("service_name"))
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = dict(breach)
+                continue
+            for field in ("breach_date", "location", "description"):
+                existing[field] = _merge_values(existing.get(field), breach.get(field))
+            for field in ("data_type", "source"):
+                existing[field] = _merge_list_field(
+                    existing.get(field), breach.get(field)
+                )
+    return list(merged.values())
+
+
+class BreachAggregator:
+    """
+    Одновременный запрос ко всем провайдерам, у каждого свой таймаут.
+
+    Медленный или недоступный провайдер не блокирует остальные: его результат
+    просто отсутствует в объединенном списке (или взят из устаревшего кэша),
+    а статус попадает в ``providers``.
+    """
+
+    def __init__(self, clients: List[BaseBreachAPIClient],
+                 timeouts: Optional[Dict[str, float]] = None,
+                 default_timeout: float = 10.0):
+        self.clients = clients
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+
+    def _timeout_for(self, client: BaseBreachAPIClient) -> float:
+        return self.timeouts.get(client.PROVIDER_NAME, self.default_timeout)
+
+    async def _query(self, client: BaseBreachAPIClient, email: str):
+        timeout = self._timeout_for(client)
+        try:
+            result = await asyncio.wait_for(
+                client.lookup(email, timeout=timeout), timeout
+            )
+            return result.breaches, result.status
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"{client.PROVIDER_NAME} timed out after {timeout}s for {email}"
+            )
+            return [], "timeout"
+        except Exception as e:
+            logger.error(f"{client.PROVIDER_NAME} failed for {email}: {e}")
+            return [], "error"
+
+    async def get_breach_info_by_email(self, email: str) -> Dict:
+        """
+        Опросить всех провайдеров параллельно.
+
+        :param email: Проверяемый email
+        :return: {"breaches": объединенный список, "providers": {имя: статус}}
+        """
+        results = await asyncio.gather(
+            *(self._query(client, email) for client in self.clients)
+        )
+        return {
+            "breaches": merge_breaches([breaches for breaches, _ in results]),
+            "providers": {
+                client.PROVIDER_NAME: status
+                for client, (_, status) in zip(self.clients, results)
+            },
+        }
+
+    async def iter_providers(
+        self, email: str
+    ) -> AsyncIterator[Tuple[str, List[Dict], str]]:
+        """
+        Опросить провайдеров параллельно, отдавая ответ каждого сразу по готовности.
+
+        :param email: Проверяемый email
+        :return: Асинхронный итератор троек (провайдер, утечки, статус)
+        """
+        async def query(client: BaseBreachAPIClient):
+            breaches, status = await self._query(client, email)
+            return client.PROVIDER_NAME, breaches, status
+
+        tasks = [asyncio.create_task(query(client)) for client in self.clients]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Клиент отключился раньше, чем ответили все провайдеры
+            for task in tasks:
+                task.cancel()
+
+    async def iter_many(self, emails: List[str],
+                        concurrency: int = 10) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Проверить список адресов, не более ``concurrency`` одновременно.
+
+        Результаты отдаются по мере готовности, а не в исходном порядке.
+
+        :param emails: Проверяемые адреса
+        :param concurrency: Максимум одновременных проверок, не меньше 1
+        :return: Асинхронный итератор пар (email, результат get_breach_info_by_email)
+        """
+        # Без воркеров ожидание done.get() никогда не закончилось бы
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        pending: asyncio.Queue = asyncio.Queue()
+        for email in emails:
+            pending.put_nowait(email)
+        done: asyncio.Queue = asyncio.Queue()
+
+        async def worker():
+            while True:
+                try:
+                    email = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await done.put((email, await self.get_breach_info_by_email(email)))
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(min(concurrency, len(emails)))
+        ]
+        try:
+            for _ in range(len(emails)):
+                yield await done.get()
+        finally:
+            for task in workers:
+                task.cancel()
+
+
+def get_breach_aggregator() -> BreachAggregator:
+    """Агрегатор по всем провайдерам, для которых настроен API-ключ."""
+    clients: List[BaseBreachAPIClient] = []
+    leakcheck_key = (
+        get_setting('LEAKCHECK_API_KEY', None) or os.getenv('LEAKCHECK_API_KEY')
+    )
+    if leakcheck_key:
+        clients.append(get_leakcheck_client(leakcheck_key))
+    hibp_key = get_setting('HIBP_API_KEY', None) or os.getenv('HIBP_API_KEY')
+    if hibp_key:
+        clients.append(get_hibp_client(hibp_key))
+    timeouts = get_setting('LEAKSMAP_PROVIDER_TIMEOUTS', {})
+    return BreachAggregator(clients, timeouts=timeouts)
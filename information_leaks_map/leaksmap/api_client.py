@@ -1,9 +1,19 @@
 import aiohttp
-from typing import List, Dict, Optional
+import asyncio
+import atexit
+import threading
+import time
+import weakref
+from typing import List, Dict, NamedTuple, Optional
 import re
 import os
 import logging
 from django.conf import settings  # Для Django settings
+from cache.cache_manager import CacheManager
+from cache.codecs import get_codec
+from .circuit_breaker import CLOSED, get_breaker
+from .singleflight import SingleFlight
+from .throttling import get_bucket, parse_retry_after
 
 # Локальные утилиты (замените на ваши)
 def validate_email(email: str) -> bool:
@@ -11,62 +21,358 @@ def validate_email(email: str) -> bool:
     pattern = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
     return re.match(pattern, email) is not None
 
+
+def normalize_email(email: str) -> str:
+    """Канонический вид email для ключей кэша и объединения запросов."""
+    return email.strip().lower()
+
+
 logger = logging.getLogger(__name__)
 
-class SimpleCacheManager:
-    """Простой in-memory кэш (замените на redis/memcached)."""
-    def __init__(self):
-        self.cache = {}
-    
-    def get(self, url: str, params: dict) -> Optional[List[Dict]]:
-        key = f"{url}:{hash(frozenset(params.items()))}"
-        return self.cache.get(key)
-    
-    def set(self, url: str, params: dict, data: List[Dict], ttl: int = 3600):
-        key = f"{url}:{hash(frozenset(params.items()))}"
-        self.cache[key] = data
-
-class LeakCheckAPIClient:
-    """Клиент для LeakCheck API."""
-    
-    BASE_URL = "https://leakcheck.io/api/public"
-    
-    def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key or getattr(settings, 'LEAKCHECK_API_KEY', os.getenv('LEAKCHECK_API_KEY'))
-        if not self.api_key:
-            raise ValueError("LEAKCHECK_API_KEY required")
-        self.cache = SimpleCacheManager()
-    
+
+def get_setting(name: str, default):
+    """Значение из Django settings (или default, если settings не настроены)."""
+    if settings.configured:
+        return getattr(settings, name, default)
+    return default
+
+
+def create_api_cache():
+    """
+    Кэш ответов провайдера с параметрами из LEAKSMAP_API_CACHE.
+
+    Если задан L2_CACHE (алиас из CACHES), возвращается TieredCache, общий
+    для всех воркеров, иначе — CacheManager только этого процесса. Значения
+    в памяти процесса хранятся через кодек CODEC (см. cache.codecs).
+    """
+    options = get_setting('LEAKSMAP_API_CACHE', {})
+    codec = get_codec(options.get('CODEC', 'records'))
+    if options.get('L2_CACHE'):
+        from django.core.cache import caches
+        from .tiered_cache import TieredCache
+
+        return TieredCache(
+            caches[options['L2_CACHE']],
+            l1_max_entries=options.get('L1_MAX_ENTRIES', 1000),
+            l1_max_bytes=options.get('L1_MAX_BYTES', 16 * 1024 * 1024),
+            l1_ttl=options.get('L1_TTL', 60),
+            l1_codec=codec,
+            default_ttl=options.get('TTL', 3600),
+            stale_ttl=options.get('STALE_TTL', 0),
+            sync_interval=options.get('SYNC_INTERVAL', 5),
+        )
+    return CacheManager(
+        max_entries=options.get('MAX_ENTRIES', 10000),
+        max_bytes=options.get('MAX_BYTES', 64 * 1024 * 1024),
+        default_ttl=options.get('TTL', 3600),
+        stale_ttl=options.get('STALE_TTL', 0),
+        codec=codec,
+    )
+
+
+def get_negative_cache_ttl() -> int:
+    """TTL для ответов «утечек нет» (короче обычного, адрес может утечь завтра)."""
+    return get_setting('LEAKSMAP_API_CACHE', {}).get('NEGATIVE_TTL', 900)
+
+
+class ProviderError(Exception):
+    """Провайдер вернул ошибку (неверный ключ, исчерпан лимит и т.п.)."""
+
+
+class ProviderRateLimitError(ProviderError):
+    """Провайдер продолжает отвечать 429 после всех повторов."""
+
+
+class ProviderThrottledError(ProviderError):
+    """Токен в bucket провайдера не накопился бы до истечения таймаута запроса."""
+
+
+class BreachLookup(NamedTuple):
+    """Результат проверки у одного провайдера."""
+    breaches: List[Dict[str, str]]
+    # ok — свежие данные; stale — устаревшие из кэша (провайдер недоступен);
+    # unavailable — провайдер недоступен и в кэше ничего нет; error — ошибка запроса;
+    # throttled — лимит частоты не дал отправить запрос в пределах таймаута
+    status: str
+
+
+# Идущие сейчас запросы к провайдерам, ключ — (провайдер, email)
+_inflight = SingleFlight()
+
+# Все клиенты процесса, чьи сессии нужно закрыть при завершении
+_clients: "weakref.WeakSet[BaseAPIClient]" = weakref.WeakSet()
+
+
+class BaseAPIClient:
+    """
+    Базовый HTTP-клиент провайдера с общей keep-alive сессией aiohttp.
+
+    Сессия создается лениво при первом запросе и переиспользуется всеми
+    последующими проверками, поэтому DNS, TCP и TLS не повторяются на каждый
+    email. aiohttp привязывает сессию к event loop, поэтому хранится по одной
+    сессии на каждый loop, в котором работает клиент.
+    """
+
+    PROVIDER_NAME = ""
+    # Лимит по умолчанию: (запросов в минуту, размер всплеска)
+    DEFAULT_RATE_LIMIT = (60, 1)
+
+    def __init__(self, limit_per_host: Optional[int] = None,
+                 dns_cache_ttl: Optional[int] = None,
+                 keepalive_timeout: Optional[float] = None,
+                 max_rate_limit_retries: Optional[int] = None):
+        self.limit_per_host = (
+            limit_per_host or get_setting('LEAKSMAP_HTTP_LIMIT_PER_HOST', 10)
+        )
+        self.dns_cache_ttl = (
+            dns_cache_ttl or get_setting('LEAKSMAP_HTTP_DNS_CACHE_TTL', 300)
+        )
+        self.keepalive_timeout = (
+            keepalive_timeout or get_setting('LEAKSMAP_HTTP_KEEPALIVE_TIMEOUT', 30.0)
+        )
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        _clients.add(self)
+
+        per_minute, burst = get_setting('LEAKSMAP_PROVIDER_RATE_LIMITS', {}).get(
+            self.PROVIDER_NAME, self.DEFAULT_RATE_LIMIT
+        )
+        self.throttle = get_bucket(self.PROVIDER_NAME, per_minute, burst)
+        if max_rate_limit_retries is None:
+            max_rate_limit_retries = get_setting('LEAKSMAP_RATE_LIMIT_RETRIES', 3)
+        self.max_rate_limit_retries = max_rate_limit_retries
+
+        self.breaker = get_breaker(
+            self.PROVIDER_NAME, **get_setting('LEAKSMAP_CIRCUIT_BREAKER', {})
+        )
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Общая сессия для текущего event loop (создается при первом обращении)."""
+        loop = asyncio.get_running_loop()
+        # Сессии закрытых loop'ов уже непригодны, просто забываем их
+        for stale_loop in [loop for loop in self._sessions if loop.is_closed()]:
+            del self._sessions[stale_loop]
+
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = self._create_session()
+            self._sessions[loop] = session
+        return session
+
+    async def _get_json(self, url: str, timeout: float, not_found_ok: bool = False,
+                        **kwargs):
+        """
+        GET-запрос через общий token bucket провайдера, ответ — JSON.
+
+        На 429 bucket ставится на паузу по Retry-After (пауза действует на все
+        корутины процесса), и запрос повторяется, а не считается ошибкой.
+        С ``not_found_ok`` ответ 404 означает «данных нет» и возвращается как None.
+        """
+        return await self._get(url, timeout, not_found_ok,
+                               lambda resp: resp.json(), **kwargs)
+
+    async def _get_text(self, url: str, timeout: float, not_found_ok: bool = False,
+                        **kwargs):
+        """То же, что _get_json, но ответ — текст."""
+        return await self._get(url, timeout, not_found_ok,
+                               lambda resp: resp.text(), **kwargs)
+
+    async def _get(self, url: str, timeout: float, not_found_ok: bool, read, **kwargs):
+        # Ожидание токена входит в timeout: запрос, ответ на который уже никто
+        # не ждет, не должен расходовать квоту провайдера
+        deadline = time.monotonic() + timeout
+        session = await self._get_session()
+        for attempt in range(self.max_rate_limit_retries + 1):
+            if not await self.throttle.acquire(deadline - time.monotonic()):
+                raise ProviderThrottledError(
+                    f"{self.PROVIDER_NAME}: no rate limit slot within {timeout}s"
+                )
+            # Задержка для circuit breaker считается без ожидания в token bucket
+            started = time.monotonic()
+            request_timeout = aiohttp.ClientTimeout(
+                total=max(deadline - started, 0.001)
+            )
+            try:
+                async with session.get(url, timeout=request_timeout, **kwargs) as resp:
+                    if resp.status == 429:
+                        delay = parse_retry_after(resp.headers.get("Retry-After"))
+                        logger.warning(f"{self.PROVIDER_NAME} rate limited, "
+                                       f"pausing for {delay:.1f}s")
+                        self.throttle.pause(delay)
+                        continue
+                    if resp.status == 404 and not_found_ok:
+                        data = None
+                    else:
+                        resp.raise_for_status()
+                        data = await read(resp)
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success(time.monotonic() - started)
+            return data
+        raise ProviderRateLimitError(
+            f"{self.PROVIDER_NAME}: rate limit retries exhausted"
+        )
+
+    async def close(self) -> None:
+        """Закрыть сессию текущего event loop."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+
+class BaseBreachAPIClient(BaseAPIClient):
+    """
+    Базовый клиент провайдера утечек: проверка email с кэшем, объединением
+    одинаковых запросов и запасным ответом из кэша при недоступном провайдере.
+    """
+
+    def __init__(self, **pool_options):
+        super().__init__(**pool_options)
+        self.cache = create_api_cache()
+        self.negative_ttl = get_negative_cache_ttl()
+        # Адреса, которым отдали устаревшие данные: обновятся, когда провайдер оживет
+        self._stale_emails: Dict[str, str] = {}
+        self._refresh_tasks = set()
+        self.stale_refresh_batch = get_setting('LEAKSMAP_STALE_REFRESH_BATCH', 3)
+
     def _validate_email(self, email: str) -> bool:
         return validate_email(email)
-    
-    async def get_breach_info_by_email(self, email: str, timeout: float = 10.0) -> List[Dict[str, str]]:
-        """Асинхронный запрос к LeakCheck API."""
+
+    def _cache_params(self, email: str) -> Dict[str, str]:
+        """
+        Параметры ключа кэша при PROVIDER_NAME: нормализованный email,
+        без API-ключа.
+        """
+        return {"email": normalize_email(email)}
+
+    async def _request(self, email: str, timeout: float) -> List[Dict[str, str]]:
+        """Запрос к API провайдера, возвращает стандартизированный список."""
+        raise NotImplementedError
+
+    async def get_breach_info_by_email(self, email: str,
+                                       timeout: float = 10.0) -> List[Dict[str, str]]:
+        """Утечки для email (см. lookup)."""
+        return (await self.lookup(email, timeout)).breaches
+
+    async def lookup(self, email: str, timeout: float = 10.0) -> BreachLookup:
+        """
+        Утечки для email из кэша или от провайдера, со статусом ответа.
+
+        Одновременные проверки одного адреса у одного провайдера объединяются:
+        в сеть уходит один запрос, остальные вызовы ждут его результат.
+        Пока circuit breaker разомкнут или запрос упал, отдаются последние
+        данные из кэша (даже устаревшие) со статусом ``stale``.
+        """
         if not self._validate_email(email):
             logger.error(f"Invalid email: {email}")
-            return []
-        
-        params = {"key": self.api_key, "check": email}
-        cache_key = (self.BASE_URL, params)
-        cached = self.cache.get(self.BASE_URL, params)
-        if cached:
-            return cached
-        
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            return BreachLookup([], "error")
+
+        # [] в кэше — валидный ответ «утечек нет», промах — это None
+        cached = await self.cache.aget(self.PROVIDER_NAME, self._cache_params(email))
+        if cached is not None:
+            return BreachLookup(cached, "ok")
+
+        if not self.breaker.allow_request():
+            return await self._stale_fallback(email)
+
+        try:
+            breaches = await _inflight.do(
+                (self.PROVIDER_NAME, normalize_email(email)),
+                lambda: self._fetch(email, timeout),
+            )
+        except ProviderThrottledError as e:
+            logger.warning(str(e))
+            return await self._stale_fallback(email, status="throttled")
+        except Exception as e:
+            logger.error(f"{self.PROVIDER_NAME} API error for {email}: {e}")
+            return await self._stale_fallback(email, status="error")
+        return BreachLookup(breaches, "ok")
+
+    async def _fetch(self, email: str, timeout: float) -> List[Dict[str, str]]:
+        breaches = await self._request(email, timeout)
+        # Ошибки не кэшируются, пустой ответ кэшируется на меньший срок
+        ttl = None if breaches else self.negative_ttl
+        await self.cache.aset(self.PROVIDER_NAME, self._cache_params(email),
+                              breaches, ttl)
+        if self._stale_emails and self.breaker.state == CLOSED:
+            self._schedule_stale_refresh(timeout)
+        return breaches
+
+    async def _stale_fallback(self, email: str,
+                              status: str = "unavailable") -> BreachLookup:
+        stale = await self.cache.aget_stale(self.PROVIDER_NAME,
+                                            self._cache_params(email))
+        if stale is None:
+            return BreachLookup([], status)
+        if len(self._stale_emails) < self.cache.max_entries:
+            self._stale_emails[normalize_email(email)] = email
+        return BreachLookup(stale, "stale")
+
+    def _schedule_stale_refresh(self, timeout: float) -> None:
+        if self._refresh_tasks:
+            return
+        task = asyncio.get_running_loop().create_task(self._refresh_stale(timeout))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh_stale(self, timeout: float) -> None:
+        """
+        Фоново обновить записи, которые отдавались устаревшими.
+
+        За один проход — не больше ``stale_refresh_batch`` адресов: остальные
+        обновят следующие проходы, и фоновые запросы не вытесняют
+        пользовательские из лимита частоты провайдера.
+        """
+        for _ in range(self.stale_refresh_batch):
+            if not self._stale_emails or self.breaker.state != CLOSED:
+                return
+            key, email = self._stale_emails.popitem()
             try:
-                async with session.get(self.BASE_URL, params=params) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    
-                    if data.get("success"):
-                        breaches = self._standardize_leakcheck_data(data.get("sources", []))
-                        self.cache.set(self.BASE_URL, params, breaches)
-                        return breaches
-                    return []
+                await _inflight.do((self.PROVIDER_NAME, key),
+                                   lambda: self._fetch(email, timeout))
             except Exception as e:
-                logger.error(f"LeakCheck API error for {email}: {e}")
-                return []
-    
+                logger.warning(
+                    f"{self.PROVIDER_NAME} background refresh failed for {email}: {e}"
+                )
+                self._stale_emails.setdefault(key, email)
+                return
+
+
+class LeakCheckAPIClient(BaseBreachAPIClient):
+    """Клиент для LeakCheck API."""
+
+    PROVIDER_NAME = "LeakCheck"
+    DEFAULT_RATE_LIMIT = (60, 3)
+    BASE_URL = "https://leakcheck.io/api/public"
+
+    def __init__(self, api_key: Optional[str] = None, **pool_options):
+        self.api_key = api_key or getattr(settings, 'LEAKCHECK_API_KEY',
+                                          os.getenv('LEAKCHECK_API_KEY'))
+        if not self.api_key:
+            raise ValueError("LEAKCHECK_API_KEY required")
+        super().__init__(**pool_options)
+
+    async def _request(self, email: str, timeout: float) -> List[Dict[str, str]]:
+        """Асинхронный запрос к LeakCheck API."""
+        params = {"key": self.api_key, "check": email}
+        data = await self._get_json(self.BASE_URL, timeout, params=params)
+        if data.get("success"):
+            return self._standardize_leakcheck_data(data.get("sources", []))
+        # «Not found» — адрес чист; остальные ошибки (ключ, лимит) не кэшируем
+        error = str(data.get("error", ""))
+        if error.lower() == "not found":
+            return []
+        raise ProviderError(f"LeakCheck error: {error or 'unknown'}")
+
     def _standardize_leakcheck_data(self, sources: List[Dict]) -> List[Dict[str, str]]:
         """Стандартизация данных LeakCheck."""
         return [{
@@ -75,65 +381,158 @@ class LeakCheckAPIClient:
             "location": s.get("location", "Unknown"),
             "data_type": s.get("data_type", "Unknown"),
             "description": s.get("description", "Breach detected"),
-            "source": "LeakCheck"
+            "source": self.PROVIDER_NAME
         } for s in sources]
 
-class HaveIBeenPwnedAPIClient:
+
+class HaveIBeenPwnedAPIClient(BaseBreachAPIClient):
     """Клиент для HaveIBeenPwned API."""
-    
+
+    PROVIDER_NAME = "HaveIBeenPwned"
+    # Минимальный платный тариф HIBP: 10 запросов в минуту
+    DEFAULT_RATE_LIMIT = (10, 1)
     BASE_URL = "https://haveibeenpwned.com/api/v3"
-    
-    def __init__(self, api_key: Optional[str] = None):
+
+    def __init__(self, api_key: Optional[str] = None, **pool_options):
         self.api_key = api_key or getattr(settings, 'HIBP_API_KEY', os.getenv('HIBP_API_KEY'))
         if not self.api_key:
             raise ValueError("HIBP_API_KEY required")
-        self.cache = SimpleCacheManager()
-    
-    async def get_breach_info_by_email(self, email: str, timeout: float = 10.0) -> List[Dict[str, str]]:
-        """Асинхронный запрос к HIBP API."""
-        if not validate_email(email):
-            logger.error(f"Invalid email: {email}")
-            return []
-        
+        super().__init__(**pool_options)
+        # Локальный каталог утечек; по умолчанию общий для процесса
+        self.catalog = None
+
+    async def _request(self, email: str, timeout: float) -> List[Dict[str, str]]:
+        """
+        Асинхронный запрос к HIBP API.
+
+        HIBP отдает только имена утечек (truncateResponse), подробности
+        берутся из локального каталога (см. hibp_catalog).
+        """
         url = f"{self.BASE_URL}/breachedaccount/{email}"
-        headers = {
+        # HIBP отвечает 404, если адрес не найден ни в одной утечке
+        data = await self._get_json(
+            url, timeout, not_found_ok=True,
+            headers=self._headers(), params={"truncateResponse": "true"},
+        )
+        if data is None:
+            return []
+        names = [b["Name"] for b in data if b.get("Name")]
+        try:
+            catalog = await self._get_catalog().get_many(names)
+        except Exception as e:
+            logger.warning(f"HIBP catalog unavailable, returning names only: {e}")
+            catalog = {}
+        return self._standardize_hibp_data(data, catalog)
+
+    async def get_breach_catalog(self, timeout: float = 30.0) -> List[Dict]:
+        """Полный публичный каталог утечек (/breaches)."""
+        return await self._get_json(f"{self.BASE_URL}/breaches", timeout,
+                                    headers=self._headers())
+
+    def _headers(self) -> Dict[str, str]:
+        return {
             "hibp-api-key": self.api_key,
             "user-agent": "LeaksMap/1.0"
         }
-        
-        cached = self.cache.get(url, {"email": email})
-        if cached:
-            return cached
-        
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+
+    def _get_catalog(self):
+        if self.catalog is None:
+            from .hibp_catalog import get_breach_catalog
+            self.catalog = get_breach_catalog()
+        return self.catalog
+
+    def _standardize_hibp_data(self, breaches: List[Dict],
+                               catalog: Optional[Dict[str, Dict]] = None
+                               ) -> List[Dict[str, str]]:
+        """Стандартизация данных HIBP (поля ответа дополняются записью каталога)."""
+        catalog = catalog or {}
+        result = []
+        for b in breaches:
+            name = b.get("Name", "Unknown")
+            entry = catalog.get(name, {})
+            data_classes = b.get("DataClasses") or entry.get("data_classes") or []
+            breach_date = b.get("BreachDate") or entry.get("breach_date")
+            result.append({
+                "service_name": name,
+                "breach_date": str(breach_date) if breach_date else "Unknown",
+                "location": "Unknown",
+                "data_type": ", ".join(data_classes) or "Unknown",
+                "description": (b.get("Description") or entry.get("description")
+                                or "Breach detected"),
+                "source": self.PROVIDER_NAME
+            })
+        return result
+
+
+# ========== ФОНОВЫЙ EVENT LOOP ДЛЯ СИНХРОННЫХ VIEW ==========
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Долгоживущий event loop в отдельном потоке (общий для всего процесса)."""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None or _background_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever,
+                                      name="leaksmap-api-loop", daemon=True)
+            thread.start()
+            _background_loop = loop
+        return _background_loop
+
+
+def run_sync(coro, timeout: Optional[float] = None):
+    """
+    Выполнить корутину из синхронного кода.
+
+    В отличие от asyncio.run, loop не создается заново на каждый вызов,
+    так что keep-alive соединения клиентов переживают запрос.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_background_loop())
+    return future.result(timeout)
+
+
+@atexit.register
+def close_all_sessions() -> None:
+    """Закрыть сессии всех клиентов при завершении процесса."""
+    for client in list(_clients):
+        for loop, session in list(client._sessions.items()):
+            if session.closed or loop.is_closed():
+                continue
             try:
-                async with session.get(url, headers=headers) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    
-                    breaches = self._standardize_hibp_data(data)
-                    self.cache.set(url, {"email": email}, breaches)
-                    return breaches
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(session.close(), loop).result(5)
+                else:
+                    loop.run_until_complete(session.close())
             except Exception as e:
-                logger.error(f"HIBP API error for {email}: {e}")
-                return []
-    
-    def _standardize_hibp_data(self, breaches: List[Dict]) -> List[Dict[str, str]]:
-        """Стандартизация данных HIBP."""
-        return [{
-            "service_name": b.get("Name", "Unknown"),
-            "breach_date": b.get("BreachDate", "Unknown"),
-            "location": "Unknown",
-            "data_type": ", ".join(b.get("DataClasses", [])) or "Unknown",
-            "description": b.get("Description", "Breach detected"),
-            "source": "HaveIBeenPwned"
-        } for b in breaches]
-
-# Backward compatibility
-def get_leakcheck_client(api_key: str):
-    """Для совместимости с views.py."""
-    return LeakCheckAPIClient(api_key)
-
-def get_hibp_client(api_key: str):
-    """Для совместимости с views.py."""
-    return HaveIBeenPwnedAPIClient(api_key)
\ No newline at end of file
+                logger.warning(f"Error closing HTTP session: {e}")
+        client._sessions.clear()
+
+    if _background_loop is not None and not _background_loop.is_closed():
+        _background_loop.call_soon_threadsafe(_background_loop.stop)
+
+
+# ========== ОБЩИЕ КЛИЕНТЫ ==========
+_shared_clients: Dict[tuple, BaseAPIClient] = {}
+_shared_clients_lock = threading.Lock()
+
+
+def _get_shared_client(client_class, api_key: Optional[str]):
+    key = (client_class, api_key)
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = client_class(api_key)
+            _shared_clients[key] = client
+        return client
+
+
+def get_leakcheck_client(api_key: Optional[str] = None) -> LeakCheckAPIClient:
+    """Общий для процесса клиент LeakCheck (одна пулированная сессия на ключ)."""
+    return _get_shared_client(LeakCheckAPIClient, api_key)
+
+
+def get_hibp_client(api_key: Optional[str] = None) -> HaveIBeenPwnedAPIClient:
+    """Общий для процесса клиент HIBP (одна пулированная сессия на ключ)."""
+    return _get_shared_client(HaveIBeenPwnedAPIClient, api_key)
@@ -0,0 +1,24 @@
+"""
+Backend аутентификации, загружающий пользователя вместе с профилем и сводкой.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend, у которого request.user приходит из сессии одним запросом
+    с ``select_related('profile', 'breach_summary')``.
+
+    Страницы профиля берут профиль и сводку из кэша объекта user
+    (см. get_user_profile и summary.get_summary) без отдельных запросов.
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager \
+                .select_related('profile', 'breach_summary').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
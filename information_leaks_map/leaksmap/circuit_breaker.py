@@ -0,0 +1,122 @@
+"""
+Circuit breaker для провайдеров утечек.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Размыкается, когда доля неудачных вызовов в скользящем окне превышает порог.
+
+    Неудачным считается вызов с ошибкой или дольше ``slow_call_seconds``.
+    В разомкнутом состоянии ``allow_request`` сразу возвращает False, через
+    ``open_seconds`` пропускается один пробный запрос (half-open): его успех
+    замыкает цепь, неудача — снова размыкает.
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 5.0, window: int = 20,
+                 min_calls: int = 5, open_seconds: float = 30.0):
+        """
+        :param name: Имя провайдера (для логов)
+        :param failure_rate: Доля неудачных вызовов, при которой цепь размыкается
+        :param slow_call_seconds: Порог задержки, выше которого вызов считается
+            неудачным
+        :param window: Размер скользящего окна (число последних вызовов)
+        :param min_calls: Минимум вызовов в окне для принятия решения
+        :param open_seconds: Сколько цепь остается разомкнутой до пробного запроса
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if (self._state == OPEN
+                    and time.monotonic() - self._opened_at >= self.open_seconds):
+                return HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Можно ли сейчас обращаться к провайдеру."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self._state = HALF_OPEN
+                self._trial_started = None
+            # HALF_OPEN: пропускаем только один пробный запрос; если его исход
+            # так и не был учтен (отмена, 429), через open_seconds пускаем следующий
+            now = time.monotonic()
+            if (self._trial_started is not None
+                    and now - self._trial_started < self.open_seconds):
+                return False
+            self._trial_started = now
+            return True
+
+    def record_success(self, duration: float) -> None:
+        """Учесть завершенный вызов (медленный считается неудачным)."""
+        if duration > self.slow_call_seconds:
+            logger.warning(f"{self.name}: slow call ({duration:.1f}s)")
+            self.record_failure()
+            return
+        with self._lock:
+            if self._state == OPEN:
+                # Запрос, начатый до размыкания, не повод замыкать цепь
+                return
+            if self._state == HALF_OPEN:
+                logger.info(f"{self.name}: circuit closed")
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (self._state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def _open(self) -> None:
+        logger.warning(f"{self.name}: circuit opened for {self.open_seconds}s")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._trial_started = None
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, **options) -> CircuitBreaker:
+    """Общий для процесса circuit breaker провайдера."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **options)
+            _breakers[name] = breaker
+        return breaker
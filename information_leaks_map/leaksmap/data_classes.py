@@ -0,0 +1,142 @@
+"""
+Классы данных утечек (Email addresses, Passwords, ...) как битовая маска.
+
+Каждому классу при первой встрече выдается номер бита в таблице DataClass,
+а Breach хранит набор классов одним целым числом ``data_classes``. Фильтр по
+типу данных становится битовой операцией над целым вместо LIKE по строке.
+"""
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = "Unknown"
+
+# BigIntegerField знаковый, поэтому доступны биты 0..62
+MAX_BITS = 63
+
+
+def split_data_type(value: Optional[str]) -> List[str]:
+    """Разбить строку провайдера «A, B, C» на имена классов без повторов."""
+    names: List[str] = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if item and item != UNKNOWN and item not in names:
+            names.append(item)
+    return names
+
+
+class DataClassRegistry:
+    """
+    Соответствие имя класса <-> бит, общее для процесса.
+
+    Таблица DataClass маленькая и почти не меняется, поэтому она целиком
+    держится в памяти и перечитывается, только когда встречается незнакомое
+    имя или бит (его мог добавить другой процесс).
+    """
+
+    def __init__(self):
+        self._bits: Dict[str, Optional[int]] = {}
+        self._names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _reload(self) -> None:
+        from .models import DataClass
+
+        bits = dict(DataClass.objects.values_list('name', 'bit'))
+        self._bits = bits
+        self._names = {bit: name for name, bit in bits.items() if bit is not None}
+
+    def mask_for(self, names: Iterable[str], create: bool = True) -> int:
+        """
+        Маска для набора имен.
+
+        :param names: Имена классов
+        :param create: Регистрировать незнакомые имена (иначе они пропускаются)
+        """
+        names = list(names)
+        with self._lock:
+            missing = [name for name in names if name not in self._bits]
+            if missing:
+                self._reload()
+                missing = [name for name in missing if name not in self._bits]
+                if missing and create:
+                    for name in missing:
+                        self._register(name)
+            mask = 0
+            for name in names:
+                bit = self._bits.get(name)
+                if bit is not None:
+                    mask |= 1 << bit
+            return mask
+
+    def _register(self, name: str) -> None:
+        from .models import DataClass
+
+        while True:
+            used = set(
+                DataClass.objects.exclude(bit=None).values_list('bit', flat=True)
+            )
+            free = next((bit for bit in range(MAX_BITS) if bit not in used), None)
+            if free is None:
+                # Классы сверх 63 сохраняются без бита: в маске их нет
+                logger.warning(f"No free bit for data class {name!r}")
+            try:
+                with transaction.atomic():
+                    DataClass.objects.create(name=name, bit=free)
+            except IntegrityError:
+                # Имя или бит одновременно занял другой процесс
+                self._reload()
+                if name in self._bits:
+                    return
+                continue
+            self._bits[name] = free
+            if free is not None:
+                self._names[free] = name
+            return
+
+    def names_for(self, mask: int) -> List[str]:
+        """Имена классов, входящих в маску (в порядке битов)."""
+        if not mask:
+            return []
+        bits = [bit for bit in range(MAX_BITS) if mask >> bit & 1]
+        if any(bit not in self._names for bit in bits):
+            with self._lock:
+                self._reload()
+        return [self._names[bit] for bit in bits if bit in self._names]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bits = {}
+            self._names = {}
+
+
+_registry = DataClassRegistry()
+
+
+def get_registry() -> DataClassRegistry:
+    """Общий для процесса реестр классов данных."""
+    return _registry
+
+
+def format_data_classes(mask: int) -> str:
+    """Маска в виде строки «A, B», как ее отдают провайдеры."""
+    return ", ".join(_registry.names_for(mask)) or UNKNOWN
+
+
+def filter_by_data_class(breaches, name: str):
+    """
+    Оставить утечки, в которых есть класс данных ``name``.
+
+    :param breaches: QuerySet Breach
+    :param name: Имя класса, например "Passwords"
+    """
+    mask = _registry.mask_for([name], create=False)
+    if not mask:
+        return breaches.none()
+    return breaches.alias(matched_classes=F('data_classes').bitand(mask)) \
+        .filter(matched_classes__gt=0)
@@ -1,10 +1,13 @@
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
+from asgiref.sync import sync_to_async
 from django.template.loader import render_to_string
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 import tempfile
 import os
 import logging
+from django.db.models import F
+from .data_classes import format_data_classes
 from .recommendations import generate_checklist, get_security_advice
 
 logger = logging.getLogger(__name__)
@@ -144,49 +147,109 @@ def generate_pdf_report(breaches):
 
     return response
 
-def generate_html_report(breaches):
+
+REPORT_FIELDS = ('service_name', 'breach_date', 'data_classes')
+
+# Место в шаблоне report.html, куда вставляются потоково отрендеренные утечки
+ITEMS_MARKER = "<!-- breach-items -->"
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+
+
+def _row(row):
+    row['data_type'] = format_data_classes(row.pop('data_classes'))
+    return row
+
+
+def _report_rows(breaches):
+    return breaches.values(*REPORT_FIELDS, description=F('service__description'))
+
+
+async def _aiter_chunks(breaches, chunk_size):
+    """Утечки пачками; QuerySet читается курсором через .aiterator()."""
+    if not hasattr(breaches, 'aiterator'):
+        for start in range(0, len(breaches), chunk_size):
+            yield breaches[start:start + chunk_size]
+        return
+    chunk = []
+    async for row in _report_rows(breaches).aiterator(chunk_size=chunk_size):
+        chunk.append(_row(row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _service_names(breaches):
+    """Уникальные имена сервисов для рекомендаций (DISTINCT в базе для QuerySet)."""
+    if hasattr(breaches, 'values_list'):
+        return list(
+            breaches.order_by().values_list('service_name', flat=True).distinct()
+        )
+    names = {}
+    for breach in breaches:
+        if hasattr(breach, 'service_name'):
+            name = breach.service_name
+        else:
+            name = breach.get('service_name', 'Unknown')
+        names[name] = None
+    return list(names)
+
+
+def _report_shell(service_names):
+    """
+    Начало и конец страницы отчета (стили, рекомендации) вокруг списка утечек.
+
+    :return: (head, tail, services)
+    """
+    services = [{'service_name': name} for name in service_names]
+    shell = render_to_string('leaksmap/report.html', {
+        'breaches': bool(services),
+        'items_marker': ITEMS_MARKER,
+        'checklist': generate_checklist(services),
+        'security_advice': get_security_advice(services),
+    })
+    head, _, tail = shell.partition(ITEMS_MARKER)
+    return head, tail, services
+
+
+def _render_items(chunk):
+    return render_to_string('leaksmap/report_breach_items.html', {'breaches': chunk})
+
+
+async def astream_html_report(breaches, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+    """
+    Generate an HTML report chunk by chunk.
+
+    The page shell (styles, recommendations) is rendered once and split at
+    the breach list; breaches are rendered in chunks of ``chunk_size`` rows,
+    so memory does not depend on the number of breaches. Under ASGI Django
+    streams an async iterator as it is produced; under WSGI it collects the
+    whole body first.
+
+    :param breaches: QuerySet or list of Breach objects / dicts
+    :param chunk_size: Rows fetched from the database and rendered per chunk
+    :return: Async iterator of HTML strings
+    """
+    service_names = await sync_to_async(_service_names)(breaches)
+    head, tail, services = _report_shell(service_names)
+    yield head
+    if services:
+        async for chunk in _aiter_chunks(breaches, chunk_size):
+            yield _render_items(chunk)
+    yield tail
+
+
+def generate_html_report(breaches, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
     """
     Generate an HTML report from breaches with recommendations.
     
     :param breaches: QuerySet or list of Breach objects
-    :return: HttpResponse with HTML content
+    :param chunk_size: Rows rendered per streamed chunk
+    :return: StreamingHttpResponse with HTML content
     """
-    try:
-        # Convert breaches to list for recommendations
-        breach_list = []
-        for breach in breaches:
-            if hasattr(breach, 'service_name'):
-                breach_list.append({
-                    'service_name': breach.service_name,
-                    'breach_date': breach.breach_date,
-                    'data_type': breach.data_type,
-                    'description': breach.description
-                })
-            else:
-                breach_list.append({
-                    'service_name': breach.get('service_name', 'Unknown'),
-                    'breach_date': breach.get('breach_date', 'Unknown'),
-                    'data_type': breach.get('data_type', 'Не указан'),
-                    'description': breach.get('description', 'No description')
-                })
-        
-        # Generate recommendations
-        checklist = generate_checklist(breach_list)
-        security_advice = get_security_advice(breaches)
-        
-        context = {
-            'breaches': breaches,
-            'checklist': checklist,
-            'security_advice': security_advice
-        }
-        
-        html_content = render_to_string('leaksmap/report.html', context)
-        response = HttpResponse(content_type='text/html')
-        response['Content-Disposition'] = 'attachment; filename="report.html"'
-        response.write(html_content)
-        return response
-    except Exception as e:
-        logger.error(f"Error generating HTML report: {str(e)}")
-        response = HttpResponse(content_type='text/plain')
-        response.write(f"Error generating report: {str(e)}")
-        return response
+    response = StreamingHttpResponse(astream_html_report(breaches, chunk_size),
+                                     content_type='text/html')
+    response['Content-Disposition'] = 'attachment; filename="report.html"'
+    return response
@@ -3,7 +3,9 @@ from .models import SupportTicket
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
 from .models import SupportTicket
+import re
 
 class RegistrationForm(UserCreationForm):
     email = forms.EmailField(required=True, max_length=254)
@@ -28,6 +30,59 @@ class RegistrationForm(UserCreationForm):
 class BreachCheckForm(forms.Form):
     email = forms.EmailField(label="Введите ваш email")
 
+
+class PasswordCheckForm(forms.Form):
+    password = forms.CharField(widget=forms.PasswordInput, strip=False,
+                               label="Пароль для проверки")
+
+
+class BulkBreachCheckForm(forms.Form):
+    """Массовая проверка: список адресов в поле и/или загруженный файл."""
+    emails = forms.CharField(
+        required=False,
+        widget=forms.Textarea,
+        label="Email-адреса (через запятую, пробел или с новой строки)",
+    )
+    emails_file = forms.FileField(required=False, label="Файл со списком email")
+
+    def __init__(self, *args, max_emails=10000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_emails = max_emails
+
+    def clean(self):
+        cleaned_data = super().clean()
+        raw = cleaned_data.get('emails') or ''
+        uploaded = cleaned_data.get('emails_file')
+        if uploaded:
+            try:
+                raw += '\n' + uploaded.read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise ValidationError("Файл должен быть в кодировке UTF-8.")
+
+        emails, invalid = [], []
+        seen = set()
+        for item in re.split(r'[\s,;]+', raw):
+            email = item.strip().lower()
+            if not email or email in seen:
+                continue
+            seen.add(email)
+            try:
+                validate_email(email)
+                emails.append(email)
+            except ValidationError:
+                invalid.append(item)
+
+        if invalid:
+            raise ValidationError(f"Некорректные адреса: {', '.join(invalid[:10])}")
+        if not emails:
+            raise ValidationError("Укажите хотя бы один email.")
+        if len(emails) > self.max_emails:
+            raise ValidationError(
+                f"Слишком много адресов (максимум {self.max_emails})."
+            )
+        cleaned_data['email_list'] = emails
+        return cleaned_data
+
 class LoginForm(AuthenticationForm):
     username = forms.CharField(widget=forms.TextInput(attrs={'autofocus': True}))
     password = forms.CharField(
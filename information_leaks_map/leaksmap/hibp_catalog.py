@@ -0,0 +1,128 @@
+"""
+Синхронизация и чтение локального каталога утечек HIBP.
+"""
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .api_client import HaveIBeenPwnedAPIClient, get_hibp_client, get_setting, run_sync
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FIELDS = ['name', 'breach_date', 'description', 'data_classes']
+
+SYNC_UPDATE_FIELDS = [
+    'title', 'domain', 'breach_date', 'added_date', 'modified_date', 'pwn_count',
+    'description', 'data_classes', 'is_verified', 'is_sensitive',
+]
+
+
+def _catalog_row(item: Dict):
+    from .models import HIBPBreach
+
+    return HIBPBreach(
+        name=item["Name"],
+        title=item.get("Title") or "",
+        domain=item.get("Domain") or "",
+        breach_date=parse_date(item.get("BreachDate") or ""),
+        added_date=parse_datetime(item.get("AddedDate") or ""),
+        modified_date=parse_datetime(item.get("ModifiedDate") or ""),
+        pwn_count=item.get("PwnCount") or 0,
+        description=item.get("Description") or "",
+        data_classes=item.get("DataClasses") or [],
+        is_verified=item.get("IsVerified", True),
+        is_sensitive=item.get("IsSensitive", False),
+    )
+
+
+def sync_breach_catalog(client: Optional[HaveIBeenPwnedAPIClient] = None
+                        ) -> Tuple[int, int]:
+    """
+    Загрузить каталог /breaches и сохранить новые и измененные утечки.
+
+    Сравнение идет по ModifiedDate: строки, которые не менялись с прошлой
+    синхронизации, не перезаписываются.
+
+    :param client: Клиент HIBP (по умолчанию общий клиент процесса)
+    :return: (число новых, число обновленных записей)
+    """
+    from .models import HIBPBreach
+
+    client = client or get_hibp_client()
+    catalog = run_sync(client.get_breach_catalog())
+
+    known = dict(HIBPBreach.objects.values_list('name', 'modified_date'))
+    changed: List[HIBPBreach] = []
+    created = 0
+    for item in catalog:
+        if not item.get("Name"):
+            continue
+        row = _catalog_row(item)
+        if row.name not in known:
+            created += 1
+        elif known[row.name] is not None and row.modified_date is not None \
+                and row.modified_date <= known[row.name]:
+            continue
+        changed.append(row)
+
+    if changed:
+        HIBPBreach.objects.bulk_create(
+            changed,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=SYNC_UPDATE_FIELDS,
+        )
+    updated = len(changed) - created
+    logger.info(f"HIBP catalog sync: {created} new, {updated} updated, "
+                f"{len(catalog)} total")
+    return created, updated
+
+
+class BreachCatalog:
+    """
+    In-memory копия каталога для join'а с усеченными ответами HIBP.
+
+    Каталог небольшой (сотни строк), поэтому он целиком перечитывается из
+    базы раз в ``reload_seconds``, а не запрашивается на каждую проверку.
+    """
+
+    def __init__(self, reload_seconds: Optional[float] = None,
+                 entries: Optional[Dict[str, Dict]] = None):
+        self.reload_seconds = reload_seconds if reload_seconds is not None else \
+            get_setting('LEAKSMAP_HIBP_CATALOG_RELOAD', 600)
+        self._entries: Dict[str, Dict] = entries or {}
+        # Переданный явно каталог не перечитывается из базы
+        self._loaded_at = time.monotonic() if entries is not None else None
+
+    def _is_stale(self) -> bool:
+        return (self._loaded_at is None
+                or time.monotonic() - self._loaded_at >= self.reload_seconds)
+
+    async def get_many(self, names: Iterable[str]) -> Dict[str, Dict]:
+        """Записи каталога для имен утечек (отсутствующие имена пропускаются)."""
+        if self._is_stale():
+            await self.reload()
+        return {name: self._entries[name] for name in names if name in self._entries}
+
+    async def reload(self) -> None:
+        from .models import HIBPBreach
+
+        entries = {}
+        async for row in HIBPBreach.objects.values(*CATALOG_FIELDS):
+            entries[row['name']] = row
+        self._entries = entries
+        self._loaded_at = time.monotonic()
+
+
+_catalog: Optional[BreachCatalog] = None
+
+
+def get_breach_catalog() -> BreachCatalog:
+    """Общий для процесса каталог."""
+    global _catalog
+    if _catalog is None:
+        _catalog = BreachCatalog()
+    return _catalog
@@ -0,0 +1,247 @@
+"""
+Сохранение результатов провайдеров в Breach пакетами.
+"""
+import logging
+import re
+from datetime import date
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .aggregator import UNKNOWN, normalize_service_name
+from .data_classes import get_registry, split_data_type
+from . import summary
+
+if TYPE_CHECKING:
+    from .models import Breach, Report, Service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+_DATE_PATTERN = re.compile(r"^(\d{4})(?:-(\d{1,2}))?(?:-(\d{1,2}))?")
+
+# Ключ не зависит от набора ответивших провайдеров и написания имени сервиса
+BREACH_KEY_FIELDS = ['user', 'service_key']
+
+# Поля, которые upsert обновляет у существующей строки. report, service и
+# service_name не входят: строка остается привязанной к отчету и написанию
+# имени, с которыми утечка найдена впервые
+BREACH_FIELDS = ['breach_date', 'location', 'data_classes', 'source']
+
+
+def parse_breach_date(value: Optional[str], default: Optional[date] = None) -> date:
+    """
+    Привести дату провайдера к date.
+
+    LeakCheck отдает ``YYYY-MM`` или ``YYYY``, HIBP — ``YYYY-MM-DD``. Если дата
+    неизвестна, используется дата обнаружения (сегодня), т.к. поле обязательное.
+    """
+    if isinstance(value, date):
+        return value
+    match = _DATE_PATTERN.match(value or "")
+    if match:
+        year, month, day = match.groups()
+        try:
+            return date(int(year), int(month or 1), int(day or 1))
+        except ValueError:
+            pass
+    return default or date.today()
+
+
+def parse_breach_dates(values: Iterable[Optional[str]]) -> Dict[Optional[str], date]:
+    """
+    Разобрать даты всего пакета за один проход.
+
+    Разных дат в пакете обычно немного, поэтому каждая разбирается один раз,
+    а дата «сегодня» для неизвестных значений вычисляется однократно.
+    """
+    today = date.today()
+    return {value: parse_breach_date(value, today) for value in set(values)}
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def merge_sources(values: Iterable[Optional[str]]) -> str:
+    """
+    Объединить поля source («A, B») в одно: без повторов, по алфавиту.
+
+    Порядок не зависит от того, какой провайдер ответил первым, поэтому
+    одна и та же утечка всегда хранится с одинаковым списком источников.
+    """
+    items = {item.strip() for value in values for item in (value or "").split(",")}
+    items -= {"", UNKNOWN}
+    return ", ".join(sorted(items))
+
+
+def _upsert_services(
+    breaches_data: Iterable[Dict[str, str]]
+) -> Dict[str, 'Service']:
+    """
+    Строки Service для имен сервисов пакета (недостающие создаются).
+
+    Описание записывается один раз: у нового сервиса или у сервиса, для
+    которого раньше описания не было.
+    """
+    from .models import Service
+
+    descriptions: Dict[str, str] = {}
+    for data in breaches_data:
+        description = data.get("description") or ""
+        if description or data["service_name"] not in descriptions:
+            descriptions[data["service_name"]] = description
+
+    Service.objects.bulk_create(
+        [
+            Service(name=name, description=description)
+            for name, description in descriptions.items()
+        ],
+        ignore_conflicts=True,
+    )
+    services = {
+        service.name: service
+        for service in Service.objects.filter(name__in=list(descriptions))
+    }
+
+    described = []
+    for name, service in services.items():
+        if not service.description and descriptions[name]:
+            service.description = descriptions[name]
+            described.append(service)
+    if described:
+        Service.objects.bulk_update(described, ['description'])
+    return services
+
+
+def save_breaches(user, breaches_data: List[Dict[str, str]], report: 'Report',
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> List['Breach']:
+    """
+    Upsert стандартизированных утечек пользователя.
+
+    Естественный ключ записи — (пользователь, сервис, источник), на нем стоит
+    уникальное ограничение, поэтому на пакет выполняется один
+    ``INSERT ... ON CONFLICT DO UPDATE``. Ключ не включает email, поэтому
+    классы данных объединяются (OR) с уже сохраненными: проверка другого
+    адреса того же пользователя дополняет строку, а не затирает ее, а сам
+    адрес (``report.email``) добавляется к строке в BreachEmail.
+    В той же транзакции обновляется UserBreachSummary: для разницы
+    читаются только маски уже существующих строк пакета.
+
+    :param user: Владелец утечек
+    :param breaches_data: Список утечек в формате api_client
+    :param report: Отчет, к которому привязываются новые записи (его email
+        сохраняется у всех записей пакета)
+    :param batch_size: Размер пакета
+    :return: Сохраненные объекты Breach
+    """
+    return save_checks(user, [(report, breaches_data)], batch_size)
+
+
+def save_checks(user, checks: List[Tuple['Report', List[Dict[str, str]]]],
+                batch_size: int = DEFAULT_BATCH_SIZE) -> List['Breach']:
+    """
+    Upsert результатов нескольких проверок (по отчету на адрес) одним пакетом.
+
+    Как save_breaches, но у каждой проверки свой отчет: новая запись
+    привязывается к отчету первой проверки, в которой она встретилась,
+    а email каждого отчета сохраняется у его записей.
+
+    :param user: Владелец утечек
+    :param checks: Пары (отчет, список утечек в формате api_client)
+    :param batch_size: Размер пакета
+    :return: Сохраненные объекты Breach
+    """
+    from .models import Breach, BreachEmail
+
+    # Дубли ключа внутри входных данных схлопываются (один INSERT не может
+    # обновить одну и ту же строку дважды): имя сервиса берется у первого,
+    # дата и место — у последнего, классы данных и источники объединяются.
+    # Новые классы регистрируются вне транзакции пакета: откат пакета
+    # не должен оставить в памяти бит, которого нет в базе
+    registry = get_registry()
+    by_key: Dict[str, Dict[str, str]] = {}
+    names: Dict[str, str] = {}
+    masks: Dict[str, int] = {}
+    sources: Dict[str, List[Optional[str]]] = {}
+    reports: Dict[str, 'Report'] = {}
+    emails = set()
+    for report, breaches_data in checks:
+        for data in breaches_data:
+            key = normalize_service_name(data["service_name"])
+            by_key[key] = data
+            names.setdefault(key, data["service_name"])
+            reports.setdefault(key, report)
+            mask = registry.mask_for(split_data_type(data.get("data_type")))
+            masks[key] = masks.get(key, 0) | mask
+            sources.setdefault(key, []).append(data.get("source"))
+            if report.email:
+                emails.add((key, report.email))
+    dates = parse_breach_dates(data.get("breach_date") for data in by_key.values())
+
+    rows = []
+    if by_key:
+        with transaction.atomic():
+            user_summary = summary.lock_for_upsert(user)
+            previous = {}
+            for key, source, mask in Breach.objects.filter(
+                user=user, service_key__in=list(by_key)
+            ).values_list('service_key', 'source', 'data_classes'):
+                previous[key] = mask
+                sources[key].append(source)
+            current = {key: previous.get(key, 0) | mask for key, mask in masks.items()}
+            services = _upsert_services(
+                dict(data, service_name=names[key]) for key, data in by_key.items()
+            )
+            rows_by_key = {
+                key: Breach(
+                    user=user,
+                    report=reports[key],
+                    service=services[names[key]],
+                    service_name=names[key],
+                    service_key=key,
+                    source=merge_sources(sources[key]),
+                    breach_date=dates[data.get("breach_date")],
+                    location=data.get("location", "Unknown"),
+                    data_classes=current[key],
+                )
+                for key, data in by_key.items()
+            }
+            rows = list(rows_by_key.values())
+            Breach.objects.bulk_create(
+                rows,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=BREACH_KEY_FIELDS,
+                update_fields=BREACH_FIELDS,
+            )
+            # pk строк (новых и обновленных) заполняет bulk_create через RETURNING
+            BreachEmail.objects.bulk_create(
+                [
+                    BreachEmail(breach=rows_by_key[key], email=email)
+                    for key, email in emails
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            summary.apply_upsert(user_summary, previous, current)
+    else:
+        summary.mark_checked(user)
+
+    logger.info(f"Saved {len(rows)} breaches for user {user.pk}")
+    return rows
+
+
+async def asave_breaches(user, breaches_data: List[Dict[str, str]], report: 'Report',
+                         batch_size: int = DEFAULT_BATCH_SIZE) -> List['Breach']:
+    """Версия save_breaches для async view."""
+    return await sync_to_async(save_breaches)(user, breaches_data, report, batch_size)
+
+
+async def asave_checks(user, checks: List[Tuple['Report', List[Dict[str, str]]]],
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> List['Breach']:
+    """Версия save_checks для async view."""
+    return await sync_to_async(save_checks)(user, checks, batch_size)
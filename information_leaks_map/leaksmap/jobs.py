@@ -0,0 +1,184 @@
+"""
+Очередь фоновых проверок утечек поверх таблицы BreachCheckJob.
+
+View только ставит задачу и сразу отвечает ее id, проверку выполняет воркер
+(``python manage.py run_breach_worker``). Брокер не нужен: задачи забираются
+условным UPDATE, который срабатывает ровно у одного воркера, так что
+несколько процессов могут разбирать одну очередь.
+"""
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .aggregator import BreachAggregator, get_breach_aggregator, providers_answered
+from .api_client import get_setting, run_sync
+from .ingest import save_breaches
+from .summary import mark_checked
+
+logger = logging.getLogger(__name__)
+
+
+class ProvidersUnavailableError(RuntimeError):
+    """Ни один провайдер не вернул данных (ни свежих, ни из кэша)."""
+
+    def __init__(self, providers: Dict[str, str]):
+        super().__init__("Провайдеры утечек недоступны, повторите проверку позже")
+        self.providers = providers
+
+
+def claim_next_job():
+    """
+    Забрать самую старую задачу из очереди.
+
+    :return: BreachCheckJob в статусе running или None, если очередь пуста
+    """
+    from .models import BreachCheckJob
+
+    while True:
+        job_id = BreachCheckJob.objects.filter(status='queued') \
+            .order_by('created_at', 'pk').values_list('pk', flat=True).first()
+        if job_id is None:
+            return None
+        # Задачу мог забрать другой воркер между SELECT и UPDATE — тогда берем следующую
+        claimed = BreachCheckJob.objects.filter(pk=job_id, status='queued') \
+            .update(status='running', started_at=timezone.now())
+        if claimed:
+            return BreachCheckJob.objects.select_related('user').get(pk=job_id)
+
+
+def requeue_stale_jobs(timeout: float) -> int:
+    """
+    Вернуть в очередь задачи, зависшие в running дольше ``timeout`` секунд
+    (например, воркер был убит посреди проверки).
+    """
+    from .models import BreachCheckJob
+
+    deadline = timezone.now() - timedelta(seconds=timeout)
+    count = BreachCheckJob.objects.filter(status='running', started_at__lt=deadline) \
+        .update(status='queued', started_at=None)
+    if count:
+        logger.warning(f"Requeued {count} stale breach check jobs")
+    return count
+
+
+def run_breach_check(user, email: str, aggregator: Optional[BreachAggregator] = None
+                     ) -> Tuple[Dict, Optional[int]]:
+    """
+    Проверить email у всех провайдеров и сохранить найденные утечки.
+
+    :return: (результат для клиента, id созданного отчета или None)
+    :raises ProvidersUnavailableError: Ни один провайдер не ответил
+    """
+    from .models import Report
+
+    aggregator = aggregator or get_breach_aggregator()
+    if not aggregator.clients:
+        raise RuntimeError("API ключ не настроен")
+
+    result = run_sync(aggregator.get_breach_info_by_email(email))
+    if not providers_answered(result["providers"]):
+        # Не отмечаем проверку: пользователь не должен увидеть «утечек нет»
+        raise ProvidersUnavailableError(result["providers"])
+    breaches_data: List[Dict] = result["breaches"]
+    report_id = None
+    if breaches_data:
+        report = Report.objects.create(
+            user=user, report_type='html', email=email,
+            content={"email": email, "count": len(breaches_data)},
+        )
+        save_breaches(user, breaches_data, report)
+        report_id = report.pk
+    else:
+        mark_checked(user)
+
+    return {
+        "count": len(breaches_data),
+        "breaches": breaches_data,
+        "providers": result["providers"],
+    }, report_id
+
+
+def process_job(job, aggregator: Optional[BreachAggregator] = None) -> None:
+    """Выполнить захваченную задачу и записать результат или ошибку."""
+    from .models import BreachCheckJob
+
+    try:
+        result, report_id = run_breach_check(job.user, job.email, aggregator)
+    except ProvidersUnavailableError as e:
+        logger.warning(f"Breach check job {job.pk}: no provider answered "
+                       f"{e.providers}")
+        BreachCheckJob.objects.filter(pk=job.pk).update(
+            status='failed', error=str(e), result={"providers": e.providers},
+            finished_at=timezone.now(),
+        )
+        return
+    except Exception as e:
+        logger.error(f"Breach check job {job.pk} failed: {e}")
+        BreachCheckJob.objects.filter(pk=job.pk).update(
+            status='failed', error=str(e), finished_at=timezone.now()
+        )
+        return
+    BreachCheckJob.objects.filter(pk=job.pk).update(
+        status='done', result=result, report_id=report_id, finished_at=timezone.now()
+    )
+
+
+class JobWorker:
+    """
+    Пул потоков, разбирающих очередь.
+
+    Сами HTTP-запросы идут в общем фоновом event loop (см. api_client.run_sync),
+    потоки нужны только для ORM и ожидания результата.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None,
+                 poll_interval: Optional[float] = None,
+                 stale_timeout: Optional[float] = None):
+        """
+        :param concurrency: Число одновременно выполняемых задач
+        :param poll_interval: Пауза между опросами пустой очереди, секунды
+        :param stale_timeout: Через сколько секунд задача в running считается зависшей
+        """
+        self.concurrency = concurrency or get_setting('LEAKSMAP_JOB_CONCURRENCY', 4)
+        self.poll_interval = (
+            poll_interval or get_setting('LEAKSMAP_JOB_POLL_INTERVAL', 0.5)
+        )
+        self.stale_timeout = (
+            stale_timeout or get_setting('LEAKSMAP_JOB_STALE_TIMEOUT', 300)
+        )
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        requeue_stale_jobs(self.stale_timeout)
+        for index in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._run, name=f"breach-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Дождаться завершения текущих задач и остановить потоки."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = claim_next_job()
+                if job is None:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                process_job(job)
+            except Exception as e:
+                logger.error(f"Breach worker error: {e}")
+                self._stop.wait(self.poll_interval)
+            finally:
+                close_old_connections()
@@ -0,0 +1,179 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F
+
+from leaksmap.data_classes import (
+    filter_by_data_class, get_registry, split_data_type,
+)
+from leaksmap.export import REPORT_FIELDS
+from leaksmap.models import Breach, Report, Service, UserBreachSummary
+from leaksmap.summary import rebuild_summary
+
+BENCHMARK_USER_PREFIX = "benchmark-user-"
+BENCHMARK_SERVICE_PREFIX = "Benchmark Service "
+SERVICE_COUNT = 2000
+
+DATA_TYPES = [
+    "Email addresses, Passwords",
+    "Email addresses, Phone numbers",
+    "Email addresses, Names, Usernames",
+    "Passwords",
+    "Phone numbers, Physical addresses",
+]
+
+
+def _fetch(queryset):
+    return len(list(queryset))
+
+
+# Горячие запросы к Breach:
+# (название, фабрика QuerySet по пользователю, способ выполнения)
+HOT_QUERIES = [
+    ("export: user ORDER BY -breach_date",
+     lambda user: Breach.objects.filter(user=user)
+     .values(*REPORT_FIELDS, description=F('service__description')),
+     _fetch),
+    ("date range: user + breach_date BETWEEN",
+     lambda user: Breach.objects.filter(
+         user=user, breach_date__range=(date(2015, 1, 1), date(2018, 12, 31))
+     ),
+     _fetch),
+    ("visualizer: user + data class bitmask",
+     lambda user: filter_by_data_class(Breach.objects.filter(user=user), "Passwords"),
+     _fetch),
+    # view_profile читает готовую сводку, а не считает утечки
+    ("profile: summary by user",
+     lambda user: UserBreachSummary.objects.filter(user=user), _fetch),
+    ("chart: per-service counts",
+     lambda user: Breach.objects.filter(user=user).order_by().values('service_name')
+     .annotate(total=Count('id')).order_by('-total'), _fetch),
+]
+
+
+class Command(BaseCommand):
+    help = ("Заполнить Breach тестовыми строками и вывести EXPLAIN QUERY PLAN и время "
+            "горячих запросов. Строки создаются для пользователей benchmark-user-* "
+            "и удаляются в конце")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help="Сколько строк Breach создать")
+        parser.add_argument('--users', type=int, default=1000,
+                            help="Между сколькими пользователями их распределить")
+        parser.add_argument('--repeat', type=int, default=5,
+                            help="Повторов каждого запроса")
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--keep', action='store_true',
+                            help="Не удалять тестовые данные после замера")
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['users'] < 1:
+            raise CommandError("--rows и --users должны быть положительными")
+        if User.objects.filter(username__startswith=BENCHMARK_USER_PREFIX).exists():
+            raise CommandError("Найдены данные прошлого запуска (benchmark-user-*), "
+                               "удалите их перед замером")
+
+        users = self._seed(options['rows'], options['users'], options['batch_size'])
+        try:
+            probe = users[len(users) // 2]
+            for name, build, run in HOT_QUERIES:
+                self._measure(name, build(probe), run, options['repeat'])
+        finally:
+            if not options['keep']:
+                self.stdout.write("Удаление тестовых данных...")
+                self._cleanup()
+
+    def _cleanup(self):
+        # user у Breach и Report — SET_NULL, поэтому строки удаляются явно
+        benchmark_users = User.objects.filter(
+            username__startswith=BENCHMARK_USER_PREFIX
+        )
+        Breach.objects.filter(user__in=benchmark_users).delete()
+        Report.objects.filter(user__in=benchmark_users).delete()
+        benchmark_users.delete()
+        Service.objects.filter(name__startswith=BENCHMARK_SERVICE_PREFIX).delete()
+
+    def _seed(self, rows, user_count, batch_size):
+        started = time.perf_counter()
+        rng = random.Random(42)
+        with transaction.atomic():
+            User.objects.bulk_create([
+                User(username=f"{BENCHMARK_USER_PREFIX}{index}",
+                     email=f"user{index}@benchmark.invalid")
+                for index in range(user_count)
+            ], batch_size=batch_size)
+            users = list(
+                User.objects.filter(username__startswith=BENCHMARK_USER_PREFIX)
+                .order_by('pk')
+            )
+            Report.objects.bulk_create([
+                Report(user=user, email=user.email, report_type='html')
+                for user in users
+            ], batch_size=batch_size)
+            reports = dict(
+                Report.objects.filter(user__in=users).values_list('user_id', 'pk')
+            )
+            Service.objects.bulk_create([
+                Service(name=f"{BENCHMARK_SERVICE_PREFIX}{index}",
+                        description="Benchmark breach")
+                for index in range(SERVICE_COUNT)
+            ], batch_size=batch_size, ignore_conflicts=True)
+            services = list(
+                Service.objects.filter(name__startswith=BENCHMARK_SERVICE_PREFIX)
+                .values_list('pk', 'name')
+            )
+            registry = get_registry()
+            masks = [
+                registry.mask_for(split_data_type(data_type))
+                for data_type in DATA_TYPES
+            ]
+
+            first_day = date(2005, 1, 1)
+            batch = []
+            for index in range(rows):
+                user = users[index % user_count]
+                service_id, service_name = rng.choice(services)
+                batch.append(Breach(
+                    user_id=user.pk,
+                    report_id=reports[user.pk],
+                    service_id=service_id,
+                    service_name=service_name,
+                    # Сервисы у пользователя повторяются, а ключ строки уникален
+                    service_key=f"benchmark{index}",
+                    source="benchmark",
+                    breach_date=first_day + timedelta(days=rng.randrange(7000)),
+                    data_classes=rng.choice(masks),
+                ))
+                if len(batch) >= batch_size:
+                    Breach.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                Breach.objects.bulk_create(batch)
+            for user in users:
+                rebuild_summary(user)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано {rows} строк для {user_count} пользователей за {elapsed:.1f} с"
+        ))
+        return users
+
+    def _measure(self, name, queryset, run, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(queryset.explain())
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            # .all() — новый QuerySet без кэша результатов предыдущего прогона
+            result = run(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f"  строк: {result}, медиана {statistics.median(timings):.2f} мс, "
+            f"min {min(timings):.2f} мс, max {max(timings):.2f} мс\n"
+        )
@@ -0,0 +1,108 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cache.cache_manager import CacheManager
+from cache.codecs import CODECS
+
+SERVICES = [f"Service {index}" for index in range(500)]
+
+DATA_TYPES = [
+    "Email addresses, Passwords",
+    "Email addresses, Phone numbers",
+    "Email addresses, Names, Usernames",
+    "Passwords",
+]
+
+DESCRIPTION = (
+    "<p>In {year}, the service suffered a data breach that exposed {count} "
+    "accounts. The data included email addresses, usernames and passwords stored as "
+    "<a href=\"https://en.wikipedia.org/wiki/Bcrypt\" target=\"_blank\">"
+    "bcrypt hashes</a>. The data was provided to HIBP by a source who requested "
+    "it be attributed to &quot;anonymous&quot;.</p>"
+)
+
+
+def make_breach_list(rng, size):
+    """
+    Список утечек в формате api_client.
+
+    Строки собираются заново для каждой записи, как после разбора JSON
+    ответа провайдера, поэтому одинаковые значения не разделяются
+    между записями.
+    """
+    breaches = []
+    for _ in range(size):
+        year = rng.randrange(2008, 2024)
+        breaches.append(json.loads(json.dumps({
+            "service_name": rng.choice(SERVICES),
+            "breach_date": f"{year}-{rng.randrange(1, 13):02d}-01",
+            "location": "Unknown",
+            "data_type": rng.choice(DATA_TYPES),
+            "description": DESCRIPTION.format(
+                year=year, count=rng.randrange(10 ** 4, 10 ** 8)
+            ),
+            "source": "HaveIBeenPwned",
+        })))
+    return breaches
+
+
+class Command(BaseCommand):
+    help = ("Сравнить кодеки значений cache.CacheManager: память на запись "
+            "(tracemalloc) и время get на списках утечек")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=2000,
+                            help="Сколько записей положить в кэш")
+        parser.add_argument('--breaches', type=int, default=8,
+                            help="Утечек в одной записи")
+        parser.add_argument('--gets', type=int, default=20000,
+                            help="Сколько раз прочитать запись")
+        parser.add_argument('--codec', action='append', choices=sorted(CODECS),
+                            help="Кодек для замера (по умолчанию все доступные)")
+
+    def handle(self, *args, **options):
+        if options['entries'] < 1 or options['breaches'] < 1:
+            raise CommandError("--entries и --breaches должны быть положительными")
+
+        self.stdout.write(f"{'кодек':<14} {'байт/запись':>12} "
+                          f"{'get, мкс (медиана)':>20} {'p99, мкс':>10}")
+        for name in options['codec'] or sorted(CODECS):
+            try:
+                codec = CODECS[name]()
+            except ImportError as e:
+                self.stdout.write(f"{name:<14} пропущен: {e}")
+                continue
+            per_entry, median, p99 = self._measure(
+                codec, options['entries'], options['breaches'], options['gets']
+            )
+            self.stdout.write(
+                f"{name:<14} {per_entry:>12.0f} {median:>20.1f} {p99:>10.1f}"
+            )
+
+    def _measure(self, codec, entries, breaches, gets):
+        rng = random.Random(42)
+        cache = CacheManager(max_entries=None, codec=codec)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for index in range(entries):
+            # Значение создается под tracemalloc и после set держится только кэшем
+            cache.set("lookup", {"email": f"user{index}@example.com"},
+                      make_breach_list(rng, breaches))
+        per_entry = (tracemalloc.get_traced_memory()[0] - before) / entries
+        tracemalloc.stop()
+
+        timings = []
+        for _ in range(gets):
+            params = {"email": f"user{rng.randrange(entries)}@example.com"}
+            started = time.perf_counter()
+            cache.get("lookup", params)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99)]
+        return per_entry, statistics.median(timings), p99
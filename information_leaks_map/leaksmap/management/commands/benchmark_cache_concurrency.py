@@ -0,0 +1,85 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cache.cache_manager import DEFAULT_SHARDS, CacheManager
+from cache.codecs import CODECS
+
+from .benchmark_cache_codecs import make_breach_list
+
+
+class Command(BaseCommand):
+    help = ("Нагрузочный тест cache.CacheManager из нескольких потоков: пропускная "
+            "способность с одной блокировкой (--shards 1) и с разбиением на шарды")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8],
+                            help="Числа потоков для замера")
+        parser.add_argument('--shards', type=int, nargs='+',
+                            default=[1, DEFAULT_SHARDS],
+                            help="Числа шардов для сравнения")
+        parser.add_argument('--ops', type=int, default=50000,
+                            help="Операций на поток")
+        parser.add_argument('--keys', type=int, default=5000,
+                            help="Число разных ключей")
+        parser.add_argument('--write-ratio', type=float, default=0.1,
+                            help="Доля set среди операций")
+        parser.add_argument('--codec', choices=sorted(CODECS), default='identity')
+
+    def handle(self, *args, **options):
+        if options['ops'] < 1 or options['keys'] < 1 or min(options['threads']) < 1:
+            raise CommandError(
+                "--ops, --keys и --threads должны быть положительными"
+            )
+
+        rng = random.Random(42)
+        values = [make_breach_list(rng, 4) for _ in range(64)]
+        self.stdout.write(
+            f"{'шарды':>6} {'потоки':>7} {'операций/с':>12} {'ошибок':>7}"
+        )
+        for shards in options['shards']:
+            for threads in options['threads']:
+                cache = CacheManager(max_entries=options['keys'] // 2,
+                                     codec=CODECS[options['codec']](),
+                                     shards=shards)
+                rate, errors = self._run(cache, values, threads, options['ops'],
+                                         options['keys'], options['write_ratio'])
+                self.stdout.write(
+                    f"{shards:>6} {threads:>7} {rate:>12.0f} {errors:>7}"
+                )
+
+    def _run(self, cache, values, threads, ops, keys, write_ratio):
+        start = threading.Barrier(threads + 1)
+        errors = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            start.wait()
+            try:
+                for index in range(ops):
+                    params = {"email": f"user{rng.randrange(keys)}@example.com"}
+                    if rng.random() < write_ratio:
+                        cache.set("lookup", params, values[index % len(values)],
+                                  ttl=rng.choice((0, 60)))
+                    else:
+                        cache.get("lookup", params)
+                    if index % 1000 == 0:
+                        cache.cleanup_expired()
+            except Exception as e:
+                errors.append(e)
+
+        workers = [
+            threading.Thread(target=worker, args=(seed,)) for seed in range(threads)
+        ]
+        for thread in workers:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        for error in errors[:3]:
+            self.stderr.write(f"{type(error).__name__}: {error}")
+        return threads * ops / elapsed, len(errors)
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from leaksmap.jobs import JobWorker
+
+
+class Command(BaseCommand):
+    help = "Запустить воркер очереди проверок утечек (очередь хранится в базе)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Число одновременных проверок "
+                                 "(по умолчанию LEAKSMAP_JOB_CONCURRENCY)")
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help="Пауза между опросами пустой очереди, секунды")
+
+    def handle(self, *args, **options):
+        worker = JobWorker(concurrency=options['concurrency'],
+                           poll_interval=options['poll_interval'])
+        worker.start()
+        self.stdout.write(self.style.SUCCESS(
+            f"Воркер запущен: {worker.concurrency} потоков. Остановка — Ctrl+C"
+        ))
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stdout.write("Остановка, ожидание текущих проверок...")
+            worker.stop()
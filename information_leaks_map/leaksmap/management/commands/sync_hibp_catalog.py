@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from leaksmap.hibp_catalog import sync_breach_catalog
+
+
+class Command(BaseCommand):
+    help = ("Синхронизировать локальный каталог утечек HIBP "
+            "(запускайте по cron, например раз в час)")
+
+    def handle(self, *args, **options):
+        try:
+            created, updated = sync_breach_catalog()
+        except Exception as e:
+            raise CommandError(f"Не удалось загрузить каталог HIBP: {e}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Каталог HIBP обновлен: новых {created}, измененных {updated}"
+        ))
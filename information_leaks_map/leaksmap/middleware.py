@@ -1,12 +1,26 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import HttpResponseRedirect
 
+# Пропускаем /login/ и /register/, чтобы избежать бесконечного цикла редиректов
+PUBLIC_PATHS = ['/login/', '/register/']
+
 class CustomAuthenticationMiddleware:
+    # Поддерживает оба режима: синхронная middleware в цепочке заставила бы
+    # Django выполнять async view под ASGI в общем потоке, по одной за раз
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # Пропускаем /login/ и /register/, чтобы избежать бесконечного цикла редиректов
-        if request.path in ['/login/', '/register/']:
+        if self.async_mode:
+            return self.__acall__(request)
+
+        if request.path in PUBLIC_PATHS:
             return self.get_response(request)
 
         # Проверяем, аутентифицирован ли пользователь
@@ -15,3 +29,13 @@ class CustomAuthenticationMiddleware:
             return HttpResponseRedirect(f'/login/?next={request.path}')
 
         return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path in PUBLIC_PATHS:
+            return await self.get_response(request)
+
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponseRedirect(f'/login/?next={request.path}')
+
+        return await self.get_response(request)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaksmap', '0005_alter_breach_options_alter_feedback_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HIBPBreach',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('domain', models.CharField(blank=True, max_length=255)),
+                ('breach_date', models.DateField(blank=True, null=True)),
+                ('added_date', models.DateTimeField(blank=True, null=True)),
+                ('modified_date', models.DateTimeField(blank=True, null=True)),
+                ('pwn_count', models.BigIntegerField(default=0)),
+                ('description', models.TextField(blank=True)),
+                ('data_classes', models.JSONField(default=list)),
+                ('is_verified', models.BooleanField(default=True)),
+                ('is_sensitive', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'HIBP Breach',
+                'verbose_name_plural': 'HIBP Breaches',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaksmap', '0006_hibpbreach'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PwnedPasswordRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=5, unique=True)),
+                ('records', models.BinaryField()),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Pwned Password Range',
+                'verbose_name_plural': 'Pwned Password Ranges',
+            },
+        ),
+    ]
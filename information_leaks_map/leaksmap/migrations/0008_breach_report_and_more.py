@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def prepare_breaches(apps, schema_editor):
+    """
+    Подготовить существующие утечки к обязательному report.
+
+    Утечки без отчета привязываются к отчету их пользователя, пустой источник
+    приводится к ''. Дубли утечки объединяются позже, в 0015: там уже есть
+    маски классов и BreachEmail, поэтому объединение ничего не теряет.
+    """
+    Breach = apps.get_model('leaksmap', 'Breach')
+    Report = apps.get_model('leaksmap', 'Report')
+
+    reports = {}
+    for breach in Breach.objects.filter(report__isnull=True).order_by('pk'):
+        if breach.user_id not in reports:
+            reports[breach.user_id] = Report.objects.create(
+                user_id=breach.user_id, report_type='html', content={"migrated": True}
+            )
+        breach.report = reports[breach.user_id]
+        breach.save(update_fields=['report'])
+
+    Breach.objects.filter(source__isnull=True).update(source='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaksmap', '0007_pwnedpasswordrange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='breach',
+            name='report',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='breaches', to='leaksmap.report'),
+        ),
+        migrations.RunPython(prepare_breaches, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='breach',
+            name='report',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='breaches', to='leaksmap.report'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaksmap', '0009_breachcheckjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='breach',
+            name='leaksmap_br_user_id_173a58_idx',
+        ),
+        migrations.AddIndex(
+            model_name='breach',
+            index=models.Index(fields=['user', '-breach_date'], name='leaksmap_br_user_id_9aab85_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='breach',
+            index=models.Index(fields=['user', 'data_type', '-breach_date'], name='leaksmap_br_user_id_6c501a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['email'], name='leaksmap_re_email_786cd5_idx'),
+        ),
+    ]
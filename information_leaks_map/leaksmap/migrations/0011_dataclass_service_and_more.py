@@ -0,0 +1,133 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+MAX_BITS = 63
+
+
+def _split_data_type(value):
+    names = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if item and item != "Unknown" and item not in names:
+            names.append(item)
+    return names
+
+
+def normalize_breaches(apps, schema_editor):
+    """
+    Перенести описания в Service, а строку data_type — в битовую маску.
+
+    Описание сервиса берется из первой записи с непустым описанием.
+    """
+    Breach = apps.get_model('leaksmap', 'Breach')
+    Service = apps.get_model('leaksmap', 'Service')
+    DataClass = apps.get_model('leaksmap', 'DataClass')
+
+    services = {}
+    bits = dict(DataClass.objects.values_list('name', 'bit'))
+    rows = Breach.objects.order_by('pk') \
+        .values_list('pk', 'service_name', 'description', 'data_type')
+    pending = []
+
+    def flush():
+        Breach.objects.bulk_update(pending, ['service', 'data_classes'])
+        pending.clear()
+
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        pk, service_name, description, data_type = row
+        service = services.get(service_name)
+        if service is None:
+            service, _ = Service.objects.get_or_create(
+                name=service_name, defaults={'description': description or ''}
+            )
+            services[service_name] = service
+        elif description and not service.description:
+            service.description = description
+            service.save(update_fields=['description'])
+
+        mask = 0
+        for name in _split_data_type(data_type):
+            if name not in bits:
+                used = {bit for bit in bits.values() if bit is not None}
+                free = next((bit for bit in range(MAX_BITS) if bit not in used), None)
+                DataClass.objects.create(name=name, bit=free)
+                bits[name] = free
+            if bits[name] is not None:
+                mask |= 1 << bits[name]
+
+        pending.append(Breach(pk=pk, service=service, data_classes=mask))
+        if len(pending) >= BATCH_SIZE:
+            flush()
+    if pending:
+        flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaksmap', '0010_breach_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('bit', models.PositiveSmallIntegerField(blank=True, null=True, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Data Class',
+                'verbose_name_plural': 'Data Classes',
+                'ordering': ['bit'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Service',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Service',
+                'verbose_name_plural': 'Services',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='breach',
+            name='data_classes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='breach',
+            name='service',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='breaches', to='leaksmap.service'),
+        ),
+        # Необратимо: ниже удаляются data_type и description, а откат вернул бы
+        # пустые колонки (description без default не откатывается вовсе)
+        migrations.RunPython(normalize_breaches),
+        migrations.AlterField(
+            model_name='breach',
+            name='service',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='breaches', to='leaksmap.service'),
+        ),
+        migrations.RemoveIndex(
+            model_name='breach',
+            name='leaksmap_br_user_id_6c501a_idx',
+        ),
+        migrations.RemoveField(
+            model_name='breach',
+            name='data_type',
+        ),
+        migrations.RemoveField(
+            model_name='breach',
+            name='description',
+        ),
+    ]
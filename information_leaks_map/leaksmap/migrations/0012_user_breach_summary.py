@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+MAX_BITS = 63
+
+
+def build_summaries(apps, schema_editor):
+    """Заполнить сводки для пользователей, у которых уже есть утечки."""
+    Breach = apps.get_model('leaksmap', 'Breach')
+    DataClass = apps.get_model('leaksmap', 'DataClass')
+    UserBreachSummary = apps.get_model('leaksmap', 'UserBreachSummary')
+
+    names = dict(DataClass.objects.exclude(bit=None).values_list('bit', 'name'))
+    user_ids = Breach.objects.exclude(user=None).order_by() \
+        .values_list('user', flat=True).distinct()
+    for user_id in user_ids:
+        breaches = Breach.objects.filter(user=user_id)
+        by_data_class = {}
+        masks = breaches.values_list('data_classes', flat=True)
+        for mask in masks.iterator(chunk_size=2000):
+            for bit in range(MAX_BITS):
+                if mask >> bit & 1 and bit in names:
+                    by_data_class[names[bit]] = by_data_class.get(names[bit], 0) + 1
+        dates = breaches.aggregate(first=Min('breach_date'), last=Max('breach_date'))
+        UserBreachSummary.objects.create(
+            user_id=user_id,
+            total=breaches.count(),
+            by_data_class=by_data_class,
+            first_breach_date=dates['first'],
+            last_breach_date=dates['last'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaksmap', '0011_dataclass_service_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBreachSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('by_data_class', models.JSONField(default=dict)),
+                ('first_breach_date', models.DateField(blank=True, null=True)),
+                ('last_breach_date', models.DateField(blank=True, null=True)),
+                ('last_checked_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='breach_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Breach Summary',
+                'verbose_name_plural': 'User Breach Summaries',
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
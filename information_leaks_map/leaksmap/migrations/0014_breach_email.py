@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_report_emails(apps, schema_editor):
+    """Адрес проверки существующих утечек — email их отчета (если он был)."""
+    Breach = apps.get_model('leaksmap', 'Breach')
+    BreachEmail = apps.get_model('leaksmap', 'BreachEmail')
+
+    rows = (
+        Breach.objects.exclude(report__email=None).exclude(report__email='')
+        .values_list('pk', 'report__email')
+    )
+    batch = []
+    for breach_id, email in rows.iterator(chunk_size=2000):
+        batch.append(BreachEmail(breach_id=breach_id, email=email))
+        if len(batch) >= 2000:
+            BreachEmail.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    BreachEmail.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaksmap', '0013_userprofile_related_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BreachEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('breach', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emails', to='leaksmap.breach')),
+            ],
+            options={
+                'verbose_name': 'Breach Email',
+                'verbose_name_plural': 'Breach Emails',
+                'indexes': [models.Index(fields=['email'], name='leaksmap_br_email_0a1928_idx')],
+                'constraints': [models.UniqueConstraint(fields=('breach', 'email'), name='unique_breach_email')],
+            },
+        ),
+        migrations.RunPython(copy_report_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:10
+
+import re
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+BATCH_SIZE = 2000
+MAX_BITS = 63
+
+
+def _service_key(name):
+    # Копия aggregator.normalize_service_name на момент миграции
+    return re.sub(r"[^a-z0-9]", "", (name or "").lower())
+
+
+def _merge_sources(values):
+    # Копия ingest.merge_sources на момент миграции
+    items = {item.strip() for value in values for item in (value or "").split(",")}
+    items -= {"", "Unknown"}
+    return ", ".join(sorted(items))
+
+
+def merge_duplicate_breaches(apps, schema_editor):
+    """
+    Заполнить service_key и объединить строки одной утечки.
+
+    Раньше ключом был (пользователь, имя сервиса, источник), а источник
+    зависел от порядка ответов провайдеров, поэтому одна утечка могла
+    храниться в нескольких строках. Остается самая ранняя строка (ее отчет —
+    отчет первой находки): маски классов объединяются (OR), источники
+    сливаются, адреса проверок переносятся в BreachEmail оставшейся строки.
+    Сводки затронутых пользователей пересчитываются.
+    """
+    Breach = apps.get_model('leaksmap', 'Breach')
+    BreachEmail = apps.get_model('leaksmap', 'BreachEmail')
+    DataClass = apps.get_model('leaksmap', 'DataClass')
+    UserBreachSummary = apps.get_model('leaksmap', 'UserBreachSummary')
+
+    groups = {}
+    rows = Breach.objects.order_by('pk') \
+        .values_list('pk', 'user_id', 'service_name', 'source', 'data_classes')
+    for pk, user_id, service_name, source, mask in rows.iterator(chunk_size=BATCH_SIZE):
+        # Строки без пользователя не участвуют в уникальности (NULL) — не сливаются
+        key = (user_id, _service_key(service_name)) if user_id else (None, pk)
+        groups.setdefault(key, []).append((pk, service_name, source, mask))
+
+    updated = []
+    duplicates = []
+    affected_users = set()
+    for (user_id, _), group in groups.items():
+        keep = group[0][0]
+        mask = 0
+        for _, _, _, row_mask in group:
+            mask |= row_mask
+        updated.append(Breach(
+            pk=keep,
+            service_key=_service_key(group[0][1]),
+            source=_merge_sources(source for _, _, source, _ in group),
+            data_classes=mask,
+        ))
+        others = [pk for pk, _, _, _ in group[1:]]
+        if others:
+            emails = set(BreachEmail.objects.filter(breach__in=others)
+                         .values_list('email', flat=True))
+            BreachEmail.objects.bulk_create(
+                [BreachEmail(breach_id=keep, email=email) for email in emails],
+                ignore_conflicts=True,
+            )
+            duplicates.extend(others)
+            affected_users.add(user_id)
+    Breach.objects.bulk_update(updated, ['service_key', 'source', 'data_classes'],
+                               batch_size=BATCH_SIZE)
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        Breach.objects.filter(pk__in=duplicates[start:start + BATCH_SIZE]).delete()
+
+    names = dict(DataClass.objects.exclude(bit=None).values_list('bit', 'name'))
+    for user_id in affected_users:
+        breaches = Breach.objects.filter(user=user_id)
+        by_data_class = {}
+        for mask in breaches.values_list('data_classes', flat=True):
+            for bit in range(MAX_BITS):
+                if mask >> bit & 1 and bit in names:
+                    by_data_class[names[bit]] = by_data_class.get(names[bit], 0) + 1
+        dates = breaches.aggregate(first=Min('breach_date'), last=Max('breach_date'))
+        UserBreachSummary.objects.update_or_create(user_id=user_id, defaults={
+            'total': breaches.count(),
+            'by_data_class': by_data_class,
+            'first_breach_date': dates['first'],
+            'last_breach_date': dates['last'],
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaksmap', '0014_breach_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='breach',
+            name='service_key',
+            field=models.CharField(default='', max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(merge_duplicate_breaches, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='breach',
+            constraint=models.UniqueConstraint(
+                fields=('user', 'service_key'), name='unique_breach_user_service_key'
+            ),
+        ),
+    ]
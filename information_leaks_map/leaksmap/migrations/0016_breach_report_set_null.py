@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaksmap', '0015_breach_service_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='breach',
+            name='report',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='breaches', to='leaksmap.report'),
+        ),
+    ]
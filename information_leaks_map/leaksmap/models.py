@@ -24,36 +24,73 @@ class Breach(models.Model):
         null=True,
         related_name='breaches'
     )
+    # Отчет первой находки. Удаление отчета не удаляет утечку: каскад обошел бы
+    # summary.delete_breaches, и UserBreachSummary разошлась бы со строками
     report = models.ForeignKey(
         'Report',
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='breaches'
+    )
+    # Описание и прочие общие для всех пользователей сведения хранятся в Service;
+    # имя сервиса остается в строке как часть естественного ключа
+    service = models.ForeignKey(
+        'Service',
+        on_delete=models.PROTECT,
         related_name='breaches'
     )
     service_name = models.CharField(max_length=255)
+    # Нормализованное имя сервиса (aggregator.normalize_service_name): по нему
+    # одна и та же утечка совпадает при любом написании имени и наборе провайдеров
+    service_key = models.CharField(max_length=255)
     breach_date = models.DateField()
     location = models.CharField(max_length=255, blank=True, null=True)
-    data_type = models.CharField(max_length=255, blank=True, null=True)
-    description = models.TextField()
+    # Битовая маска классов данных (см. leaksmap.data_classes)
+    data_classes = models.BigIntegerField(default=0)
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
         default='new'
     )
+    # Провайдеры, сообщившие об утечке, «A, B» по алфавиту (см. ingest.merge_sources)
     source = models.CharField(max_length=255, blank=True, null=True)
 
     def __str__(self):
         user_email = self.user.email if self.user else "Unknown User"
         return f"{self.service_name} - {self.breach_date} - {user_email}"
 
+    @property
+    def data_type(self) -> str:
+        """Классы данных строкой «A, B», как их отдают провайдеры."""
+        from .data_classes import format_data_classes
+
+        return format_data_classes(self.data_classes)
+
+    @property
+    def description(self) -> str:
+        return self.service.description
+
     class Meta:
         verbose_name = "Data Breach"
         verbose_name_plural = "Data Breaches"
         ordering = ['-breach_date']
         indexes = [
-            models.Index(fields=['user']),
+            # Выборки пользователя по диапазону дат и в порядке -breach_date
+            # (экспорт, визуализация, count в профиле) идут по индексу без сортировки;
+            # отдельный индекс по user не нужен — это префикс составных индексов
+            # Фильтр по типу данных — битовая операция над data_classes
+            # в строках этого индекса
+            models.Index(fields=['user', '-breach_date']),
             models.Index(fields=['service_name']),
             models.Index(fields=['status']),
         ]
+        constraints = [
+            # Естественный ключ утечки: по нему идет upsert в ingest.save_breaches
+            models.UniqueConstraint(
+                fields=['user', 'service_key'],
+                name='unique_breach_user_service_key',
+            ),
+        ]
 
     def clean(self):
         if not self.service_name:
@@ -64,12 +101,201 @@ class Breach(models.Model):
             raise ValidationError("Status is required.")
         if self.location and len(self.location) > 255:
             raise ValidationError("Location exceeds maximum length of 255 characters.")
-        if self.data_type and len(self.data_type) > 255:
-            raise ValidationError("Data type exceeds maximum length of 255 characters.")
         if self.source and len(self.source) > 255:
             raise ValidationError("Source exceeds maximum length of 255 characters.")
-        if self.description and len(self.description) > 1000:
-            raise ValidationError("Description exceeds maximum length of 1000 characters.")
+
+
+class BreachEmail(models.Model):
+    """
+    Адрес, при проверке которого найдена утечка.
+
+    Ключ Breach — (пользователь, сервис, источник), без email: одна строка
+    может относиться к нескольким проверенным адресам пользователя.
+    """
+    breach = models.ForeignKey(
+        Breach,
+        on_delete=models.CASCADE,
+        related_name='emails'
+    )
+    email = models.EmailField()
+
+    def __str__(self):
+        return f"{self.breach.service_name} - {self.email}"
+
+    class Meta:
+        verbose_name = "Breach Email"
+        verbose_name_plural = "Breach Emails"
+        indexes = [
+            # Фильтр утечек по проверенному email (emails__email)
+            models.Index(fields=['email']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['breach', 'email'],
+                name='unique_breach_email',
+            ),
+        ]
+
+
+class Service(models.Model):
+    """
+    Сервис, в котором произошла утечка: одна строка на сервис вместо
+    повторения описания в каждой записи Breach.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Service"
+        verbose_name_plural = "Services"
+        ordering = ['name']
+
+
+class DataClass(models.Model):
+    """
+    Класс данных утечки и номер его бита в Breach.data_classes.
+
+    ``bit`` пуст, если свободные биты закончились (класс не попадает в маску).
+    """
+    name = models.CharField(max_length=255, unique=True)
+    bit = models.PositiveSmallIntegerField(unique=True, blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Data Class"
+        verbose_name_plural = "Data Classes"
+        ordering = ['bit']
+
+
+class HIBPBreach(models.Model):
+    """
+    Локальная копия публичного каталога утечек HIBP (/breaches).
+
+    Проверка аккаунта запрашивает у HIBP только имена утечек, а описание,
+    дату и классы данных берет отсюда.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    title = models.CharField(max_length=255, blank=True)
+    domain = models.CharField(max_length=255, blank=True)
+    breach_date = models.DateField(blank=True, null=True)
+    added_date = models.DateTimeField(blank=True, null=True)
+    modified_date = models.DateTimeField(blank=True, null=True)
+    pwn_count = models.BigIntegerField(default=0)
+    description = models.TextField(blank=True)
+    data_classes = models.JSONField(default=list)
+    is_verified = models.BooleanField(default=True)
+    is_sensitive = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.name} ({self.breach_date})"
+
+    class Meta:
+        verbose_name = "HIBP Breach"
+        verbose_name_plural = "HIBP Breaches"
+        ordering = ['name']
+
+
+class PwnedPasswordRange(models.Model):
+    """
+    Сохраненный ответ Pwned Passwords range API для 5-символьного префикса SHA-1.
+
+    ``records`` — отсортированные записи фиксированной длины
+    (см. pwned_passwords.encode_range), по которым идет бинарный поиск.
+    """
+    prefix = models.CharField(max_length=5, unique=True)
+    records = models.BinaryField()
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.prefix} ({self.fetched_at})"
+
+    class Meta:
+        verbose_name = "Pwned Password Range"
+        verbose_name_plural = "Pwned Password Ranges"
+
+
+class BreachCheckJob(models.Model):
+    """
+    Задача проверки email в очереди (см. leaksmap.jobs).
+
+    Очередью служит сама таблица: воркер забирает самую старую задачу
+    в статусе ``queued`` условным UPDATE, поэтому брокер не нужен.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='breach_check_jobs'
+    )
+    email = models.EmailField()
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued'
+    )
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    report = models.ForeignKey(
+        'Report',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Check {self.email} - {self.get_status_display()}"
+
+    class Meta:
+        verbose_name = "Breach Check Job"
+        verbose_name_plural = "Breach Check Jobs"
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class UserBreachSummary(models.Model):
+    """
+    Сводка по утечкам пользователя для профиля и дашборда.
+
+    Обновляется в той же транзакции, что и записи Breach (см. leaksmap.summary),
+    поэтому страницам не нужно пересчитывать ее по сырым строкам.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='breach_summary'
+    )
+    total = models.PositiveIntegerField(default=0)
+    # {имя класса данных: число утечек с этим классом}
+    by_data_class = models.JSONField(default=dict)
+    first_breach_date = models.DateField(blank=True, null=True)
+    last_breach_date = models.DateField(blank=True, null=True)
+    last_checked_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary for {self.user.username}: {self.total}"
+
+    class Meta:
+        verbose_name = "User Breach Summary"
+        verbose_name_plural = "User Breach Summaries"
 
 class Feedback(models.Model):
     """
@@ -128,6 +354,7 @@ class Report(models.Model):
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['generated_at']),
+            models.Index(fields=['email']),
         ]
 
     def clean(self):
@@ -189,7 +416,7 @@ class UserProfile(models.Model):
     """
     Модель, представляющая профиль пользователя.
     """
-    user = models.OneToOneField(User, on_delete=models.PROTECT)
+    user = models.OneToOneField(User, on_delete=models.PROTECT, related_name='profile')
     bio = models.TextField(blank=True, null=True)
     location = models.CharField(max_length=255, blank=True, null=True)
     birth_date = models.DateField(blank=True, null=True)
@@ -215,12 +442,34 @@ class UserProfile(models.Model):
             raise ValidationError("Telegram ID exceeds maximum length of 255 characters.")
 
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    """
+    Создать профиль вместе с новым пользователем.
+
+    Обычные сохранения User (например, обновление last_login при каждом входе)
+    профиль не трогают: пользователям без профиля он создается лениво
+    в get_user_profile.
+    """
+    if not created or raw:
+        return
     try:
-        if created:
-            UserProfile.objects.create(user=instance)
-        else:
-            UserProfile.objects.get_or_create(user=instance)
+        UserProfile.objects.create(user=instance)
     except Exception as e:
         # Логирование ошибки
-        logger.error(f"Error creating or updating user profile: {e}")
+        logger.error(f"Error creating user profile: {e}")
+
+
+def get_user_profile(user):
+    """
+    Профиль пользователя, созданный при первом обращении, если его нет.
+
+    request.user загружается с профилем (см. backends.ProfileModelBackend),
+    поэтому запроса нет; для остальных объектов user это один запрос
+    по user_id, дальше профиль берется из кэша объекта.
+    """
+    try:
+        return user.profile
+    except UserProfile.DoesNotExist:
+        profile, _ = UserProfile.objects.get_or_create(user=user)
+        user.profile = profile
+        return profile
@@ -0,0 +1,155 @@
+"""
+Проверка пароля по базе Pwned Passwords (k-anonymity range API).
+
+На сервер уходят только первые 5 символов SHA-1 хэша пароля. Ответ для
+префикса (около тысячи суффиксов) сохраняется в базе и в памяти процесса,
+так что повторные проверки с тем же префиксом не ходят в сеть.
+"""
+import hashlib
+import logging
+import struct
+from typing import Optional, Tuple
+
+from django.utils import timezone
+
+from cache.cache_manager import CacheManager
+
+from .api_client import BaseAPIClient, ProviderError, get_setting, run_sync
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+SUFFIX_LENGTH = 35
+# Запись: 35 байт ASCII-суффикса + uint32 (big-endian) число утечек
+RECORD = struct.Struct(f">{SUFFIX_LENGTH}sI")
+
+
+def split_password_hash(password: str) -> Tuple[str, str]:
+    """(префикс, суффикс) SHA-1 хэша пароля в верхнем регистре."""
+    digest = hashlib.sha1(password.encode("utf-8")).hexdigest().upper()
+    return digest[:5], digest[5:]
+
+
+def encode_range(text: str) -> bytes:
+    """
+    Упаковать ответ range API в отсортированные записи фиксированной длины.
+
+    Строки-заполнители (Add-Padding, счетчик 0) отбрасываются.
+    """
+    records = []
+    for line in text.splitlines():
+        suffix, _, count = line.strip().partition(":")
+        if len(suffix) != SUFFIX_LENGTH or not count.isdigit() or int(count) == 0:
+            continue
+        records.append((suffix.upper().encode("ascii"), int(count)))
+    records.sort()
+    return b"".join(RECORD.pack(suffix, count) for suffix, count in records)
+
+
+def find_count(records: bytes, suffix: str) -> int:
+    """Бинарный поиск суффикса в упакованных записях, 0 если его нет."""
+    target = suffix.upper().encode("ascii")
+    low, high = 0, len(records) // RECORD.size
+    while low < high:
+        middle = (low + high) // 2
+        offset = middle * RECORD.size
+        candidate = records[offset:offset + SUFFIX_LENGTH]
+        if candidate < target:
+            low = middle + 1
+        elif candidate > target:
+            high = middle
+        else:
+            return RECORD.unpack_from(records, offset)[1]
+    return 0
+
+
+class PwnedPasswordsClient(BaseAPIClient):
+    """Клиент Pwned Passwords с постоянным кэшем диапазонов префиксов."""
+
+    PROVIDER_NAME = "PwnedPasswords"
+    # API не требует ключа и не ограничивает частоту, лимит лишь страхует от всплесков
+    DEFAULT_RATE_LIMIT = (600, 20)
+    BASE_URL = "https://api.pwnedpasswords.com/range"
+
+    def __init__(self, ttl: Optional[int] = None, memory_entries: int = 1024,
+                 **pool_options):
+        super().__init__(**pool_options)
+        if ttl is None:
+            ttl = get_setting('LEAKSMAP_PWNED_PASSWORDS_TTL', 7 * 24 * 3600)
+        self.ttl = ttl
+        # ~30 КБ на префикс, поэтому в памяти держим только самые используемые
+        self.memory = CacheManager(max_entries=memory_entries, default_ttl=self.ttl)
+        self._inflight = SingleFlight()
+
+    async def get_password_count(self, password: str, timeout: float = 10.0) -> int:
+        """
+        Сколько раз пароль встречается в известных утечках (0 — не найден).
+
+        :param password: Проверяемый пароль (в сеть не передается)
+        :param timeout: Таймаут запроса к API
+        """
+        prefix, suffix = split_password_hash(password)
+        records = self.memory.get(self.BASE_URL, {"prefix": prefix})
+        if records is None:
+            records = await self._inflight.do(
+                prefix, lambda: self._load_range(prefix, timeout)
+            )
+        return find_count(records, suffix)
+
+    async def _stored_range(self, prefix: str) -> Optional[Tuple[bytes, float]]:
+        """Диапазон из базы и его возраст в секундах или None, если его нет."""
+        from .models import PwnedPasswordRange
+
+        stored = await PwnedPasswordRange.objects.filter(prefix=prefix).afirst()
+        if stored is None:
+            return None
+        age = (timezone.now() - stored.fetched_at).total_seconds()
+        return bytes(stored.records), age
+
+    async def _save_range(self, prefix: str, records: bytes) -> None:
+        from .models import PwnedPasswordRange
+
+        await PwnedPasswordRange.objects.aupdate_or_create(
+            prefix=prefix,
+            defaults={"records": records, "fetched_at": timezone.now()},
+        )
+
+    async def _load_range(self, prefix: str, timeout: float) -> bytes:
+        stored = await self._stored_range(prefix)
+        if stored is not None and stored[1] < self.ttl:
+            records, age = stored
+            # В памяти диапазон живет остаток TTL строки, а не полный TTL заново
+            self.memory.set(self.BASE_URL, {"prefix": prefix}, records,
+                            ttl=self.ttl - age)
+            return records
+
+        if not self.breaker.allow_request():
+            # API недоступен: устаревший диапазон лучше ошибки, но в память
+            # его не кладем, чтобы после восстановления он обновился
+            if stored is not None:
+                return stored[0]
+            raise ProviderError(f"{self.PROVIDER_NAME} circuit breaker is open")
+
+        headers = {"Add-Padding": "true", "user-agent": "LeaksMap/1.0"}
+        text = await self._get_text(f"{self.BASE_URL}/{prefix}", timeout,
+                                    headers=headers)
+        records = encode_range(text)
+        await self._save_range(prefix, records)
+        self.memory.set(self.BASE_URL, {"prefix": prefix}, records)
+        return records
+
+
+_client: Optional[PwnedPasswordsClient] = None
+
+
+def get_pwned_passwords_client() -> PwnedPasswordsClient:
+    """Общий для процесса клиент Pwned Passwords."""
+    global _client
+    if _client is None:
+        _client = PwnedPasswordsClient()
+    return _client
+
+
+def check_password(password: str, timeout: float = 10.0) -> int:
+    """Синхронная обертка над get_password_count для обычных view."""
+    return run_sync(get_pwned_passwords_client().get_password_count(password, timeout))
@@ -80,3 +80,24 @@ def get_security_advice(breaches: List[Union[Dict, Breach]]) -> str:
 
     logger.info("Generated security advice")
     return advice
+
+
+def get_password_advice(count: int) -> str:
+    """
+    Provide advice based on how many times a password appeared in breaches.
+
+    Args:
+        count (int): Number of occurrences reported by Pwned Passwords.
+
+    Returns:
+        str: Password advice as a string.
+    """
+    if count:
+        advice = (f"Этот пароль встречался в утечках {count} раз(а). "
+                  "Немедленно смените его на всех сайтах, где он используется, "
+                  "и больше не используйте его.")
+    else:
+        advice = ("Пароль не найден в известных утечках. Тем не менее используйте "
+                  "уникальные пароли для каждого сайта и менеджер паролей.")
+    logger.info("Generated password advice")
+    return advice
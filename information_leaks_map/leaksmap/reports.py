@@ -65,6 +65,7 @@ def export_report(request, report_id):
             breaches = Breach.objects.filter(user=request.user, user__email=report.email)
         else:
             breaches = Breach.objects.filter(user=request.user)
+        breaches = breaches.select_related('service')
         
         if not breaches.exists():
             messages.warning(request, 'No breaches found for this report')
@@ -0,0 +1,49 @@
+"""
+Объединение одновременных одинаковых запросов (single-flight).
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Пока запрос с ключом выполняется, повторные вызовы с тем же ключом
+    не запускают новый, а ждут результат уже идущего.
+
+    Работа идет в отдельной задаче, поэтому отмена (например, по таймауту)
+    одного из ожидающих не прерывает запрос для остальных. Задачи привязаны
+    к event loop, так что ключ учитывает и текущий loop.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполнить ``func()`` или присоединиться к уже идущему вызову с тем же ключом.
+
+        :param key: Ключ объединения
+        :param func: Фабрика корутины, вызывается только для первого запроса
+        :return: Результат общей корутины
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (loop, key)
+        with self._lock:
+            task = self._calls.get(call_key)
+            if task is None:
+                task = loop.create_task(func())
+                self._calls[call_key] = task
+                task.add_done_callback(lambda _: self._forget(call_key, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, call_key, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._calls.get(call_key) is task:
+                del self._calls[call_key]
+
+    def in_flight(self) -> int:
+        """Количество выполняющихся сейчас запросов."""
+        with self._lock:
+            return len(self._calls)
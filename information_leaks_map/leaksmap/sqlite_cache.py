@@ -0,0 +1,217 @@
+"""
+Бэкенд django.core.cache поверх одной таблицы SQLite в режиме WAL.
+
+Предназначен для L2 кэша ответов провайдеров (см. tiered_cache): данные
+переживают деплой и перезапуск воркеров, так что после старта воркеры читают
+накопленные ответы с диска, а не идут к провайдерам все разом.
+
+Чтение — поиск по первичному ключу в отображенном в память (mmap) файле.
+WAL позволяет читать из нескольких процессов, пока один пишет. Объем файла
+ограничен MAX_SIZE_GB: при превышении сначала удаляются истекшие записи,
+затем записи с ближайшим сроком истечения. Проверка объема идет в фоновом
+потоке, чтобы set не ждал удаления записей.
+
+Пример настройки::
+
+    CACHES['provider_responses'] = {
+        'BACKEND': 'leaksmap.sqlite_cache.SQLiteCache',
+        'LOCATION': '/var/lib/leaksmap/provider_cache.sqlite3',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_SIZE_GB': 2},
+    }
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entry_expires ON cache_entry (expires);
+"""
+
+
+class SQLiteCache(BaseCache):
+    """
+    Кэш в файле SQLite (LOCATION — путь к файлу).
+
+    OPTIONS:
+        MAX_SIZE_GB — предельный объем файла в гигабайтах (по умолчанию 1);
+        MMAP_SIZE_MB — сколько файла отображать в память (по умолчанию 256);
+        COMPACT_EVERY — через сколько записей проверять объем и удалять истекшие.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.path = location
+        self.max_bytes = int(float(options.get("MAX_SIZE_GB", 1)) * 1024 ** 3)
+        self.mmap_size = int(options.get("MMAP_SIZE_MB", 256)) * 1024 ** 2
+        self.compact_every = int(options.get("COMPACT_EVERY", 1000))
+        self._local = threading.local()
+        self._writes = 0
+        self._compacting = False
+        self._writes_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Соединение текущего потока (sqlite3 не разделяет соединения
+        между потоками).
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            # auto_vacuum действует только для нового файла, до создания таблиц
+            connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA mmap_size={self.mmap_size}")
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def _after_write(self) -> None:
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self.compact_every == 0 and not self._compacting
+            if due:
+                self._compacting = True
+        if due:
+            threading.Thread(target=self._compact_in_background,
+                             name="leaksmap-sqlite-cache-compact", daemon=True).start()
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except Exception:
+            logger.exception(f"SQLite cache {self.path}: compaction failed")
+        finally:
+            # Соединение принадлежит этому потоку и после его завершения не нужно
+            connection = getattr(self._local, "connection", None)
+            if connection is not None:
+                connection.close()
+            with self._writes_lock:
+                self._compacting = False
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            "SELECT value, expires FROM cache_entry WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires = row
+        if expires is not None and expires <= time.time():
+            return default
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entry (key, value, expires) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+             self.get_backend_timeout(timeout)),
+        )
+        self._after_write()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # Истекшая запись не мешает add: она заменяется, как будто ее нет
+        cursor = self._connection().execute(
+            "INSERT INTO cache_entry (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE "
+            "SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache_entry.expires IS NOT NULL AND cache_entry.expires <= ?",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+             self.get_backend_timeout(timeout), time.time()),
+        )
+        if cursor.rowcount:
+            self._after_write()
+        return bool(cursor.rowcount)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            "UPDATE cache_entry SET expires = ? "
+            "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return bool(cursor.rowcount)
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entry WHERE key = ?", (key,)
+        )
+        return bool(cursor.rowcount)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            "SELECT 1 FROM cache_entry "
+            "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def clear(self):
+        connection = self._connection()
+        connection.execute("DELETE FROM cache_entry")
+        connection.execute("PRAGMA incremental_vacuum")
+
+    def size_bytes(self) -> int:
+        """Занятый данными объем файла (без свободных страниц)."""
+        connection = self._connection()
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def compact(self) -> int:
+        """
+        Удалить истекшие записи и, если файл больше MAX_SIZE_GB, записи
+        с ближайшим сроком истечения (вечные — в последнюю очередь).
+
+        :return: Число удаленных записей
+        """
+        connection = self._connection()
+        removed = connection.execute(
+            "DELETE FROM cache_entry WHERE expires <= ?", (time.time(),)
+        ).rowcount
+        size = self.size_bytes()
+        while size > self.max_bytes:
+            # Доля удаляемых записей — по доле превышения объема
+            # (записи примерно одного размера)
+            count = connection.execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0]
+            batch = count * (size - self.max_bytes) // size + 1
+            evicted = connection.execute(
+                "DELETE FROM cache_entry WHERE key IN ("
+                "SELECT key FROM cache_entry "
+                "ORDER BY expires IS NULL, expires LIMIT ?)",
+                (batch,),
+            ).rowcount
+            if not evicted:
+                break
+            removed += evicted
+            size = self.size_bytes()
+        if removed:
+            connection.execute("PRAGMA incremental_vacuum")
+            logger.info(f"SQLite cache {self.path}: removed {removed} entries")
+        return removed
+
+    def close(self, **kwargs):
+        # Соединение потока живет между запросами: открывать его на каждый
+        # запрос дороже чтения
+        pass
@@ -77,6 +77,26 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Опрос статуса фоновой проверки, пока она не завершится
+    function pollCheckJob(url, delay = 1000) {
+        return fetch(url, { credentials: 'same-origin' })
+            .then(r => r.json())
+            .then(data => {
+                if (data.status === 'queued' || data.status === 'running') {
+                    return new Promise(resolve => setTimeout(resolve, delay))
+                        .then(() => pollCheckJob(url, Math.min(delay * 1.5, 5000)));
+                }
+                if (data.status === 'failed') {
+                    // Провайдеры не ответили — показываем, что с каждым из них
+                    const providers = Object.entries(data.providers || {})
+                        .map(([name, status]) => `${name}: ${status}`)
+                        .join(', ');
+                    throw new Error(providers ? `${data.error} (${providers})` : data.error);
+                }
+                return data;
+            });
+    }
+
     // Check leaks form (POST)
     const checkLeaksForm = document.getElementById('check-leaks-form');
 if (checkLeaksForm) {
@@ -100,8 +120,15 @@ if (checkLeaksForm) {
             body: formData
         })
         .then(r => r.json())
-        .then(data => showNotification('OK!', 'success'))
-        .catch(err => showNotification('Ошибка: ' + err, 'danger'));
+        .then(data => {
+            if (!data.status_url) throw new Error(data.error || 'не удалось поставить проверку в очередь');
+            return pollCheckJob(data.status_url);
+        })
+        .then(data => showNotification(
+            data.count ? `Найдено утечек: ${data.count}` : 'Утечки не найдены',
+            data.count ? 'warning' : 'success'
+        ))
+        .catch(err => showNotification('Ошибка: ' + err.message, 'danger'));
     });
     }
     // Export report form (POST) 
@@ -125,17 +152,22 @@ if (checkLeaksForm) {
             formData.append('format', format);
             formData.append('csrfmiddlewaretoken', csrfToken); 
 
-            fetch('/export_report/', {
+            fetch('/export_report/download/', {
                 method: 'POST',
                 credentials: 'same-origin',
                 body: formData
             })
             .then(response => {
                 if (!response.ok) throw new Error(`HTTP ${response.status}`);
-                return response.json();
+                return response.blob();
             })
-            .then(data => {
-                showNotification(data.message || 'Отчет экспортирован!', 'success');
+            .then(blob => {
+                const link = document.createElement('a');
+                link.href = URL.createObjectURL(blob);
+                link.download = 'report.' + format;
+                link.click();
+                URL.revokeObjectURL(link.href);
+                showNotification('Отчет экспортирован!', 'success');
             })
             .catch(error => {
                 showNotification('Ошибка экспорта: ' + error.message, 'danger');
@@ -0,0 +1,155 @@
+"""
+Поддержка UserBreachSummary в актуальном состоянии.
+
+Все функции, меняющие утечки пользователя, вызываются внутри транзакции
+изменения и применяют к сводке разницу, а не пересчитывают ее целиком.
+"""
+import logging
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .data_classes import get_registry
+
+if TYPE_CHECKING:
+    from .models import UserBreachSummary
+
+logger = logging.getLogger(__name__)
+
+
+def _locked_summary(user):
+    """
+    Сводка пользователя, заблокированная до конца транзакции
+    (создается при необходимости).
+    """
+    from .models import UserBreachSummary
+
+    # По user_id: создание с user=user закэшировало бы на объекте user сводку
+    # в состоянии до изменения, и get_summary вернул бы ее
+    UserBreachSummary.objects.get_or_create(user_id=user.pk)
+    return UserBreachSummary.objects.select_for_update().get(user=user)
+
+
+def _class_counts(masks: Iterable[int]) -> Counter:
+    registry = get_registry()
+    counts: Counter = Counter()
+    for mask in masks:
+        counts.update(registry.names_for(mask))
+    return counts
+
+
+def _apply(summary, total_delta: int, class_delta: Counter) -> None:
+    summary.total = max(0, summary.total + total_delta)
+    by_data_class = dict(summary.by_data_class)
+    for name, delta in class_delta.items():
+        count = by_data_class.get(name, 0) + delta
+        if count > 0:
+            by_data_class[name] = count
+        else:
+            by_data_class.pop(name, None)
+    summary.by_data_class = by_data_class
+
+
+def _refresh_dates(summary) -> None:
+    # MIN/MAX по индексу (user, -breach_date) — два чтения края индекса
+    from .models import Breach
+
+    dates = Breach.objects.filter(user=summary.user_id).aggregate(
+        first=Min('breach_date'), last=Max('breach_date')
+    )
+    summary.first_breach_date = dates['first']
+    summary.last_breach_date = dates['last']
+
+
+def lock_for_upsert(user):
+    """
+    Начать обновление сводки перед upsert'ом утечек.
+
+    Вызывается внутри транзакции ingest до записи Breach: блокировка
+    сводки упорядочивает параллельные сохранения одного пользователя.
+    """
+    return _locked_summary(user)
+
+
+def apply_upsert(summary, previous: Dict, current: Dict) -> None:
+    """
+    Учесть upsert пакета утечек.
+
+    :param summary: Сводка из lock_for_upsert
+    :param previous: {ключ: маска классов} строк, существовавших до upsert
+    :param current: {ключ: маска классов} всех строк пакета после upsert
+    """
+    class_delta = _class_counts(current.values())
+    class_delta.subtract(_class_counts(previous.values()))
+    _apply(summary, len(current.keys() - previous.keys()), class_delta)
+    _refresh_dates(summary)
+    summary.last_checked_at = timezone.now()
+    summary.save()
+
+
+def delete_breaches(user, breaches) -> int:
+    """
+    Удалить утечки пользователя и вычесть их из сводки.
+
+    :param user: Владелец утечек
+    :param breaches: QuerySet удаляемых Breach (сужается до утечек ``user``)
+    :return: Число удаленных утечек (без каскадно удаленных связанных строк)
+    """
+    with transaction.atomic():
+        summary = _locked_summary(user)
+        breaches = breaches.filter(user=user)
+        masks = list(breaches.values_list('data_classes', flat=True))
+        _, deleted = breaches.delete()
+        class_delta = Counter()
+        class_delta.subtract(_class_counts(masks))
+        _apply(summary, -len(masks), class_delta)
+        _refresh_dates(summary)
+        summary.save()
+    return deleted.get(breaches.model._meta.label, 0)
+
+
+def mark_checked(user) -> None:
+    """Отметить проверку без найденных утечек (меняется только last_checked_at)."""
+    from .models import UserBreachSummary
+
+    summary, created = UserBreachSummary.objects.get_or_create(
+        user_id=user.pk, defaults={'last_checked_at': timezone.now()}
+    )
+    if not created:
+        UserBreachSummary.objects.filter(pk=summary.pk) \
+            .update(last_checked_at=timezone.now())
+
+
+def rebuild_summary(user):
+    """Полный пересчет сводки по строкам Breach (для восстановления)."""
+    from .models import Breach
+
+    with transaction.atomic():
+        summary = _locked_summary(user)
+        masks = list(
+            Breach.objects.filter(user=user).values_list('data_classes', flat=True)
+        )
+        summary.total = len(masks)
+        summary.by_data_class = dict(_class_counts(masks))
+        _refresh_dates(summary)
+        summary.save()
+    return summary
+
+
+def get_summary(user) -> Optional['UserBreachSummary']:
+    """
+    Сводка пользователя или None, если проверок еще не было.
+
+    Если user загружен с ``select_related('breach_summary')``
+    (см. backends.ProfileModelBackend), запроса нет и сводка — на момент
+    загрузки user.
+    """
+    from .models import UserBreachSummary
+
+    # request.user — SimpleLazyObject, его __class__ отдает класс User
+    if user.__class__.breach_summary.is_cached(user):
+        return getattr(user, 'breach_summary', None)
+    return UserBreachSummary.objects.filter(user=user).first()
@@ -1,16 +1,38 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
-from .models import Breach
+from . import summary
+from .backends import ProfileModelBackend
+from .data_classes import get_registry
+from .ingest import save_breaches
+from .jobs import claim_next_job, process_job, requeue_stale_jobs
+from .models import (Breach, BreachCheckJob, Report, Service, UserBreachSummary,
+                     get_user_profile)
+from .views import filter_breaches
 
 class ViewsTestCase(TestCase):
     def setUp(self):
+        get_registry().clear()
         self.user = User.objects.create_user(username='testuser', password='password')
+        self.report = Report.objects.create(user=self.user,
+                                            email='testuser@example.com')
         self.breach = Breach.objects.create(
             user=self.user,
+            report=self.report,
+            service=Service.objects.create(name='Test Service',
+                                           description='Test breach'),
             service_name='Test Service',
+            service_key='testservice',
             breach_date='2023-01-01',
-            description='Test breach'
+            data_classes=get_registry().mask_for(['Email addresses', 'Passwords']),
         )
 
     def test_get_security_advice(self):
@@ -37,7 +59,8 @@ class ViewsTestCase(TestCase):
     def test_check_leaks(self):
         self.client.login(username='testuser', password='password')
         response = self.client.post(reverse('check_leaks'), {'email': 'testuser@example.com'})
-        self.assertEqual(response.status_code, 200)
+        # Проверка ставится в очередь BreachCheckJob, результат — по job_id
+        self.assertEqual(response.status_code, 202)
         self.assertIn('status', response.json())
 
     def test_user_logout(self):
@@ -97,6 +120,391 @@ class ViewsTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('status', response.json())
 
+
+class SaveBreachesTestCase(TestCase):
+    def setUp(self):
+        # Реестр классов общий для процесса, а строки DataClass откатываются после теста
+        get_registry().clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+
+    def _breach(self, data_type, **extra):
+        return dict({
+            'service_name': 'Adobe',
+            'breach_date': '2013-10-04',
+            'data_type': data_type,
+            'description': 'Adobe breach',
+            'source': 'HaveIBeenPwned',
+        }, **extra)
+
+    def test_upsert_keeps_first_report_and_merges_data_classes(self):
+        report_a = Report.objects.create(user=self.user, email='a@example.com')
+        report_b = Report.objects.create(user=self.user, email='b@example.com')
+
+        save_breaches(self.user, [self._breach('Email addresses, Passwords')], report_a)
+        save_breaches(self.user, [self._breach('Usernames', location='Moscow')],
+                      report_b)
+
+        breach = Breach.objects.get(user=self.user)
+        self.assertEqual(breach.report, report_a)
+        self.assertEqual(breach.location, 'Moscow')
+        self.assertEqual(set(breach.data_type.split(', ')),
+                         {'Email addresses', 'Passwords', 'Usernames'})
+        self.assertEqual(breach.description, 'Adobe breach')
+
+    def test_checked_emails_are_kept_per_breach(self):
+        report_a = Report.objects.create(user=self.user, email='a@example.com')
+        report_b = Report.objects.create(user=self.user, email='b@example.com')
+        save_breaches(self.user, [self._breach('Passwords')], report_a)
+        save_breaches(self.user, [
+            self._breach('Passwords'),
+            self._breach('Usernames', service_name='Yahoo'),
+        ], report_b)
+
+        def services(email):
+            breaches = filter_breaches(Breach.objects.all(), {'email': email})
+            return sorted(breaches.values_list('service_name', flat=True))
+
+        self.assertEqual(services('a@example.com'), ['Adobe'])
+        self.assertEqual(services('b@example.com'), ['Adobe', 'Yahoo'])
+
+    def test_batch_is_saved_with_one_upsert_statement(self):
+        report = Report.objects.create(user=self.user, email='a@example.com')
+        save_breaches(self.user, [self._breach('Passwords')], report)
+        breach_id = Breach.objects.get(user=self.user).pk
+
+        with CaptureQueriesContext(connection) as queries:
+            save_breaches(self.user, [
+                self._breach('Usernames'),
+                self._breach('Passwords', service_name='Yahoo'),
+            ], report)
+
+        inserts = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT INTO "leaksmap_breach" ')]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn('ON CONFLICT', inserts[0])
+        self.assertEqual(Breach.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Breach.objects.get(service_name='Adobe').pk, breach_id)
+
+    def test_duplicates_in_one_batch_are_merged(self):
+        report = Report.objects.create(user=self.user, email='a@example.com')
+
+        rows = save_breaches(self.user, [
+            self._breach('Passwords'),
+            self._breach('Usernames'),
+        ], report)
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(Breach.objects.get(user=self.user).data_type,
+                         'Passwords, Usernames')
+
+    def test_same_breach_is_one_row_for_any_provider_order(self):
+        report = Report.objects.create(user=self.user, email='a@example.com')
+
+        save_breaches(self.user, [
+            self._breach('Passwords', source='LeakCheck, HaveIBeenPwned'),
+        ], report)
+        save_breaches(self.user, [
+            self._breach('Usernames', source='HaveIBeenPwned, LeakCheck'),
+        ], report)
+        save_breaches(self.user, [
+            self._breach('Usernames', service_name='adobe', source='LeakCheck'),
+        ], report)
+
+        breach = Breach.objects.get(user=self.user)
+        self.assertEqual(breach.service_name, 'Adobe')
+        self.assertEqual(breach.source, 'HaveIBeenPwned, LeakCheck')
+        self.assertEqual(breach.data_type, 'Passwords, Usernames')
+        self.assertEqual(UserBreachSummary.objects.get(user=self.user).total, 1)
+
+
+class SummaryTestCase(TestCase):
+    def setUp(self):
+        get_registry().clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.report = Report.objects.create(user=self.user, email='a@example.com')
+
+    def _save(self, *breaches):
+        save_breaches(self.user, [
+            {'service_name': name, 'breach_date': breach_date, 'data_type': data_type}
+            for name, breach_date, data_type in breaches
+        ], self.report)
+        return UserBreachSummary.objects.get(user=self.user)
+
+    def test_upsert_applies_deltas_in_the_same_transaction(self):
+        self._save(('Adobe', '2013-10-04', 'Passwords'),
+                   ('Yahoo', '2013-08-01', 'Email addresses, Passwords'))
+        user_summary = self._save(('Adobe', '2013-10-04', 'Usernames'),
+                                  ('LinkedIn', '2016-05-17', 'Passwords'))
+
+        self.assertEqual(user_summary.total, 3)
+        self.assertEqual(user_summary.by_data_class,
+                         {'Passwords': 3, 'Email addresses': 1, 'Usernames': 1})
+        self.assertEqual(str(user_summary.first_breach_date), '2013-08-01')
+        self.assertEqual(str(user_summary.last_breach_date), '2016-05-17')
+        self.assertIsNotNone(user_summary.last_checked_at)
+
+        rebuilt = summary.rebuild_summary(self.user)
+        self.assertEqual((rebuilt.total, rebuilt.by_data_class),
+                         (user_summary.total, user_summary.by_data_class))
+
+    def test_delete_subtracts_breaches(self):
+        self._save(('Adobe', '2013-10-04', 'Passwords'),
+                   ('Yahoo', '2013-08-01', 'Email addresses, Passwords'))
+
+        deleted = summary.delete_breaches(
+            self.user, Breach.objects.filter(service_name='Yahoo')
+        )
+
+        user_summary = UserBreachSummary.objects.get(user=self.user)
+        self.assertEqual(deleted, 1)
+        self.assertEqual(user_summary.total, 1)
+        self.assertEqual(user_summary.by_data_class, {'Passwords': 1})
+        self.assertEqual(str(user_summary.first_breach_date), '2013-10-04')
+
+    def test_delete_ignores_other_users_breaches(self):
+        self._save(('Adobe', '2013-10-04', 'Passwords'))
+        other = User.objects.create_user(username='other', password='password')
+
+        deleted = summary.delete_breaches(other, Breach.objects.all())
+
+        self.assertEqual(deleted, 0)
+        self.assertEqual(Breach.objects.filter(user=self.user).count(), 1)
+
+    def test_empty_check_only_marks_checked(self):
+        self.assertIsNone(summary.get_summary(self.user))
+
+        save_breaches(self.user, [], self.report)
+
+        user_summary = summary.get_summary(self.user)
+        self.assertEqual((user_summary.total, user_summary.by_data_class), (0, {}))
+        self.assertIsNotNone(user_summary.last_checked_at)
+
+    def test_deleting_report_keeps_breaches_and_summary(self):
+        self._save(('Adobe', '2013-10-04', 'Passwords'))
+
+        self.report.delete()
+
+        breach = Breach.objects.get(user=self.user)
+        self.assertIsNone(breach.report)
+        self.assertEqual(summary.get_summary(self.user).total, 1)
+
+    def test_session_user_is_loaded_with_profile_and_summary(self):
+        self._save(('Adobe', '2013-10-04', 'Passwords'))
+
+        with self.assertNumQueries(1):
+            user = ProfileModelBackend().get_user(self.user.pk)
+            self.assertEqual(summary.get_summary(user).total, 1)
+            self.assertEqual(get_user_profile(user).user_id, self.user.pk)
+
+
+class FakeCheckAggregator:
+    clients = ['fake']
+
+    def __init__(self, breaches=None, error=None, status='ok'):
+        self.breaches = breaches or []
+        self.error = error
+        self.status = status
+
+    async def get_breach_info_by_email(self, email):
+        if self.error:
+            raise self.error
+        return {'breaches': self.breaches, 'providers': {'fake': self.status}}
+
+
+class BreachCheckJobTestCase(TestCase):
+    def setUp(self):
+        get_registry().clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+
+    def test_claim_takes_oldest_queued_job_once(self):
+        first = BreachCheckJob.objects.create(user=self.user, email='a@example.com')
+        second = BreachCheckJob.objects.create(user=self.user, email='b@example.com')
+
+        claimed = [claim_next_job(), claim_next_job(), claim_next_job()]
+
+        self.assertEqual([job.pk for job in claimed[:2]], [first.pk, second.pk])
+        self.assertIsNone(claimed[2])
+        self.assertEqual(claimed[0].status, 'running')
+        self.assertIsNotNone(claimed[0].started_at)
+
+    def test_claim_skips_job_taken_by_another_worker(self):
+        BreachCheckJob.objects.create(user=self.user, email='a@example.com',
+                                      status='running')
+
+        self.assertIsNone(claim_next_job())
+
+    def test_process_job_saves_result_and_report(self):
+        BreachCheckJob.objects.create(user=self.user, email='a@example.com')
+        aggregator = FakeCheckAggregator([
+            {'service_name': 'Adobe', 'breach_date': '2013-10-04',
+             'data_type': 'Passwords'},
+        ])
+
+        process_job(claim_next_job(), aggregator)
+
+        job = BreachCheckJob.objects.get()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.result['count'], 1)
+        self.assertEqual(job.result['providers'], {'fake': 'ok'})
+        self.assertEqual(job.report.email, 'a@example.com')
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(Breach.objects.get(user=self.user).report, job.report)
+
+    def test_process_job_records_error(self):
+        BreachCheckJob.objects.create(user=self.user, email='a@example.com')
+
+        aggregator = FakeCheckAggregator(error=RuntimeError('provider down'))
+
+        process_job(claim_next_job(), aggregator)
+
+        job = BreachCheckJob.objects.get()
+        self.assertEqual((job.status, job.error), ('failed', 'provider down'))
+        self.assertIsNone(job.report)
+
+    def test_process_job_fails_when_no_provider_answered(self):
+        BreachCheckJob.objects.create(user=self.user, email='a@example.com')
+
+        process_job(claim_next_job(), FakeCheckAggregator(status='timeout'))
+
+        job = BreachCheckJob.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.result, {'providers': {'fake': 'timeout'}})
+        self.assertFalse(UserBreachSummary.objects.filter(
+            user=self.user, last_checked_at__isnull=False).exists())
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('check_job_status', args=[job.pk]))
+        self.assertEqual(response.json()['providers'], {'fake': 'timeout'})
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale = BreachCheckJob.objects.create(
+            user=self.user, email='a@example.com', status='running',
+            started_at=timezone.now() - timedelta(minutes=10),
+        )
+        BreachCheckJob.objects.create(
+            user=self.user, email='b@example.com', status='running',
+            started_at=timezone.now(),
+        )
+
+        self.assertEqual(requeue_stale_jobs(300), 1)
+
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.started_at), ('queued', None))
+        self.assertEqual(claim_next_job().pk, stale.pk)
+
+
+class ExportReportTestCase(TestCase):
+    def setUp(self):
+        get_registry().clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        report = Report.objects.create(user=self.user, email='a@example.com')
+        save_breaches(self.user, [
+            {'service_name': f'Service {i}', 'breach_date': '2020-01-01',
+             'data_type': 'Passwords'}
+            for i in range(5)
+        ], report)
+        self.client.login(username='testuser', password='password')
+
+    def _export(self, report_format):
+        return self.client.post(reverse('api_export_report'), {
+            'email': 'a@example.com',
+            'format': report_format,
+        })
+
+    def test_html_report_is_streamed_asynchronously(self):
+        response = self._export('html')
+
+        self.assertEqual(response['Content-Type'], 'text/html')
+        self.assertTrue(response.is_async)
+
+        async def read_body():
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        body = async_to_sync(read_body)().decode()
+        self.assertIn('Service 4', body)
+
+    def test_pdf_format_returns_pdf(self):
+        response = self._export('pdf')
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+
+class FakeAggregator:
+    clients = ['fake']
+
+    def __init__(self, results):
+        self.results = results
+
+    async def iter_many(self, emails, concurrency):
+        for email in emails:
+            yield email, {
+                'breaches': self.results.get(email, []),
+                'providers': {'fake': 'ok'},
+            }
+
+
+class BulkCheckTestCase(TestCase):
+    def setUp(self):
+        get_registry().clear()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.client.login(username='testuser', password='password')
+
+    def test_each_address_gets_its_own_report(self):
+        adobe = {'service_name': 'Adobe', 'breach_date': '2013-10-04',
+                 'data_type': 'Passwords'}
+        yahoo = {'service_name': 'Yahoo', 'breach_date': '2013-08-01',
+                 'data_type': 'Usernames'}
+        aggregator = FakeAggregator({
+            'a@example.com': [adobe],
+            'b@example.com': [adobe, yahoo],
+        })
+
+        with patch('leaksmap.views.get_breach_aggregator', return_value=aggregator):
+            response = self.client.post(reverse('bulk_check_leaks'), {
+                'emails': 'a@example.com, b@example.com, c@example.com',
+            })
+
+            async def read_lines():
+                return [json.loads(line) async for line in response.streaming_content]
+
+            self.assertTrue(response.is_async)
+            lines = async_to_sync(read_lines)()
+
+        self.assertEqual(lines[-1], {'status': 'done', 'total': 3, 'with_breaches': 2})
+        reports = {line['email']: line['report_id'] for line in lines[:-1]}
+        self.assertIsNone(reports['c@example.com'])
+        self.assertEqual(Report.objects.get(pk=reports['b@example.com']).email,
+                         'b@example.com')
+        adobe_breach = Breach.objects.get(service_name='Adobe')
+        self.assertEqual(adobe_breach.report_id, reports['a@example.com'])
+        self.assertEqual(
+            sorted(adobe_breach.emails.values_list('email', flat=True)),
+            ['a@example.com', 'b@example.com'],
+        )
+
+    @override_settings(LEAKSMAP_INGEST_BATCH_SIZE=1)
+    def test_failed_batch_is_not_saved_again(self):
+        adobe = {'service_name': 'Adobe', 'breach_date': '2013-10-04',
+                 'data_type': 'Passwords'}
+        aggregator = FakeAggregator({'a@example.com': [adobe]})
+        save = AsyncMock(side_effect=RuntimeError('db down'))
+
+        with patch('leaksmap.views.get_breach_aggregator', return_value=aggregator), \
+                patch('leaksmap.views.asave_checks', save):
+            response = self.client.post(reverse('bulk_check_leaks'), {
+                'emails': 'a@example.com',
+            })
+
+            async def read_lines():
+                return [line async for line in response.streaming_content]
+
+            with self.assertRaisesMessage(RuntimeError, 'db down'):
+                async_to_sync(read_lines)()
+
+        save.assert_awaited_once()
+        self.assertFalse(UserBreachSummary.objects.filter(user=self.user).exists())
+
 def test_help_page(self) -> None:
     self.client.login(username='testuser', password='password')
     response = self.client.get(reverse('help_page'))
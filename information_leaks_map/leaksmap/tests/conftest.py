@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    """Клиенты построены на aiohttp, который работает только поверх asyncio."""
+    return "asyncio"
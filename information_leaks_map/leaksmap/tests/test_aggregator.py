@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from leaksmap.aggregator import BreachAggregator, merge_breaches
+from leaksmap.api_client import BreachLookup
+
+
+class FakeClient:
+    """Провайдер с заданной задержкой и ответом."""
+
+    def __init__(self, name, breaches, delay=0.0):
+        self.PROVIDER_NAME = name
+        self.breaches = breaches
+        self.delay = delay
+
+    async def get_breach_info_by_email(self, email, timeout=10.0):
+        await asyncio.sleep(self.delay)
+        return self.breaches
+
+    async def lookup(self, email, timeout=10.0):
+        return BreachLookup(await self.get_breach_info_by_email(email, timeout), "ok")
+
+
+def _breach(name, source, data_type="Unknown", breach_date="Unknown"):
+    return {
+        "service_name": name,
+        "breach_date": breach_date,
+        "location": "Unknown",
+        "data_type": data_type,
+        "description": "Breach detected",
+        "source": source,
+    }
+
+
+def test_merge_breaches_deduplicates_by_normalized_service_name():
+    merged = merge_breaches([
+        [_breach("LinkedIn", "LeakCheck", "Passwords")],
+        [_breach("linked-in", "HaveIBeenPwned", "Email addresses, Passwords",
+                 "2012-05-05")],
+    ])
+
+    assert len(merged) == 1
+    assert merged[0]["breach_date"] == "2012-05-05"
+    assert merged[0]["data_type"] == "Passwords, Email addresses"
+    assert merged[0]["source"] == "LeakCheck, HaveIBeenPwned"
+
+
+@pytest.mark.anyio
+async def test_aggregator_returns_partial_results_on_timeout():
+    aggregator = BreachAggregator(
+        [
+            FakeClient("LeakCheck", [_breach("Adobe", "LeakCheck")]),
+            FakeClient("HaveIBeenPwned", [_breach("Yahoo", "HaveIBeenPwned")],
+                       delay=1.0),
+        ],
+        timeouts={"HaveIBeenPwned": 0.05},
+    )
+
+    result = await aggregator.get_breach_info_by_email("test@example.com")
+
+    assert [b["service_name"] for b in result["breaches"]] == ["Adobe"]
+    assert result["providers"] == {"LeakCheck": "ok", "HaveIBeenPwned": "timeout"}
+
+
+@pytest.mark.anyio
+async def test_iter_providers_yields_fastest_provider_first():
+    aggregator = BreachAggregator([
+        FakeClient("LeakCheck", [_breach("Adobe", "LeakCheck")], delay=0.1),
+        FakeClient("HaveIBeenPwned", [], delay=0.0),
+    ])
+
+    results = [item async for item in aggregator.iter_providers("test@example.com")]
+
+    assert [(name, status) for name, _, status in results] == [
+        ("HaveIBeenPwned", "ok"),
+        ("LeakCheck", "ok"),
+    ]
+    assert results[1][1][0]["service_name"] == "Adobe"
+
+
+@pytest.mark.anyio
+async def test_iter_many_bounds_concurrency():
+    active = 0
+    peak = 0
+
+    class CountingClient(FakeClient):
+        async def get_breach_info_by_email(self, email, timeout=10.0):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return []
+
+    aggregator = BreachAggregator([CountingClient("LeakCheck", [])])
+    emails = [f"user{i}@example.com" for i in range(20)]
+
+    results = [email async for email, _ in aggregator.iter_many(emails, concurrency=3)]
+
+    assert sorted(results) == sorted(emails)
+    assert peak == 3
+
+
+@pytest.mark.anyio
+async def test_iter_many_rejects_zero_concurrency():
+    aggregator = BreachAggregator([FakeClient("LeakCheck", [])])
+
+    with pytest.raises(ValueError):
+        async for _ in aggregator.iter_many(["a@example.com"], concurrency=0):
+            pass
@@ -1,6 +1,9 @@
 import pytest
 import asyncio
 import sys
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from leaksmap.throttling import AsyncTokenBucket
 sys.path.append('e:/проекты/Карта информационных утечек/information_leaks_map')
 from leaksmap.api_client import LeakCheckAPIClient, HaveIBeenPwnedAPIClient
 
@@ -33,5 +36,68 @@ async def test_haveibeenpwned_api_client():
         assert isinstance(breaches, list)
         assert all(isinstance(breach, dict) for breach in breaches)
 
+
+@pytest.mark.anyio
+async def test_client_reuses_pooled_session():
+    """Повторные обращения используют одну keep-alive сессию."""
+    client = LeakCheckAPIClient("test_api_key", limit_per_host=3)
+
+    session = await client._get_session()
+    assert await client._get_session() is session
+    assert session.connector.limit_per_host == 3
+
+    await client.close()
+    assert session.closed
+    assert await client._get_session() is not session
+    await client.close()
+
+
+def test_cache_key_excludes_api_key():
+    client = LeakCheckAPIClient("secret_api_key")
+    assert client._cache_params(" Test@Example.com") == {"email": "test@example.com"}
+
+
+@pytest.mark.anyio
+async def test_hibp_not_found_is_cached_as_empty_result():
+    calls = []
+
+    async def breached_account(request):
+        calls.append(request.match_info["email"])
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get("/breachedaccount/{email}", breached_account)
+    async with TestServer(app) as server:
+        client = HaveIBeenPwnedAPIClient("test_api_key")
+        client.BASE_URL = str(server.make_url("")).rstrip("/")
+        client.throttle = AsyncTokenBucket(rate=100.0, capacity=5)
+
+        assert await client.get_breach_info_by_email("clean@example.com") == []
+        assert await client.get_breach_info_by_email("clean@example.com") == []
+        await client.close()
+
+    assert len(calls) == 1
+    params = client._cache_params("clean@example.com")
+    assert client.cache.get(client.PROVIDER_NAME, params) == []
+
+
+@pytest.mark.anyio
+async def test_stale_refresh_pass_is_capped():
+    client = LeakCheckAPIClient("test_api_key")
+    client.stale_refresh_batch = 3
+    client._stale_emails = {f"user{i}@example.com": f"user{i}@example.com"
+                            for i in range(10)}
+    fetched = []
+
+    async def fetch(email, timeout):
+        fetched.append(email)
+        return []
+
+    client._fetch = fetch
+    await client._refresh_stale(timeout=1.0)
+
+    assert len(fetched) == 3
+    assert len(client._stale_emails) == 7
+
 if __name__ == "__main__":
     pytest.main()
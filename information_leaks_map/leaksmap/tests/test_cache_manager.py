@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+from cache.cache_manager import CacheManager
+from cache.codecs import CODECS
+
+
+def test_cache_manager_expires_through_heap_and_counts_stats():
+    cache = CacheManager(default_ttl=60)
+    cache.set("url", {"email": "a@example.com"}, ["a"], ttl=0)
+    assert cache.cleanup_expired() == 1
+    cache.set("url", {"email": "b@example.com"}, ["b"])
+
+    assert cache.get("url", {"email": "b@example.com"}) == ["b"]
+    assert cache.get("url", {"email": "a@example.com"}) is None
+
+    stats = cache.stats()
+    counts = (stats["hits"], stats["misses"], stats["expirations"], stats["entries"])
+    assert counts == (1, 1, 1, 1)
+
+
+def test_cache_manager_evicts_least_recently_used():
+    cache = CacheManager(max_entries=2)
+    cache.set("a", {}, 1)
+    cache.set("b", {}, 2)
+    assert cache.get("a", {}) == 1
+    cache.set("c", {}, 3)
+
+    assert cache.get("b", {}) is None
+    assert cache.get("a", {}) == 1
+    assert cache.stats()["evictions"] == 1
+
+    bounded = CacheManager(max_entries=None, max_bytes=2000)
+    for i in range(50):
+        bounded.set("key", {"i": i}, [{"service_name": f"Service {i}"}])
+    assert bounded.stats()["bytes"] <= 2000
+    assert bounded.get("key", {"i": 49}) is not None
+
+
+def test_cache_manager_keeps_expired_entries_for_get_stale():
+    cache = CacheManager(stale_ttl=60)
+    cache.set("LeakCheck", {"email": "a@example.com"}, ["a"], ttl=0)
+
+    assert cache.get("LeakCheck", {"email": "a@example.com"}) is None
+    assert cache.get_stale("LeakCheck", {"email": "a@example.com"}) == ["a"]
+    assert cache.cleanup_expired() == 0
+
+    fresh = CacheManager()
+    fresh.set("LeakCheck", {"email": "a@example.com"}, ["a"], ttl=0)
+    assert fresh.get_stale("LeakCheck", {"email": "a@example.com"}) is None
+    assert len(fresh) == 0
+
+
+def test_cache_manager_limits_apply_to_whole_cache_across_shards():
+    cache = CacheManager(max_entries=3, shards=16)
+    for i in range(10):
+        cache.set("key", {"i": i}, i)
+    assert len(cache) == 3
+    assert [cache.get("key", {"i": i}) for i in range(7, 10)] == [7, 8, 9]
+
+    # Larger than max_bytes / shards, but fits the cache as a whole
+    bounded = CacheManager(max_entries=None, max_bytes=64 * 1024, shards=16)
+    bounded.set("key", {}, "x" * 8 * 1024)
+    assert bounded.get("key", {}) == "x" * 8 * 1024
+
+
+def test_cache_manager_codecs_round_trip_breach_lists():
+    breaches = [
+        {"service_name": "Adobe", "breach_date": "2013-10-04",
+         "data_type": "Passwords"},
+        {"service_name": "Yahoo", "breach_date": "2013-08-01",
+         "data_type": "Email addresses"},
+    ]
+    for name, codec_class in CODECS.items():
+        try:
+            codec = codec_class()
+        except ImportError:
+            continue
+        cache = CacheManager(codec=codec, max_bytes=10 ** 6)
+        cache.set("lookup", {"email": "a@example.com"}, breaches)
+        cache.set("lookup", {"email": "b@example.com"}, [])
+
+        assert cache.get("lookup", {"email": "a@example.com"}) == breaches, name
+        assert cache.get("lookup", {"email": "b@example.com"}) == [], name
+
+
+def test_cache_manager_is_safe_under_concurrent_writers():
+    cache = CacheManager(max_entries=500, shards=4)
+
+    def work(worker):
+        for i in range(2000):
+            ttl = 0 if i % 7 == 0 else 60
+            cache.set("url", {"worker": worker, "i": i % 300}, i, ttl=ttl)
+            cache.get("url", {"worker": worker, "i": (i * 31) % 300})
+            if i % 100 == 0:
+                cache.cleanup_expired()
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert len(cache) == stats["entries"] <= 500
+    assert stats["hits"] + stats["misses"] == 8 * 2000
+
+
+@pytest.mark.anyio
+async def test_cache_manager_async_accessors():
+    cache = CacheManager()
+    await cache.aset("url", {"email": "a@example.com"}, ["a"])
+    assert await cache.aget("url", {"email": "a@example.com"}) == ["a"]
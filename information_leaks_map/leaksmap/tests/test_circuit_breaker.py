@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from leaksmap.api_client import HaveIBeenPwnedAPIClient
+from leaksmap.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def test_breaker_opens_on_failure_rate_and_recovers():
+    breaker = CircuitBreaker("test", failure_rate=0.5, window=4, min_calls=4,
+                             open_seconds=0.05)
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("test", slow_call_seconds=1.0, window=2, min_calls=2)
+    breaker.record_success(2.0)
+    breaker.record_success(3.0)
+    assert breaker.state == OPEN
+
+
+@pytest.mark.anyio
+async def test_open_breaker_serves_stale_cache_entry():
+    client = HaveIBeenPwnedAPIClient("test_api_key")
+    client.breaker = CircuitBreaker("test", window=1, min_calls=1, open_seconds=60)
+    client.cache.stale_ttl = 3600
+    params = client._cache_params("user@example.com")
+    client.cache.set(client.PROVIDER_NAME, params, [{"service_name": "Adobe"}], ttl=0)
+    client.breaker.record_failure()
+
+    result = await client.lookup("user@example.com")
+    missing = await client.lookup("other@example.com")
+
+    assert result.status == "stale"
+    assert result.breaches == [{"service_name": "Adobe"}]
+    assert missing.status == "unavailable"
+    assert "user@example.com" in client._stale_emails
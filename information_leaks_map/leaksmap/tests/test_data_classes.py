@@ -0,0 +1,20 @@
+from leaksmap.data_classes import DataClassRegistry, split_data_type
+
+
+def test_split_data_type_drops_unknown_and_duplicates():
+    names = split_data_type("Email addresses, Passwords, Email addresses")
+    assert names == ["Email addresses", "Passwords"]
+    assert split_data_type("Unknown") == []
+    assert split_data_type(None) == []
+
+
+def test_registry_builds_and_decodes_masks_from_loaded_bits():
+    registry = DataClassRegistry()
+    registry._bits = {"Email addresses": 0, "Passwords": 3, "Overflow": None}
+    registry._names = {0: "Email addresses", 3: "Passwords"}
+
+    mask = registry.mask_for(["Passwords", "Email addresses", "Overflow"], create=False)
+
+    assert mask == 0b1001
+    assert registry.names_for(mask) == ["Email addresses", "Passwords"]
+    assert registry.names_for(0) == []
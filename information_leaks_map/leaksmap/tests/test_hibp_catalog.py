@@ -0,0 +1,50 @@
+import datetime
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from leaksmap.api_client import HaveIBeenPwnedAPIClient
+from leaksmap.hibp_catalog import BreachCatalog
+from leaksmap.throttling import AsyncTokenBucket
+
+
+@pytest.mark.anyio
+async def test_truncated_lookup_is_joined_with_local_catalog():
+    queries = []
+
+    async def breached_account(request):
+        queries.append(dict(request.query))
+        return web.json_response([{"Name": "Adobe"}, {"Name": "NewBreach"}])
+
+    app = web.Application()
+    app.router.add_get("/breachedaccount/{email}", breached_account)
+    async with TestServer(app) as server:
+        client = HaveIBeenPwnedAPIClient("test_api_key")
+        client.BASE_URL = str(server.make_url("")).rstrip("/")
+        client.throttle = AsyncTokenBucket(rate=100.0, capacity=5)
+        client.catalog = BreachCatalog(entries={
+            "Adobe": {
+                "name": "Adobe",
+                "breach_date": datetime.date(2013, 10, 4),
+                "description": "In October 2013, 153 million Adobe accounts "
+                               "were breached.",
+                "data_classes": ["Email addresses", "Passwords"],
+            },
+        })
+
+        breaches = await client.get_breach_info_by_email("catalog@example.com")
+        await client.close()
+
+    assert queries == [{"truncateResponse": "true"}]
+    adobe, unknown = breaches
+    assert adobe["breach_date"] == "2013-10-04"
+    assert adobe["data_type"] == "Email addresses, Passwords"
+    assert unknown == {
+        "service_name": "NewBreach",
+        "breach_date": "Unknown",
+        "location": "Unknown",
+        "data_type": "Unknown",
+        "description": "Breach detected",
+        "source": "HaveIBeenPwned",
+    }
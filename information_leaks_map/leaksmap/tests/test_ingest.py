@@ -0,0 +1,17 @@
+from datetime import date
+
+from leaksmap.ingest import parse_breach_date, parse_breach_dates
+
+
+def test_parse_breach_date_formats():
+    assert parse_breach_date("2019-07-16") == date(2019, 7, 16)
+    assert parse_breach_date("2019-07") == date(2019, 7, 1)
+    assert parse_breach_date("2019") == date(2019, 1, 1)
+    assert parse_breach_date("2019-13") == date.today()
+    assert parse_breach_date(None, date(2000, 1, 1)) == date(2000, 1, 1)
+
+
+def test_parse_breach_dates_parses_each_value_once():
+    dates = parse_breach_dates(["2020-05", None, "2020-05", ""])
+
+    assert dates == {"2020-05": date(2020, 5, 1), None: date.today(), "": date.today()}
@@ -0,0 +1,96 @@
+import hashlib
+
+import pytest
+
+from leaksmap.api_client import ProviderError
+from leaksmap.pwned_passwords import (
+    PwnedPasswordsClient,
+    encode_range,
+    find_count,
+    split_password_hash,
+)
+
+
+def test_split_password_hash():
+    prefix, suffix = split_password_hash("password")
+    digest = hashlib.sha1(b"password").hexdigest().upper()
+    assert (prefix, suffix) == (digest[:5], digest[5:])
+    assert len(suffix) == 35
+
+
+def test_encode_range_sorts_and_drops_padding():
+    text = "\r\n".join([
+        "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF:7",
+        "0000000000000000000000000000000000A:0",
+        "1E4C9B93F3F0682250B6CF8331B7EE68FD8:3861493",
+        "0018A45C4D1DEF81644B54AB7F969B88D65:1",
+    ])
+    records = encode_range(text)
+
+    assert len(records) == 3 * 39
+    assert find_count(records, "0018A45C4D1DEF81644B54AB7F969B88D65") == 1
+    assert find_count(records, "1e4c9b93f3f0682250b6cf8331b7ee68fd8") == 3861493
+    assert find_count(records, "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF") == 7
+    assert find_count(records, "0000000000000000000000000000000000A") == 0
+    assert find_count(b"", "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF") == 0
+
+
+@pytest.mark.anyio
+async def test_cached_prefix_is_not_fetched_again():
+    prefix, suffix = split_password_hash("hunter2")
+    client = PwnedPasswordsClient()
+    client.memory.set(client.BASE_URL, {"prefix": prefix},
+                      encode_range(f"{suffix}:42\n"))
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("range should come from the cache")
+
+    client._load_range = fail
+    assert await client.get_password_count("hunter2") == 42
+    await client.close()
+
+
+class _OpenBreaker:
+    def allow_request(self):
+        return False
+
+
+@pytest.mark.anyio
+async def test_stored_range_lives_in_memory_for_its_remaining_ttl():
+    prefix, suffix = split_password_hash("hunter2")
+    records = encode_range(f"{suffix}:42\n")
+    client = PwnedPasswordsClient(ttl=3600)
+    ttls = []
+
+    async def stored_range(prefix):
+        return records, 3590.0
+
+    client._stored_range = stored_range
+    client.memory.set = lambda key, params, value, ttl=None: ttls.append(ttl)
+
+    assert await client._load_range(prefix, timeout=1.0) == records
+    assert ttls == [10.0]
+    await client.close()
+
+
+@pytest.mark.anyio
+async def test_open_breaker_skips_the_request():
+    prefix, suffix = split_password_hash("hunter2")
+    stale = encode_range(f"{suffix}:42\n")
+    client = PwnedPasswordsClient(ttl=3600)
+    client.breaker = _OpenBreaker()
+    stored = [(stale, 7200.0), None]
+
+    async def stored_range(prefix):
+        return stored.pop(0)
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("breaker is open, no request expected")
+
+    client._stored_range = stored_range
+    client._get_text = fail
+
+    assert await client._load_range(prefix, timeout=1.0) == stale
+    with pytest.raises(ProviderError):
+        await client._load_range(prefix, timeout=1.0)
+    await client.close()
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from leaksmap.singleflight import SingleFlight
+
+
+@pytest.mark.anyio
+async def test_concurrent_calls_share_one_execution():
+    group = SingleFlight()
+    calls = 0
+
+    async def lookup():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["Adobe"]
+
+    results = await asyncio.gather(
+        *(group.do(("HIBP", "a@example.com"), lookup) for _ in range(5))
+    )
+    other = await group.do(("HIBP", "b@example.com"), lookup)
+
+    assert calls == 2
+    assert all(result == ["Adobe"] for result in results)
+    assert other == ["Adobe"]
+    assert group.in_flight() == 0
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    group = SingleFlight()
+
+    async def lookup():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    impatient = asyncio.create_task(group.do("key", lookup))
+    patient = asyncio.create_task(group.do("key", lookup))
+    await asyncio.sleep(0.01)
+    impatient.cancel()
+
+    assert await patient == "done"
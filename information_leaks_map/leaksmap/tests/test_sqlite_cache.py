@@ -0,0 +1,58 @@
+import threading
+
+from leaksmap.sqlite_cache import SQLiteCache
+
+
+def _cache(path, **options):
+    return SQLiteCache(str(path), {"TIMEOUT": None, "OPTIONS": options})
+
+
+def test_sqlite_cache_survives_reopen_and_honours_timeouts(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = _cache(path)
+    cache.set("LeakCheck:a@example.com", (123.0, b"payload"))
+    cache.set("expired", [1], timeout=0)
+    assert cache.add("LeakCheck:a@example.com", "other") is False
+    assert cache.add("expired", [2]) is True
+
+    reopened = _cache(path)
+    assert reopened.get("LeakCheck:a@example.com") == (123.0, b"payload")
+    assert reopened.get("expired") == [2]
+    assert reopened.touch("missing") is False
+    assert reopened.delete("expired") is True
+    assert reopened.get("expired", "default") == "default"
+
+
+def test_sqlite_cache_compact_drops_expired_then_soonest_entries(tmp_path):
+    cache = _cache(tmp_path / "cache.sqlite3", MAX_SIZE_GB=200 / 1024 ** 2,
+                   COMPACT_EVERY=10 ** 6)
+    cache.set("gone", "x", timeout=0)
+    for i in range(400):
+        cache.set(f"key{i}", "v" * 1000, timeout=1000 + i)
+    cache.set("forever", "v" * 1000)
+
+    removed = cache.compact()
+
+    assert removed > 1
+    assert cache.size_bytes() <= cache.max_bytes
+    assert cache.get("forever") is not None
+    assert cache.get("key399") is not None
+    assert cache.get("key0") is None
+
+
+def test_sqlite_cache_compacts_in_background_thread(tmp_path):
+    cache = _cache(tmp_path / "cache.sqlite3", COMPACT_EVERY=5)
+    compacted_in = []
+    done = threading.Event()
+
+    def compact():
+        compacted_in.append(threading.current_thread())
+        done.set()
+        return 0
+
+    cache.compact = compact
+    for i in range(5):
+        cache.set(f"key{i}", "v")
+
+    assert done.wait(5)
+    assert compacted_in[0] is not threading.current_thread()
@@ -0,0 +1,19 @@
+from collections import Counter
+from types import SimpleNamespace
+
+from leaksmap.summary import _apply
+
+
+def test_apply_adds_deltas_and_drops_exhausted_classes():
+    summary = SimpleNamespace(total=3,
+                              by_data_class={"Passwords": 2, "Phone numbers": 1})
+
+    _apply(summary, 1, Counter({"Passwords": 1, "Phone numbers": -1, "Usernames": 1}))
+
+    assert summary.total == 4
+    assert summary.by_data_class == {"Passwords": 3, "Usernames": 1}
+
+    _apply(summary, -10, Counter({"Passwords": -5}))
+
+    assert summary.total == 0
+    assert summary.by_data_class == {"Usernames": 1}
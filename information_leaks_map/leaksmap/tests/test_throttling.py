@@ -0,0 +1,98 @@
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from leaksmap.api_client import HaveIBeenPwnedAPIClient
+from leaksmap.hibp_catalog import BreachCatalog
+from leaksmap.throttling import AsyncTokenBucket, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after(None, default=2.0) == 2.0
+    assert parse_retry_after("garbage", default=2.0) == 2.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+@pytest.mark.anyio
+async def test_bucket_spaces_requests_after_burst():
+    bucket = AsyncTokenBucket(rate=20.0, capacity=2)
+    started = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    # Два токена из запаса, еще два — по 1/20 с каждый
+    assert time.monotonic() - started >= 0.09
+
+
+@pytest.mark.anyio
+async def test_bucket_pause_delays_dispatch():
+    bucket = AsyncTokenBucket(rate=1000.0, capacity=5)
+    bucket.pause(0.1)
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.09
+
+
+@pytest.mark.anyio
+async def test_client_retries_after_429():
+    calls = []
+
+    async def breached_account(request):
+        calls.append(request.match_info["email"])
+        if len(calls) == 1:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        return web.json_response([{"Name": "Adobe"}])
+
+    app = web.Application()
+    app.router.add_get("/breachedaccount/{email}", breached_account)
+    async with TestServer(app) as server:
+        client = HaveIBeenPwnedAPIClient("test_api_key")
+        client.BASE_URL = str(server.make_url("")).rstrip("/")
+        client.throttle = AsyncTokenBucket(rate=100.0, capacity=5)
+        client.catalog = BreachCatalog(entries={})
+
+        breaches = await client.get_breach_info_by_email("test@example.com")
+        await client.close()
+
+    assert len(calls) == 2
+    assert breaches[0]["service_name"] == "Adobe"
+
+
+@pytest.mark.anyio
+async def test_bucket_acquire_gives_up_and_refunds_after_timeout():
+    bucket = AsyncTokenBucket(rate=1.0, capacity=1)
+    assert await bucket.acquire(timeout=0.1) is True
+
+    started = time.monotonic()
+    # Следующий токен через 1 с: ждать его бессмысленно
+    assert await bucket.acquire(timeout=0.1) is False
+    assert time.monotonic() - started < 0.05
+    # Отказ не оставил долга: очередь не выросла
+    assert bucket._tokens > -1
+
+
+@pytest.mark.anyio
+async def test_client_does_not_call_provider_without_slot_in_timeout():
+    calls = []
+
+    async def breached_account(request):
+        calls.append(request.match_info["email"])
+        return web.json_response([{"Name": "Adobe"}])
+
+    app = web.Application()
+    app.router.add_get("/breachedaccount/{email}", breached_account)
+    async with TestServer(app) as server:
+        client = HaveIBeenPwnedAPIClient("test_api_key")
+        client.BASE_URL = str(server.make_url("")).rstrip("/")
+        client.throttle = AsyncTokenBucket(rate=10 / 60, capacity=1)
+        client.catalog = BreachCatalog(entries={})
+
+        results = [
+            await client.lookup(f"user{i}@example.com", timeout=0.5) for i in range(3)
+        ]
+        await client.close()
+
+    assert [result.status for result in results] == ["ok", "throttled", "throttled"]
+    assert len(calls) == 1
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from cache.codecs import RecordCodec
+from leaksmap.api_client import create_api_cache
+from leaksmap.sqlite_cache import SQLiteCache
+from leaksmap.tiered_cache import TieredCache
+
+
+def _l2(name):
+    return LocMemCache(name, {"TIMEOUT": None})
+
+
+def test_tiered_cache_shares_entries_through_l2():
+    l2 = _l2("tiered-share")
+    worker_a = TieredCache(l2, sync_interval=0)
+    worker_b = TieredCache(l2, sync_interval=0)
+
+    worker_a.set("LeakCheck", {"email": "a@example.com"},
+                 [{"service_name": "Example"}], ttl=60)
+
+    assert l2.get("LeakCheck:a@example.com") is not None
+    assert worker_b.get("LeakCheck", {"email": "a@example.com"}) == [
+        {"service_name": "Example"}
+    ]
+    assert len(worker_b) == 1
+    assert worker_b.get("LeakCheck", {"email": "b@example.com"}) is None
+
+
+def test_tiered_cache_delete_invalidates_other_l1():
+    l2 = _l2("tiered-invalidate")
+    worker_a = TieredCache(l2, sync_interval=0.001)
+    worker_b = TieredCache(l2, sync_interval=0.001)
+    worker_a.set("key", {}, [1], ttl=60)
+    assert worker_b.get("key", {}) == [1]
+
+    worker_a.delete("key", {})
+    time.sleep(0.01)
+
+    assert worker_b.get("key", {}) is None
+
+
+def test_tiered_cache_l1_stores_values_through_codec():
+    l2 = _l2("tiered-codec")
+    cache = TieredCache(l2, sync_interval=0, l1_codec=RecordCodec())
+    breaches = [{"service_name": "Adobe", "breach_date": "2013-10-04"}]
+    cache.set("LeakCheck", {"email": "a@example.com"}, breaches, ttl=60)
+
+    assert cache.get("LeakCheck", {"email": "a@example.com"}) == breaches
+    assert isinstance(create_api_cache().codec, RecordCodec)
+
+
+def test_tiered_cache_survives_l2_outage():
+    class BrokenCache:
+        def __getattr__(self, name):
+            def fail(*args, **kwargs):
+                raise ConnectionError("L2 is down")
+            return fail
+
+    cache = TieredCache(BrokenCache(), sync_interval=0.001)
+    cache.set("LeakCheck", {"email": "a@example.com"}, ["a"], ttl=60)
+    time.sleep(0.01)
+
+    assert cache.get("LeakCheck", {"email": "a@example.com"}) == ["a"]
+    assert cache.get_stale("LeakCheck", {"email": "b@example.com"}) is None
+
+
+@pytest.mark.anyio
+async def test_tiered_cache_async_accessors_share_l2(tmp_path):
+    l2 = SQLiteCache(str(tmp_path / "cache.sqlite3"), {"TIMEOUT": None})
+    worker_a = TieredCache(l2, sync_interval=0.001, stale_ttl=60)
+    worker_b = TieredCache(l2, sync_interval=0.001, stale_ttl=60)
+
+    await worker_a.aset("LeakCheck", {"email": "a@example.com"}, ["a"], ttl=60)
+    await worker_a.aset("LeakCheck", {"email": "old@example.com"}, ["old"], ttl=0)
+
+    assert await worker_b.aget("LeakCheck", {"email": "a@example.com"}) == ["a"]
+    assert await worker_b.aget("LeakCheck", {"email": "old@example.com"}) is None
+    stale = await worker_b.aget_stale("LeakCheck", {"email": "old@example.com"})
+    assert stale == ["old"]
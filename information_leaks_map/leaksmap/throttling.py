@@ -0,0 +1,144 @@
+"""
+Асинхронный token bucket для ограничения частоты запросов к провайдерам.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket, общий для всех корутин процесса.
+
+    Каждый вызов ``acquire`` резервирует токен сразу (баланс может уйти в минус
+    — это очередь ожидающих) и спит, пока токен не накопится. Резервирование
+    идет под threading.Lock без await внутри, поэтому bucket можно
+    использовать из нескольких event loop'ов одновременно.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        :param rate: Скорость пополнения, токенов в секунду
+        :param capacity: Максимальный запас токенов (размер всплеска)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            refilled = self._tokens + (now - self._updated) * self.rate
+            self._tokens = min(self.capacity, refilled)
+            self._updated = now
+
+    def _reserve(self) -> float:
+        """Зарезервировать токен и вернуть, сколько секунд ждать до него."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            # _updated в будущем означает активную паузу (см. pause)
+            wait = max(0.0, self._updated - now)
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            return wait
+
+    def _release(self) -> None:
+        """Вернуть зарезервированный, но не использованный токен."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    async def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Дождаться разрешения на отправку одного запроса.
+
+        :param timeout: Сколько секунд можно ждать. Если токен не успевает
+            накопиться за это время, резерв сразу возвращается в bucket
+            и ждать не приходится.
+        :return: True, если токен получен, False — если не уложились в timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        wait = self._reserve()
+        try:
+            while wait > 0:
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    self._release()
+                    return False
+                await asyncio.sleep(wait)
+                # Пауза могла быть продлена, пока мы спали
+                wait = self._paused_until - time.monotonic()
+        except asyncio.CancelledError:
+            # Вызывающий сдался: токен не должен уйти впустую
+            self._release()
+            raise
+        return True
+
+    def pause(self, seconds: float) -> None:
+        """
+        Приостановить выдачу токенов (например, по Retry-After).
+
+        Токены за время паузы не накапливаются: после нее сразу уходит
+        один запрос, без всплеска, который снова уперся бы в лимит провайдера.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self._tokens = min(self._tokens, 1.0)
+                self._updated = until
+
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """
+    Разобрать заголовок Retry-After (секунды или HTTP-дата).
+
+    :param value: Значение заголовка
+    :param default: Пауза, если заголовка нет или он некорректен
+    :return: Пауза в секундах
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid Retry-After header: {value}")
+        return default
+
+
+_buckets: Dict[str, AsyncTokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(name: str, per_minute: float, burst: float = 1.0) -> AsyncTokenBucket:
+    """
+    Общий для процесса bucket провайдера (создается при первом обращении).
+
+    :param name: Имя провайдера
+    :param per_minute: Разрешенное число запросов в минуту
+    :param burst: Размер всплеска
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            bucket = AsyncTokenBucket(per_minute / 60.0, burst)
+            _buckets[name] = bucket
+        return bucket
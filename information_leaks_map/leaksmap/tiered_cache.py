@@ -0,0 +1,210 @@
+"""
+Двухуровневый кэш ответов провайдеров: L1 в памяти процесса над общим L2.
+
+L2 — бэкенд ``django.core.cache`` (по умолчанию SQLiteCache из sqlite_cache),
+общий для всех воркеров: адрес, проверенный одним воркером, остальные берут
+из L2, а не у провайдера. L1 — небольшой CacheManager, который снимает чтение
+L2 с горячих ключей. Время истечения хранится в записи L2 как абсолютное, поэтому
+запись, поднятая в L1, истекает тогда же, когда и в L2.
+"""
+import logging
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from asgiref.sync import sync_to_async
+
+from cache.cache_manager import CacheManager
+from cache.codecs import Codec, JsonZlibCodec
+
+logger = logging.getLogger(__name__)
+
+# Ключ метки инвалидаций в L2: его изменение сбрасывает L1 во всех процессах
+GENERATION_KEY = "leaksmap:api-cache:generation"
+
+# Значения в L2 читают все процессы, поэтому формат — переносимый JSON, сжатый zlib
+L2_CODEC = JsonZlibCodec()
+
+
+class TieredCache:
+    """
+    Кэш с интерфейсом CacheManager (get, get_stale, set, delete, clear).
+
+    Запись в L2 — ``(expires_at, payload)`` с таймаутом бэкенда ``ttl + stale_ttl``:
+    после expires_at она еще доступна через get_stale как запасной ответ.
+    L1 держит запись не дольше ``l1_ttl``, так что чужие изменения видны
+    с задержкой не больше l1_ttl, а delete и clear видны всем процессам
+    не позже чем через ``sync_interval`` (через метку GENERATION_KEY).
+    """
+
+    def __init__(self, l2, l1_max_entries: int = 1000,
+                 l1_max_bytes: int = 16 * 1024 * 1024,
+                 l1_ttl: int = 60, default_ttl: int = 3600, stale_ttl: int = 0,
+                 sync_interval: float = 5.0, l1_codec: Optional[Codec] = None):
+        """
+        :param l2: Бэкенд django.core.cache (например, caches['provider_responses'])
+        :param l1_max_entries: Размер L1 в записях
+        :param l1_max_bytes: Размер L1 в байтах
+        :param l1_ttl: Максимальное время жизни записи в L1 (сек)
+        :param default_ttl: TTL по умолчанию (сек)
+        :param stale_ttl: Сколько устаревшая запись доступна через get_stale (сек)
+        :param sync_interval: Как часто сверять метку инвалидаций (сек), 0 — отключить
+        :param l1_codec: Кодек значений L1 (см. cache.codecs)
+        """
+        self.l1 = CacheManager(max_entries=l1_max_entries, max_bytes=l1_max_bytes,
+                               default_ttl=l1_ttl, stale_ttl=stale_ttl, codec=l1_codec)
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.sync_interval = sync_interval
+        self._generation = None
+        self._synced_at = None
+
+    @property
+    def max_entries(self) -> int:
+        return self.l1.max_entries
+
+    def _sync_due(self) -> bool:
+        if not self.sync_interval:
+            return False
+        return (self._synced_at is None
+                or time.monotonic() - self._synced_at >= self.sync_interval)
+
+    def _sync(self) -> None:
+        """Сбросить L1, если другой процесс вызвал delete или clear."""
+        if self._sync_due():
+            self._check_generation()
+
+    def _check_generation(self) -> None:
+        now = time.monotonic()
+        try:
+            generation = self.l2.get(GENERATION_KEY)
+        except Exception as e:
+            # Как и в _load: без L2 работаем с L1, сверимся через sync_interval
+            logger.warning(f"L2 cache generation read failed: {e}")
+            self._synced_at = now
+            return
+        if self._synced_at is not None and generation != self._generation:
+            self.l1.clear()
+        self._generation = generation
+        self._synced_at = now
+
+    def _invalidate(self) -> None:
+        if not self.sync_interval:
+            return
+        # Новое случайное значение, а не incr: после clear() счетчик начался бы заново
+        try:
+            self.l2.set(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        except Exception as e:
+            logger.warning(f"L2 cache generation write failed: {e}")
+
+    @staticmethod
+    def _l2_key(key: str, params: Dict) -> str:
+        """Строковый ключ L2, например ``LeakCheck:user@example.com``."""
+        return ":".join([key, *(str(value) for _, value in sorted(params.items()))])
+
+    def _load(self, key: str):
+        """Запись L2 как (expires_at, value) или None."""
+        try:
+            entry = self.l2.get(key)
+        except Exception as e:
+            # Недоступный L2 не должен ломать проверку: работаем только с L1
+            logger.warning(f"L2 cache read failed for {key}: {e}")
+            return None
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        return expires_at, L2_CODEC.decode(payload)
+
+    def _store(self, key: str, value: Any, ttl: int) -> None:
+        """Записать значение в L2 на ``ttl`` секунд (плюс stale_ttl)."""
+        try:
+            self.l2.set(key, (time.time() + ttl, L2_CODEC.encode(value)),
+                        timeout=ttl + self.stale_ttl)
+        except Exception as e:
+            logger.warning(f"L2 cache write failed for {key}: {e}")
+
+    def _promote(self, key: str, params: Dict, entry) -> Optional[Any]:
+        """Значение записи L2, если она не истекла; копия кладется в L1."""
+        if entry is None:
+            return None
+        expires_at, value = entry
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            return None
+        self.l1.set(key, params, value, min(remaining, self.l1_ttl))
+        return value
+
+    def get(self, key: str, params: Dict) -> Optional[Any]:
+        """Значение по ключу или None, если записи нет или она устарела."""
+        self._sync()
+        value = self.l1.get(key, params)
+        if value is not None:
+            return value
+        return self._promote(key, params, self._load(self._l2_key(key, params)))
+
+    def get_stale(self, key: str, params: Dict) -> Optional[Any]:
+        """Значение по ключу, даже устаревшее (в пределах stale_ttl)."""
+        # Сначала L2: там может быть более свежий ответ, полученный другим воркером
+        entry = self._load(self._l2_key(key, params))
+        if entry is not None:
+            return entry[1]
+        return self.l1.get_stale(key, params)
+
+    def set(self, key: str, params: Dict, value: Any,
+            ttl: Optional[int] = None) -> None:
+        """
+        Сохранить значение на ``ttl`` секунд (по умолчанию default_ttl)
+        в оба уровня.
+        """
+        ttl = ttl if ttl is not None else self.default_ttl
+        self.l1.set(key, params, value, min(ttl, self.l1_ttl))
+        self._store(self._l2_key(key, params), value, ttl)
+
+    # Асинхронные версии для клиентов провайдеров: L1 читается прямо в цикле
+    # событий, а запросы к L2 (файл SQLite, сеть) уходят в пул потоков
+
+    async def aget(self, key: str, params: Dict) -> Optional[Any]:
+        """get для корутин: L2 читается в отдельном потоке."""
+        if self._sync_due():
+            await sync_to_async(self._check_generation, thread_sensitive=False)()
+        value = self.l1.get(key, params)
+        if value is not None:
+            return value
+        entry = await sync_to_async(self._load, thread_sensitive=False)(
+            self._l2_key(key, params))
+        return self._promote(key, params, entry)
+
+    async def aget_stale(self, key: str, params: Dict) -> Optional[Any]:
+        """get_stale для корутин: L2 читается в отдельном потоке."""
+        entry = await sync_to_async(self._load, thread_sensitive=False)(
+            self._l2_key(key, params))
+        if entry is not None:
+            return entry[1]
+        return self.l1.get_stale(key, params)
+
+    async def aset(self, key: str, params: Dict, value: Any,
+                   ttl: Optional[int] = None) -> None:
+        """set для корутин: запись в L2 идет в отдельном потоке."""
+        ttl = ttl if ttl is not None else self.default_ttl
+        self.l1.set(key, params, value, min(ttl, self.l1_ttl))
+        await sync_to_async(self._store, thread_sensitive=False)(
+            self._l2_key(key, params), value, ttl)
+
+    def delete(self, key: str, params: Dict) -> None:
+        self.l1.delete(key, params)
+        self.l2.delete(self._l2_key(key, params))
+        self._invalidate()
+
+    def clear(self) -> None:
+        self.l1.clear()
+        self.l2.clear()
+        self._invalidate()
+
+    def stats(self):
+        """Статистика L1 (см. CacheManager.stats)."""
+        return self.l1.stats()
+
+    def __len__(self) -> int:
+        return len(self.l1)
@@ -1,6 +1,11 @@
 from django.urls import path, include
 from .views import (
     api_check_leaks,
+    api_check_job_status,
+    api_check_leaks_stream,
+    api_bulk_check_leaks,
+    api_check_password,
+    api_export_report,
     user_logout,
     login_view,
     register_view,
@@ -17,6 +22,11 @@ urlpatterns = [
     path('logout/', user_logout, name='logout'),
     path('', index, name='home'),
     path('check_leaks/', api_check_leaks, name='check_leaks'),
+    path('check_leaks/jobs/<int:job_id>/', api_check_job_status,
+         name='check_job_status'),
+    path('check_leaks/stream/', api_check_leaks_stream, name='check_leaks_stream'),
+    path('check_leaks/bulk/', api_bulk_check_leaks, name='bulk_check_leaks'),
+    path('check_password/', api_check_password, name='check_password'),
     path('feedback/', feedback.submit_feedback, name='feedback'),
     path('view_feedback/', feedback.view_feedback, name='view_feedback'),
     path('generate_report/', reports.generate_report, name='generate_report'),
@@ -27,6 +37,7 @@ urlpatterns = [
     path('view_report/', view_report, name='view_report'),
     path('edit_profile/', edit_profile, name='edit_profile'),
     path('export_report/', export_report, name='export_report'),
+    path('export_report/download/', api_export_report, name='api_export_report'),
     path('view_profile/', view_profile, name='view_profile'),
     path('visualize_breaches/', visualize_breaches, name='visualize_breaches'),
 ]
@@ -1,17 +1,27 @@
 from typing import List
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout, login
 from django.contrib import messages
-import asyncio
 from django.shortcuts import render, redirect
 from django.urls import reverse
-from django.http import JsonResponse, HttpResponse
+from django.db.models import Count
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_http_methods
-import os
-from .api_client import LeakCheckAPIClient
-from .models import Breach, Feedback, SupportTicket, Report
-from .forms import (RegistrationForm, LoginForm, BreachCheckForm, ReportExportForm, BreachFilterForm,SupportTicketForm)
+from .aggregator import get_breach_aggregator, merge_breaches, providers_answered
+from .data_classes import filter_by_data_class
+from .api_client import get_setting
+from .export import generate_html_report, generate_pdf_report
+from .ingest import asave_breaches, asave_checks
+from .pwned_passwords import check_password
+from .recommendations import get_password_advice
+from .summary import get_summary, mark_checked
+from .models import (Breach, BreachCheckJob, Feedback, SupportTicket, Report,
+                     get_user_profile)
+from .forms import (RegistrationForm, LoginForm, BreachCheckForm, PasswordCheckForm,
+                    ReportExportForm, BreachFilterForm, BulkBreachCheckForm)
+import json
 import logging
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
@@ -128,89 +138,282 @@ def generate_mock_report(data):
 @login_required
 @csrf_protect
 @require_http_methods(["POST"])
-def api_check_leaks(request):
-    """AJAX проверка утечек (исправлена async проблема)."""
+async def api_check_leaks(request):
+    """
+    AJAX проверка утечек.
+
+    Проверка ставится в очередь (BreachCheckJob) и выполняется воркером
+    run_breach_worker; ответ с id задачи возвращается сразу, результат
+    клиент забирает через api_check_job_status.
+    """
     form = BreachCheckForm(request.POST)
     if not form.is_valid():
         return JsonResponse({"error": dict(form.errors)}, status=400)
 
-    email = form.cleaned_data['email']
-    api_key = os.getenv('LEAKCHECK_API_KEY')
+    if not get_breach_aggregator().clients:
+        return JsonResponse({"error": "API ключ не настроен"}, status=500)
+
+    user = await request.auser()
+    job = await BreachCheckJob.objects.acreate(user=user,
+                                               email=form.cleaned_data['email'])
+    return JsonResponse({
+        "status": "queued",
+        "job_id": job.pk,
+        "status_url": reverse('check_job_status', args=[job.pk]),
+    }, status=202)
+
+
+@login_required
+@require_http_methods(["GET"])
+async def api_check_job_status(request, job_id):
+    """
+    Статус задачи проверки; для выполненной — результат в формате
+    прежнего check_leaks.
+    """
+    user = await request.auser()
+    job = await BreachCheckJob.objects.filter(pk=job_id, user=user).afirst()
+    if job is None:
+        return JsonResponse({"error": "Задача не найдена"}, status=404)
+
+    if job.status == 'failed':
+        response = {
+            "status": "failed",
+            "job_id": job.pk,
+            "error": "Ошибка проверки API",
+        }
+        # Провайдеры не ответили (jobs.ProvidersUnavailableError): это не
+        # внутренняя ошибка, показываем текст и статусы провайдеров
+        if job.result:
+            response["error"] = job.error
+            response["providers"] = job.result["providers"]
+        return JsonResponse(response)
+    if job.status != 'done':
+        return JsonResponse({"status": job.status, "job_id": job.pk})
+
+    result = job.result
+    response = {
+        "status": "success",
+        "job_id": job.pk,
+        "count": result["count"],
+        "providers": result["providers"],
+        "checklist": generate_checklist(result["breaches"]),
+    }
+    if result["count"]:
+        response["breaches"] = result["breaches"]
+        response["report_id"] = job.report_id
+    else:
+        response["message"] = "Утечки не найдены"
+    return JsonResponse(response)
+
+
+def _sse(event: str, data) -> str:
+    """Одно событие Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@login_required
+@csrf_protect
+@require_http_methods(["GET", "POST"])
+async def api_check_leaks_stream(request):
+    """
+    Проверка утечек с потоковой выдачей (text/event-stream).
 
-    if not api_key:
+    Событие ``provider`` отправляется сразу после ответа каждого провайдера,
+    затем ``summary`` с объединенным списком и чек-листом. GET нужен для
+    EventSource. Поток отдается по мере готовности только под ASGI.
+    """
+    form = BreachCheckForm(request.POST if request.method == "POST" else request.GET)
+    if not form.is_valid():
+        return JsonResponse({"error": dict(form.errors)}, status=400)
+
+    email = form.cleaned_data['email']
+    aggregator = get_breach_aggregator()
+    if not aggregator.clients:
         return JsonResponse({"error": "API ключ не настроен"}, status=500)
 
-    try:
-        client = LeakCheckAPIClient(api_key)
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        breaches_data = asyncio.run(client.get_breach_info_by_email(email))
-        loop.close()
-
-        if not breaches_data:
-            return JsonResponse({
-                "status": "success",
-                "count": 0,
-                "message": "Утечки не найдены",
-                "checklist": generate_checklist([])
+    user = await request.auser()
+
+    async def events():
+        results, providers = {}, {}
+        async for provider, breaches, status in aggregator.iter_providers(email):
+            results[provider] = breaches
+            providers[provider] = status
+            yield _sse("provider", {
+                "provider": provider,
+                "status": status,
+                "count": len(breaches),
+                "breaches": breaches,
             })
 
-        # Сохраняем утечки
-        saved_breaches = []
-        for data in breaches_data:
-            breach, created = Breach.objects.update_or_create(
-                user=request.user,
-                service_name=data["service_name"],
-                defaults={
-                    'breach_date': data.get("breach_date"),
-                    'location': data.get("location", "Unknown"),
-                    'data_type': data.get("data_type", ""),
-                    'description': data.get("description", ""),
-                    'source': data.get("source", "")
-                }
+        # События идут в порядке ответов, а объединение — в порядке
+        # aggregator.clients, как в get_breach_info_by_email: иначе написание
+        # имени, дата и источник утечки менялись бы от запуска к запуску
+        names = [client.PROVIDER_NAME for client in aggregator.clients]
+        breaches_data = merge_breaches([results[name] for name in names])
+        providers = {name: providers[name] for name in names}
+        if not providers_answered(providers):
+            yield _sse("summary", {
+                "status": "failed",
+                "error": "Провайдеры утечек недоступны, повторите проверку позже",
+                "providers": providers,
+            })
+            return
+        report_id = None
+        if breaches_data:
+            report = await Report.objects.acreate(
+                user=user, report_type='html', email=email,
+                content={"email": email, "count": len(breaches_data)},
             )
-            saved_breaches.append(breach)
-
-        return JsonResponse({
+            await asave_breaches(user, breaches_data, report)
+            report_id = report.pk
+        else:
+            await sync_to_async(mark_checked)(user)
+        yield _sse("summary", {
             "status": "success",
             "count": len(breaches_data),
             "breaches": breaches_data,
-            "checklist": generate_checklist(saved_breaches)
+            "providers": providers,
+            "report_id": report_id,
+            "checklist": generate_checklist(breaches_data),
         })
 
-    except Exception as e:
-        logger.error(f"API error: {e}")
-        return JsonResponse({"error": "Ошибка проверки API"}, status=500)
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Не буферизовать поток в nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 
 @login_required
+@csrf_protect
 @require_http_methods(["POST"])
-def api_export_report(request):
-    """AJAX экспорт отчета (убрано render_to_string)."""
-    form = ReportExportForm(request.POST)
+async def api_bulk_check_leaks(request):
+    """
+    Массовая проверка списка email.
+
+    Проверки идут параллельно (не более LEAKSMAP_BULK_CONCURRENCY одновременно),
+    ответ — NDJSON: по строке на адрес по мере готовности и итоговая строка.
+    Для каждого адреса с утечками создается свой Report, а утечки нескольких
+    адресов сохраняются общими пакетами по LEAKSMAP_INGEST_BATCH_SIZE.
+    Поток отдается по мере готовности только под ASGI.
+    """
+    form = BulkBreachCheckForm(
+        request.POST, request.FILES,
+        max_emails=get_setting('LEAKSMAP_BULK_MAX_EMAILS', 10000),
+    )
     if not form.is_valid():
         return JsonResponse({"error": dict(form.errors)}, status=400)
 
-    format_type = form.cleaned_data['format']
-    breaches = list(Breach.objects.filter(user=request.user).values(
-        'service_name', 'breach_date', 'data_type', 'description'
-    )[:50])
-
-    html_content = f"""
-    <!DOCTYPE html>
-    <html><head><title>Отчет</title></head>
-    <body>
-        <h1>Отчет об утечках</h1>
-        <p>Найдено утечек: {len(breaches)}</p>
-        <ul>
-        {"".join([f"<li>{b['service_name']} ({b['breach_date']})</li>" for b in breaches])}
-        </ul>
-    </body></html>
+    aggregator = get_breach_aggregator()
+    if not aggregator.clients:
+        return JsonResponse({"error": "API ключ не настроен"}, status=500)
+
+    emails = form.cleaned_data['email_list']
+    user = await request.auser()
+    concurrency = get_setting('LEAKSMAP_BULK_CONCURRENCY', 10)
+    batch_size = get_setting('LEAKSMAP_INGEST_BATCH_SIZE', 500)
+
+    async def stream():
+        pending, pending_rows, with_breaches = [], 0, 0
+        answered = saved = save_failed = False
+        try:
+            async for email, result in aggregator.iter_many(emails, concurrency):
+                answered = answered or providers_answered(result["providers"])
+                breaches_data = result["breaches"]
+                report_id = None
+                if breaches_data:
+                    with_breaches += 1
+                    report = await Report.objects.acreate(
+                        user=user, report_type='html', email=email,
+                        content={"email": email, "count": len(breaches_data),
+                                 "bulk": True},
+                    )
+                    report_id = report.pk
+                    pending.append((report, breaches_data))
+                    pending_rows += len(breaches_data)
+                    if pending_rows >= batch_size:
+                        # Пакет снимается до записи: после ошибки finally
+                        # не должен сохранять его повторно
+                        batch, pending, pending_rows = pending, [], 0
+                        try:
+                            await asave_checks(user, batch, batch_size)
+                        except Exception:
+                            save_failed = True
+                            raise
+                        saved = True
+                yield json.dumps({
+                    "email": email,
+                    "count": len(breaches_data),
+                    "breaches": breaches_data,
+                    "providers": result["providers"],
+                    "report_id": report_id,
+                }, ensure_ascii=False) + "\n"
+        finally:
+            # Остаток сохраняется и при отключении клиента, но не после ошибки
+            # сохранения: новая ошибка здесь скрыла бы исходную. Сохраненный
+            # пакет уже обновил last_checked_at, отдельная отметка не нужна
+            if not save_failed:
+                if pending:
+                    await asave_checks(user, pending, batch_size)
+                elif answered and not saved:
+                    await sync_to_async(mark_checked)(user)
+        yield json.dumps({
+            "status": "done",
+            "total": len(emails),
+            "with_breaches": with_breaches,
+        }) + "\n"
+
+    return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+
+
+@login_required
+@csrf_protect
+@require_http_methods(["POST"])
+def api_check_password(request):
     """
+    Проверка пароля по Pwned Passwords.
 
-    response = HttpResponse(html_content, content_type='text/html')
-    response['Content-Disposition'] = 'attachment; filename="report.html"'
-    return response
+    Наружу уходит только префикс SHA-1 хэша, сам пароль не сохраняется и не логируется.
+    """
+    form = PasswordCheckForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"error": dict(form.errors)}, status=400)
+
+    try:
+        count = check_password(form.cleaned_data['password'])
+    except Exception as e:
+        logger.error(f"Pwned Passwords error: {e}")
+        return JsonResponse({"error": "Ошибка проверки пароля"}, status=500)
+
+    return JsonResponse({
+        "status": "success",
+        "pwned": count > 0,
+        "count": count,
+        "advice": get_password_advice(count),
+    })
+
+
+@login_required
+@require_http_methods(["POST"])
+async def api_export_report(request):
+    """
+    AJAX экспорт отчета в формате из формы (PDF или HTML).
+
+    HTML отдается потоком без ограничения числа утечек. View асинхронная:
+    под ASGI пачки уходят клиенту по мере рендеринга, под WSGI Django
+    собирает асинхронный поток целиком перед отправкой.
+    """
+    form = ReportExportForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({"error": dict(form.errors)}, status=400)
+
+    breaches = Breach.objects.filter(user=await request.auser())
+    if form.cleaned_data['format'] == 'pdf':
+        return await sync_to_async(generate_pdf_report)(
+            breaches.select_related('service')
+        )
+    return generate_html_report(breaches,
+                                get_setting('LEAKSMAP_EXPORT_CHUNK_SIZE', 2000))
 
 # ========== VISUALIZATION ==========
 @login_required
@@ -225,20 +428,36 @@ def visualize_breaches(request):
         initial={"email": initial_email} if initial_email else None,
     )
 
-    breaches = []
-    if form.is_valid():
-        filters = form.cleaned_data
-        breaches = filter_breaches(MOCK_BREACHES, filters)
+    # Без параметров показываем все утечки пользователя, с ошибками в форме — ничего
+    filters = {}
+    breaches = Breach.objects.filter(user=request.user)
+    if form.is_bound:
+        if form.is_valid():
+            filters = form.cleaned_data
+            breaches = filter_breaches(breaches, filters)
+        else:
+            breaches = breaches.none()
 
-    # Данные для графика (например, количество утечек по сервисам)
-    chart_labels = [b["service"] for b in breaches]
-    chart_values = [1 for _ in breaches]  # можно сделать агрегацию по сервисам
+    # Количество утечек по сервисам считается в базе (GROUP BY)
+    per_service = breaches.order_by().values('service_name') \
+        .annotate(total=Count('id')).order_by('-total', 'service_name')
 
     context = {
         "form": form,
-        "breaches": breaches,
-        "chart_labels": chart_labels,
-        "chart_values": chart_values,
+        "breaches": breaches.select_related('service').only(
+            'service_name', 'breach_date', 'location', 'data_classes',
+            'service__description',
+        ),
+        "current_filters": filters,
+        "data_types": [
+            value for value, _ in BreachFilterForm.base_fields['data_type'].choices
+            if value
+        ],
+        "chart_data": {
+            "labels": json.dumps([row['service_name'] for row in per_service],
+                                 ensure_ascii=False),
+            "data": json.dumps([row['total'] for row in per_service]),
+        },
     }
     return render(request, "leaksmap/visualize_breaches.html", context)
 
@@ -273,84 +492,83 @@ def view_report(request):
     report = Report.objects.filter(user=request.user).last()
     return render(request, 'leaksmap/view_report.html', {'report': report})
 
+
+# Поля профиля, которые можно менять из формы редактирования
+PROFILE_FIELDS = ['bio', 'location', 'birth_date', 'telegram_id']
+
 @login_required
 def edit_profile(request):
     """Редактировать профиль."""
+    profile = get_user_profile(request.user)
     if request.method == 'POST':
-        request.user.profile.bio = request.POST.get('bio')
-        request.user.profile.location = request.POST.get('location')
-        request.user.profile.birth_date = request.POST.get('birth_date')
-        request.user.profile.telegram_id = request.POST.get('telegram_id')
-        request.user.profile.notification_preferences = request.POST.get('notification_preferences')
-        request.user.profile.save()
+        # Меняются только присланные поля: форма отправляет не все из них
+        for field in PROFILE_FIELDS:
+            if field in request.POST:
+                setattr(profile, field, request.POST[field] or None)
+        # JSON-поле приходит строкой
+        if 'notification_preferences' in request.POST:
+            try:
+                profile.notification_preferences = json.loads(
+                    request.POST['notification_preferences'] or '{}'
+                )
+            except ValueError:
+                messages.error(request, 'Некорректные настройки уведомлений')
+                return render(request, 'leaksmap/edit_profile.html',
+                              {'profile': profile})
+        profile.save()
         messages.success(request, 'Профиль обновлен!')
         return redirect('view_profile')
-    profile = request.user.profile
     return render(request, 'leaksmap/edit_profile.html', {'profile': profile})
 
 @login_required
 def view_profile(request):
     """Просмотр профиля."""
-    breaches_count = Breach.objects.filter(user=request.user).count()
+    # request.user загружен ProfileModelBackend вместе с профилем и сводкой:
+    # отдельных запросов нет, тем более агрегатов по всем утечкам
+    summary = get_summary(request.user)
     return render(request, 'leaksmap/profile.html', {
-        'breaches_count': breaches_count
+        'profile': get_user_profile(request.user),
+        'summary': summary,
+        'breaches_count': summary.total if summary else 0,
+        'data_class_counts': sorted(summary.by_data_class.items(),
+                                    key=lambda item: -item[1]) if summary else [],
     })
 
 def export_report(request):
     """Страница экспорта отчета."""
     return redirect('api_export_report')
 
-MOCK_BREACHES = [
-    {
-        "service": "LinkedIn",
-        "date": "2021-04-05",
-        "location": "USA",
-        "type": "passwords",
-        "description": "Утечка учетных записей",
-        "affected_email": "homeisdead.0@gmail.com",
-    },
-    {
-        "service": "Adobe",
-        "date": "2013-10-04",
-        "location": "USA",
-        "type": "emails",
-        "description": "Утечка email-адресов",
-        "affected_email": "homeisdead.0@gmail.com",
-    },
-    {
-        "service": "Yahoo",
-        "date": "2014-09-04",
-        "location": "USA",
-        "type": "passwords",
-        "description": "Утечка паролей",
-        "affected_email": "homeisdead.0@gmail.com",
-    },
-    {
-        "service": "Facebook",
-        "date": "2019-04-04",
-        "location": "USA",
-        "type": "phones",
-        "description": "Утечка номеров телефонов",
-        "affected_email": "homeisdead.0@gmail.com",
-    },
-]
-
-def filter_breaches(all_breaches, filters_dict):
-    """Фильтрация утечек по критериям."""
-    filtered_breaches = all_breaches
-
-    # Фильтр по email
+
+# Значения фильтра BreachFilterForm.data_type -> класс данных (см. data_classes)
+DATA_TYPE_FILTERS = {
+    "passwords": "Passwords",
+    "emails": "Email addresses",
+    "phones": "Phone numbers",
+}
+
+
+def filter_breaches(breaches, filters_dict):
+    """
+    Фильтрация утечек по критериям одним запросом.
+
+    :param breaches: QuerySet Breach
+    :param filters_dict: cleaned_data BreachFilterForm
+    :return: Отфильтрованный QuerySet
+    """
+    # Фильтр по email, для которого выполнялась проверка (пара breach-email
+    # уникальна, поэтому join не дублирует строки)
     if filters_dict.get("email"):
-        filtered_breaches = [b for b in filtered_breaches if b["affected_email"] == filters_dict["email"]]
+        breaches = breaches.filter(emails__email=filters_dict["email"])
 
     # Фильтр по типу данных
-    if filters_dict.get("data_type") and filters_dict["data_type"] != "Все типы":
-        filtered_breaches = [b for b in filtered_breaches if b["type"] == filters_dict["data_type"]]
+    data_type = DATA_TYPE_FILTERS.get(filters_dict.get("data_type"))
+    if data_type:
+        breaches = filter_by_data_class(breaches, data_type)
 
     # Фильтр по дате
     if filters_dict.get("start_date"):
-        filtered_breaches = [b for b in filtered_breaches if b["date"] >= filters_dict["start_date"]]
+        breaches = breaches.filter(breach_date__gte=filters_dict["start_date"])
     if filters_dict.get("end_date"):
-        filtered_breaches = [b for b in filtered_breaches if b["date"] <= filters_dict["end_date"]]
+        breaches = breaches.filter(breach_date__lte=filters_dict["end_date"])
 
-    return filtered_breaches
+    return breaches
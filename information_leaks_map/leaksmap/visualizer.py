@@ -3,6 +3,7 @@ from bokeh.models import ColumnDataSource, HoverTool, Title, FactorRange, Legend
 from bokeh.embed import components
 from bokeh.palettes import Category10
 from bokeh.transform import factor_cmap
+from .data_classes import filter_by_data_class
 from .models import Breach
 import pandas as pd
 from datetime import datetime
@@ -212,7 +213,7 @@ def create_breach_visualization(user, data_type_filter: Optional[str] = None,
     """
     try:
         # Apply filters
-        breaches = Breach.objects.filter(user=user)
+        breaches = Breach.objects.filter(user=user).select_related('service')
 
         if email:
             breaches = breaches.filter(user__email=email)
@@ -221,7 +222,7 @@ def create_breach_visualization(user, data_type_filter: Optional[str] = None,
             breaches = breaches.filter(user__email=user.email)
 
         if data_type_filter:
-            breaches = breaches.filter(data_type=data_type_filter)
+            breaches = filter_by_data_class(breaches, data_type_filter)
 
         if start_date:
             try: